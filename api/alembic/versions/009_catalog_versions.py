@@ -0,0 +1,62 @@
+"""009_catalog_versions
+
+Add catalog_version to game_profiles and a tombstone table for deleted games,
+both numbered from a shared sequence for delta catalog sync.
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-03-02 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a7b8c9d0e1'
+down_revision: Union[str, None] = 'e5f6a7b8c9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE catalog_version_seq")
+
+    # Volatile default: existing rows each receive their own version.
+    op.add_column(
+        'game_profiles',
+        sa.Column(
+            'catalog_version',
+            sa.BigInteger(),
+            nullable=False,
+            server_default=sa.text("nextval('catalog_version_seq')"),
+        ),
+    )
+    op.create_index('ix_game_profiles_catalog_version', 'game_profiles', ['catalog_version'])
+
+    op.create_table(
+        'game_profile_tombstones',
+        sa.Column('id', sa.Uuid(), primary_key=True),
+        sa.Column('game_id', sa.Uuid(), nullable=False),
+        sa.Column('slug', sa.String(200), nullable=False),
+        sa.Column(
+            'catalog_version',
+            sa.BigInteger(),
+            nullable=False,
+            server_default=sa.text("nextval('catalog_version_seq')"),
+        ),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_game_profile_tombstones_game_id', 'game_profile_tombstones', ['game_id'])
+    op.create_index(
+        'ix_game_profile_tombstones_catalog_version', 'game_profile_tombstones', ['catalog_version']
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('game_profile_tombstones')
+    op.drop_index('ix_game_profiles_catalog_version', table_name='game_profiles')
+    op.drop_column('game_profiles', 'catalog_version')
+    op.execute("DROP SEQUENCE catalog_version_seq")
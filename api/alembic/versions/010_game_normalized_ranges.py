@@ -0,0 +1,64 @@
+"""010_game_normalized_ranges
+
+Store aggregated CIDRs and merged port ranges next to the raw lists and
+backfill them for existing profiles.
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-03-03 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+from app.utils.netranges import aggregate_cidrs, merge_port_ranges
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, None] = 'f6a7b8c9d0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'game_profiles',
+        sa.Column('normalized_server_ips', ARRAY(sa.String()), nullable=False, server_default='{}'),
+    )
+    op.add_column(
+        'game_profiles',
+        sa.Column('port_ranges', JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+    )
+
+    game_profiles = sa.table(
+        'game_profiles',
+        sa.column('id', sa.Uuid()),
+        sa.column('server_ips', ARRAY(sa.String())),
+        sa.column('ports', ARRAY(sa.String())),
+        sa.column('normalized_server_ips', ARRAY(sa.String())),
+        sa.column('port_ranges', JSONB()),
+        sa.column('catalog_version', sa.BigInteger()),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(game_profiles.c.id, game_profiles.c.server_ips, game_profiles.c.ports)
+    ).all()
+    for row in rows:
+        conn.execute(
+            game_profiles.update()
+            .where(game_profiles.c.id == row.id)
+            .values(
+                normalized_server_ips=aggregate_cidrs(row.server_ips or []),
+                port_ranges=merge_port_ranges(row.ports or []),
+                # New fields must reach clients that only pull catalog deltas.
+                catalog_version=sa.text("nextval('catalog_version_seq')"),
+            )
+        )
+
+
+def downgrade() -> None:
+    op.drop_column('game_profiles', 'port_ranges')
+    op.drop_column('game_profiles', 'normalized_server_ips')
@@ -0,0 +1,35 @@
+"""011_session_node_load_indexes
+
+Partial indexes for counting active sessions per primary and backup node.
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-03-04 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c9d0e1f2a3'
+down_revision: Union[str, None] = 'a7b8c9d0e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_sessions_node_active', 'sessions', ['node_id'],
+        postgresql_where=sa.text("status = 'active'"),
+    )
+    op.create_index(
+        'ix_sessions_backup_node_active', 'sessions', ['backup_node_id'],
+        postgresql_where=sa.text("status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_backup_node_active', table_name='sessions')
+    op.drop_index('ix_sessions_node_active', table_name='sessions')
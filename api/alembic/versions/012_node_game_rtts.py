@@ -0,0 +1,39 @@
+"""012_node_game_rtts
+
+Relay→game-server RTTs reported by gateway agents, one row per node and CIDR.
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-03-05 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, None] = 'b8c9d0e1f2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'node_game_rtts',
+        sa.Column('id', sa.Uuid(), primary_key=True),
+        sa.Column('node_id', sa.Uuid(), sa.ForeignKey('nodes.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('cidr', sa.String(64), nullable=False),
+        sa.Column('rtt_ms', sa.Float(), nullable=False),
+        sa.Column('loss_pct', sa.Float(), nullable=True),
+        sa.Column('measured_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint('node_id', 'cidr', name='uq_node_game_rtts_node_cidr'),
+    )
+    op.create_index('ix_node_game_rtts_measured_at', 'node_game_rtts', ['measured_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('node_game_rtts')
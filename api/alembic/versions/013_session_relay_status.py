@@ -0,0 +1,29 @@
+"""013_session_relay_status
+
+Record the outcome of relay registration/unregistration per session leg.
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-03-06 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0e1f2a3b4c5'
+down_revision: Union[str, None] = 'c9d0e1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sessions', sa.Column('relay_status', sa.String(20), nullable=True))
+    op.add_column('sessions', sa.Column('backup_relay_status', sa.String(20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('sessions', 'backup_relay_status')
+    op.drop_column('sessions', 'relay_status')
@@ -0,0 +1,48 @@
+"""014_relay_outbox
+
+Transactional outbox for relay register/unregister calls.
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-03-07 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f2a3b4c5d6'
+down_revision: Union[str, None] = 'd0e1f2a3b4c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'relay_outbox',
+        sa.Column('id', sa.Uuid(), primary_key=True),
+        sa.Column('session_id', sa.Uuid(), sa.ForeignKey('sessions.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('node_id', sa.Uuid(), sa.ForeignKey('nodes.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('action', sa.String(20), nullable=False),
+        sa.Column('session_token', sa.Integer(), nullable=False),
+        sa.Column('payload', JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_relay_outbox_session_id', 'relay_outbox', ['session_id'])
+    op.create_index(
+        'ix_relay_outbox_due', 'relay_outbox', ['next_attempt_at'],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('relay_outbox')
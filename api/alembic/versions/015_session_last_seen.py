@@ -0,0 +1,37 @@
+"""015_session_last_seen
+
+Track when an active session was last seen alive (heartbeat or client
+traffic) so the reaper can expire abandoned sessions.
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-03-08 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a3b4c5d6e7'
+down_revision: Union[str, None] = 'e1f2a3b4c5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sessions', sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        "UPDATE sessions SET last_seen_at = COALESCE(started_at, created_at) "
+        "WHERE status = 'active'"
+    )
+    op.create_index(
+        'ix_sessions_active_last_seen', 'sessions', ['last_seen_at'],
+        postgresql_where=sa.text("status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_active_last_seen', table_name='sessions')
+    op.drop_column('sessions', 'last_seen_at')
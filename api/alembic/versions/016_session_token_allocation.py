@@ -0,0 +1,44 @@
+"""016_session_token_allocation
+
+Counter sequence for permuted session tokens, and a unique index on the
+tokens of active sessions (replacing the plain token index).
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-03-09 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3b4c5d6e7f8'
+down_revision: Union[str, None] = 'f2a3b4c5d6e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE SEQUENCE session_token_seq START WITH 1 INCREMENT BY 64')
+    # Random tokens may already collide among active sessions; keep the
+    # newest session per token and expire the rest.
+    op.execute(
+        "UPDATE sessions SET status = 'expired', ended_at = now() "
+        "WHERE status = 'active' AND id NOT IN ("
+        "  SELECT DISTINCT ON (session_token) id FROM sessions"
+        "  WHERE status = 'active' ORDER BY session_token, created_at DESC"
+        ")"
+    )
+    op.drop_index('ix_sessions_session_token', table_name='sessions')
+    op.create_index(
+        'ux_sessions_token_active', 'sessions', ['session_token'],
+        unique=True, postgresql_where=sa.text("status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ux_sessions_token_active', table_name='sessions')
+    op.create_index('ix_sessions_session_token', 'sessions', ['session_token'])
+    op.execute('DROP SEQUENCE session_token_seq')
@@ -0,0 +1,40 @@
+"""017_one_active_session_per_user
+
+Unique index on sessions(user_id) for active sessions, so concurrent starts
+cannot leave a user with two.
+
+Revision ID: b4c5d6e7f8a9
+Revises: a3b4c5d6e7f8
+Create Date: 2026-03-10 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c5d6e7f8a9'
+down_revision: Union[str, None] = 'a3b4c5d6e7f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Earlier races may have left users with several active sessions; keep
+    # the newest one each.
+    op.execute(
+        "UPDATE sessions SET status = 'expired', ended_at = now() "
+        "WHERE status = 'active' AND id NOT IN ("
+        "  SELECT DISTINCT ON (user_id) id FROM sessions"
+        "  WHERE status = 'active' ORDER BY user_id, created_at DESC"
+        ")"
+    )
+    op.create_index(
+        'ux_sessions_user_active', 'sessions', ['user_id'],
+        unique=True, postgresql_where=sa.text("status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ux_sessions_user_active', table_name='sessions')
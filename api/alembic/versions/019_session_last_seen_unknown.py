@@ -0,0 +1,34 @@
+"""019_session_last_seen_unknown
+
+Leave last_seen_at NULL until a session's client sends a heartbeat or
+traffic report, so the reaper only expires clients that report liveness.
+Active sessions whose last_seen_at was only ever the start time are reset.
+
+Revision ID: d6e7f8a9b0c1
+Revises: c5d6e7f8a9b0
+Create Date: 2026-03-12 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6e7f8a9b0c1'
+down_revision: Union[str, None] = 'c5d6e7f8a9b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE sessions SET last_seen_at = NULL "
+        "WHERE status = 'active' AND last_seen_at <= COALESCE(started_at, created_at)"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "UPDATE sessions SET last_seen_at = COALESCE(started_at, created_at) "
+        "WHERE status = 'active' AND last_seen_at IS NULL"
+    )
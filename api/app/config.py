@@ -11,6 +11,8 @@ class Settings(BaseSettings):
 
     # Redis
     redis_url: str = "redis://localhost:6379/0"
+    redis_connect_timeout_seconds: float = 1.0
+    redis_socket_timeout_seconds: float = 1.0
 
     # JWT
     jwt_secret_key: str = "changeme-secret"
@@ -26,6 +28,74 @@ class Settings(BaseSettings):
     # PLG Relay
     relay_api_key: str = "changeme-relay-key"
     relay_port: int = 443
+    # Keys the session token permutation; falls back to jwt_secret_key.
+    session_token_key: str = ""
+
+    # Relay API HTTP client (shared keep-alive pool)
+    relay_connect_timeout_seconds: float = 2.0
+    relay_read_timeout_seconds: float = 5.0
+    relay_total_timeout_seconds: float = 8.0
+    relay_pool_max_connections: int = 64
+    relay_pool_max_keepalive: int = 16
+    relay_keepalive_expiry_seconds: float = 60.0
+    # One deadline for registering/unregistering all legs of a session.
+    relay_registration_deadline_seconds: float = 3.0
+    # Shared with the relays (RELAY_TICKET_KEY); empty disables session tickets.
+    relay_ticket_key: str = ""
+    # Keep below the relays' memory of unregistered tokens (10 minutes), or a
+    # ticket could outlive it and re-admit an ended session.
+    relay_ticket_ttl_seconds: int = 120
+
+    # Relay outbox delivery (retries of relay API calls)
+    relay_outbox_poll_seconds: float = 1.0
+    relay_outbox_batch_size: int = 100
+    relay_outbox_max_attempts: int = 10
+    relay_outbox_backoff_base_seconds: float = 1.0
+    relay_outbox_backoff_max_seconds: float = 300.0
+    # DB ↔ relay session reconciliation
+    relay_reconcile_interval_seconds: float = 30.0
+    # Concurrent relay calls per node during admin bulk operations
+    admin_bulk_relay_concurrency: int = 8
+
+    # Relay health polling
+    node_health_interval_seconds: float = 10.0
+    node_health_timeout_seconds: float = 2.0
+    node_degrade_after_failures: int = 3
+    node_table_ttl_seconds: float = 5.0
+    node_capacity_reconcile_seconds: float = 60.0
+    # Deadline for one failover run off degraded relays (retried next poll)
+    node_failover_deadline_seconds: float = 30.0
+    # Node drain: sessions moved per batch, and how long the old relay keeps
+    # forwarding a moved session while its client switches over
+    node_drain_interval_seconds: float = 5.0
+    node_drain_batch_size: int = 500
+    node_drain_grace_seconds: float = 30.0
+
+    # Idempotency-Key replay window, and how long a duplicate waits for the original
+    idempotency_ttl_seconds: float = 86400.0
+    idempotency_lock_seconds: float = 30.0
+
+    # Stale-session reaper
+    session_idle_timeout_seconds: float = 300.0
+    session_reaper_interval_seconds: float = 60.0
+    session_reaper_batch_size: int = 1000
+    # Heartbeats: Redis first, flushed to Postgres in bulk
+    session_heartbeat_flush_seconds: float = 5.0
+    session_heartbeat_flush_batch_size: int = 5000
+    # How long a heartbeat for an unknown/foreign session is answered from Redis
+    session_heartbeat_miss_ttl_seconds: int = 60
+    # Server-sent event streams: frames buffered per slow client, idle keepalive
+    event_stream_buffer_size: int = 32
+    event_stream_keepalive_seconds: float = 20.0
+    # Lifetime of the URL token EventSource connects with; only checked on connect
+    event_stream_token_expire_seconds: int = 60
+    # Notify users this long before their subscription expires
+    subscription_expiry_notice_hours: float = 72.0
+    subscription_expiry_check_seconds: float = 3600.0
+
+    # Relay→game-server RTT matrix (reported by gateway agents)
+    node_rtt_max_age_seconds: float = 900.0
+    node_rtt_matrix_ttl_seconds: float = 30.0
 
     # DonatePay
     donatepay_api_key: str = ""
@@ -5,14 +5,44 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.database import engine
-from app.routers import admin_router, auth_router, billing_router, games_router, nodes_router, sessions_router, users_router
+from app.routers import admin_router, auth_router, billing_router, events_router, games_router, nodes_router, sessions_router, users_router
+from app.services.billing_service import subscription_expiry_notifier
+from app.services.node_capacity import capacity_reconciler
+from app.services.node_drain import node_drainer
+from app.services.node_health import node_health
+from app.services.relay_client import close_relay_http
+from app.services.relay_outbox import relay_outbox_worker
+from app.services.relay_reconcile import relay_reconciler
+from app.services.session_heartbeat import heartbeat_flusher
+from app.services.session_reaper import session_reaper
+from app.utils.events import event_hub
 from app.utils.metrics import MetricsMiddleware
 from app.utils.rate_limit import RateLimitMiddleware
+from app.utils.redis_pool import close_redis
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await node_health.start()
+    await capacity_reconciler.start()
+    await relay_outbox_worker.start()
+    await relay_reconciler.start()
+    await session_reaper.start()
+    await heartbeat_flusher.start()
+    await node_drainer.start()
+    await subscription_expiry_notifier.start()
     yield
+    await event_hub.stop()
+    await subscription_expiry_notifier.stop()
+    await node_drainer.stop()
+    await heartbeat_flusher.stop()
+    await session_reaper.stop()
+    await relay_reconciler.stop()
+    await relay_outbox_worker.stop()
+    await capacity_reconciler.stop()
+    await node_health.stop()
+    await close_relay_http()
+    await close_redis()
     await engine.dispose()
 
 
@@ -35,6 +65,7 @@ fastapi_app.add_middleware(
 fastapi_app.include_router(admin_router)
 fastapi_app.include_router(auth_router)
 fastapi_app.include_router(billing_router)
+fastapi_app.include_router(events_router)
 fastapi_app.include_router(games_router)
 fastapi_app.include_router(nodes_router)
 fastapi_app.include_router(sessions_router)
@@ -1,9 +1,12 @@
 from app.models.base import Base, BaseModel
 from app.models.game_profile import GameProfile
+from app.models.game_profile_tombstone import GameProfileTombstone
 from app.models.node import Node
+from app.models.node_game_rtt import NodeGameRtt
 from app.models.payment import Payment
 from app.models.promo_code import PromoCode
 from app.models.refresh_token import RefreshToken
+from app.models.relay_outbox import RelayOutbox
 from app.models.session import Session
 from app.models.subscription import Subscription
 from app.models.user import User
@@ -12,10 +15,13 @@ __all__ = [
     "Base",
     "BaseModel",
     "GameProfile",
+    "GameProfileTombstone",
     "Node",
+    "NodeGameRtt",
     "Payment",
     "PromoCode",
     "RefreshToken",
+    "RelayOutbox",
     "Session",
     "Subscription",
     "User",
@@ -1,10 +1,15 @@
 from typing import Optional
 
-from sqlalchemy import Boolean, String
-from sqlalchemy.dialects.postgresql import ARRAY
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import BigInteger, Boolean, Sequence, String
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
-from app.models.base import BaseModel
+from app.models.base import Base, BaseModel
+from app.utils.netranges import aggregate_cidrs, merge_port_ranges
+
+# Shared by game profiles and their tombstones so every catalog change gets a
+# strictly increasing version number.
+catalog_version_seq = Sequence("catalog_version_seq", metadata=Base.metadata)
 
 
 class GameProfile(BaseModel):
@@ -19,5 +24,24 @@ class GameProfile(BaseModel):
     category: Mapped[str] = mapped_column(String(50), default="fps")
     is_popular: Mapped[bool] = mapped_column(Boolean, default=False)
     icon_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True, default=None)
+    # Canonical forms, derived from server_ips/ports on every assignment.
+    normalized_server_ips: Mapped[list[str]] = mapped_column(ARRAY(String), default=list)
+    port_ranges: Mapped[list[list[int]]] = mapped_column(JSONB, default=list)
+    catalog_version: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=catalog_version_seq.next_value(),
+        onupdate=catalog_version_seq.next_value(),
+        index=True,
+    )
 
     sessions = relationship("Session", back_populates="game_profile", lazy="selectin")
+
+    @validates("server_ips")
+    def _normalize_server_ips(self, _key: str, value: list[str]) -> list[str]:
+        self.normalized_server_ips = aggregate_cidrs(value or [])
+        return value
+
+    @validates("ports")
+    def _normalize_ports(self, _key: str, value: list[str]) -> list[str]:
+        self.port_ranges = merge_port_ranges(value or [])
+        return value
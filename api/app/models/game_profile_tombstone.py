@@ -0,0 +1,21 @@
+import uuid
+
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import BaseModel
+from app.models.game_profile import catalog_version_seq
+
+
+class GameProfileTombstone(BaseModel):
+    """Marker left behind when a game profile is deleted, for catalog delta sync."""
+
+    __tablename__ = "game_profile_tombstones"
+
+    game_id: Mapped[uuid.UUID] = mapped_column(index=True)
+    slug: Mapped[str] = mapped_column(String(200))
+    catalog_version: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=catalog_version_seq.next_value(),
+        index=True,
+    )
@@ -0,0 +1,20 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, ForeignKey, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import BaseModel
+
+
+class NodeGameRtt(BaseModel):
+    """Latest relay→game-server RTT measured by a node's gateway agent, per CIDR."""
+
+    __tablename__ = "node_game_rtts"
+    __table_args__ = (UniqueConstraint("node_id", "cidr", name="uq_node_game_rtts_node_cidr"),)
+
+    node_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("nodes.id", ondelete="CASCADE"))
+    cidr: Mapped[str] = mapped_column(String(64))
+    rtt_ms: Mapped[float] = mapped_column(Float)
+    loss_pct: Mapped[float | None] = mapped_column(Float, nullable=True)
+    measured_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
@@ -0,0 +1,40 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.base import BaseModel
+
+
+class RelayOutbox(BaseModel):
+    """A relay API call owed for a session change, written in the same transaction.
+
+    ``status``: pending → delivered, superseded (a stop arrived before a
+    pending registration went out, or a drain or failover move gave up on
+    its target) or dead (gave up after max attempts).
+    """
+
+    __tablename__ = "relay_outbox"
+    __table_args__ = (
+        Index(
+            "ix_relay_outbox_due",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    session_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("sessions.id", ondelete="CASCADE"), index=True)
+    node_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("nodes.id", ondelete="CASCADE"))
+    action: Mapped[str] = mapped_column(String(20))  # register / unregister
+    session_token: Mapped[int] = mapped_column(Integer)
+    payload: Mapped[dict] = mapped_column(JSONB, default=dict)
+    status: Mapped[str] = mapped_column(String(20), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    delivered_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Not loaded; declared so the unit of work inserts the session row first.
+    session = relationship("Session", lazy="noload")
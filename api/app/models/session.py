@@ -1,19 +1,42 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Boolean, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, ForeignKey, Index, Integer, Sequence, String, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import BaseModel
 
+# Session token counter (see services/session_tokens.py). Workers reserve
+# TOKEN_BLOCK_SIZE values per nextval.
+TOKEN_BLOCK_SIZE = 64
+session_token_seq = Sequence("session_token_seq", start=1, increment=TOKEN_BLOCK_SIZE, metadata=BaseModel.metadata)
+
 
 class Session(BaseModel):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Per-node live load counts only look at active sessions.
+        Index("ix_sessions_node_active", "node_id", postgresql_where=text("status = 'active'")),
+        Index("ix_sessions_backup_node_active", "backup_node_id", postgresql_where=text("status = 'active'")),
+        # At most one active session per user; start_session upserts against it.
+        Index(
+            "ux_sessions_user_active", "user_id",
+            unique=True, postgresql_where=text("status = 'active'"),
+        ),
+        # No two active sessions may share a relay token.
+        Index(
+            "ux_sessions_token_active", "session_token",
+            unique=True, postgresql_where=text("status = 'active'"),
+        ),
+        # The stale-session reaper scans active sessions by last_seen_at.
+        Index("ix_sessions_active_last_seen", "last_seen_at", postgresql_where=text("status = 'active'")),
+    )
 
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"))
     node_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("nodes.id"))
     game_profile_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("game_profiles.id"))
-    session_token: Mapped[int] = mapped_column(Integer, index=True)
+    session_token: Mapped[int] = mapped_column(Integer)
     status: Mapped[str] = mapped_column(String(20), default="active")
     started_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=True
@@ -21,12 +44,23 @@ class Session(BaseModel):
     ended_at: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True), nullable=True
     )
+    # Last heartbeat or client traffic; the reaper expires sessions idle too
+    # long. NULL until the client's first heartbeat or traffic report.
+    last_seen_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
     bytes_sent: Mapped[int] = mapped_column(BigInteger, default=0)
     bytes_received: Mapped[int] = mapped_column(BigInteger, default=0)
+    # Last client→relay byte counter each relay reported, keyed by node id;
+    # liveness compares a relay against itself, not against the totals.
+    relay_bytes_sent: Mapped[dict] = mapped_column(JSONB, default=dict, server_default=text("'{}'::jsonb"))
     avg_ping: Mapped[float | None] = mapped_column(Float, nullable=True)
     packet_loss: Mapped[float | None] = mapped_column(Float, nullable=True)
     backup_node_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("nodes.id"), nullable=True)
     multipath_enabled: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Outcome of the last relay API call per leg: registered / unregistered / failed / timeout
+    relay_status: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    backup_relay_status: Mapped[str | None] = mapped_column(String(20), nullable=True)
 
     user = relationship("User", back_populates="sessions")
     node = relationship("Node", foreign_keys=[node_id], back_populates="sessions")
@@ -1,6 +1,7 @@
 from app.routers.admin import router as admin_router
 from app.routers.auth import router as auth_router
 from app.routers.billing import router as billing_router
+from app.routers.events import router as events_router
 from app.routers.games import router as games_router
 from app.routers.nodes import router as nodes_router
 from app.routers.sessions import router as sessions_router
@@ -10,6 +11,7 @@ __all__ = [
     "admin_router",
     "auth_router",
     "billing_router",
+    "events_router",
     "games_router",
     "nodes_router",
     "sessions_router",
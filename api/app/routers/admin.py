@@ -5,6 +5,7 @@ from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
 
 from app.database import get_db
 from app.models.game_profile import GameProfile
@@ -15,10 +16,13 @@ from app.models.session import Session
 from app.models.subscription import Subscription
 from app.models.user import User
 from app.schemas.admin import (
+    AdminBulkStopRequest,
+    AdminBulkStopResponse,
     AdminGameCreate,
     AdminGameResponse,
     AdminGameUpdate,
     AdminNodeCreate,
+    AdminNodeDrainProgress,
     AdminNodeResponse,
     AdminNodeUpdate,
     AdminPaymentResponse,
@@ -31,8 +35,17 @@ from app.schemas.admin import (
     AdminSubscriptionUpdate,
     AdminUserResponse,
     AdminUserUpdate,
+    GameNormalizationItem,
+    GameNormalizationReport,
     PaginatedList,
 )
+from app.services.catalog_service import lock_catalog, record_game_deletion
+from app.services.node_capacity import release
+from app.services.node_drain import cancel_drain, get_drain_progress, start_drain
+from app.services.node_service import invalidate_node_table
+from app.services.relay_outbox import enqueue_unregister
+from app.services.session_heartbeat import forget_sessions
+from app.services.session_service import bulk_stop_sessions
 from app.utils.dependencies import get_admin_user
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -178,6 +191,7 @@ async def create_node(
     node = Node(**body.model_dump())
     db.add(node)
     await db.commit()
+    invalidate_node_table()
     await db.refresh(node)
     return AdminNodeResponse.model_validate(node)
 
@@ -198,6 +212,7 @@ async def update_node(
         setattr(node, field, value)
 
     await db.commit()
+    invalidate_node_table()
     await db.refresh(node)
     return AdminNodeResponse.model_validate(node)
 
@@ -213,12 +228,58 @@ async def delete_node(
     if not node:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Node not found")
 
-    node.status = "inactive"
-    await db.commit()
+    # Nodes still carrying sessions are drained first and go inactive when empty.
+    if node.status != "inactive":
+        await start_drain(db, node)
+    await db.refresh(node)
+    return AdminNodeResponse.model_validate(node)
+
+
+@router.post("/nodes/{node_id}/drain", response_model=AdminNodeDrainProgress, status_code=status.HTTP_202_ACCEPTED)
+async def drain_node(
+    node_id: uuid.UUID,
+    _admin: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    node = await _get_node(db, node_id)
+    if node.status == "inactive":
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Node is inactive")
+    if node.status == "draining":
+        return await get_drain_progress(db, node)
+    return await start_drain(db, node)
+
+
+@router.get("/nodes/{node_id}/drain", response_model=AdminNodeDrainProgress)
+async def node_drain_progress(
+    node_id: uuid.UUID,
+    _admin: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await get_drain_progress(db, await _get_node(db, node_id))
+
+
+@router.delete("/nodes/{node_id}/drain", response_model=AdminNodeResponse)
+async def cancel_node_drain(
+    node_id: uuid.UUID,
+    _admin: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    node = await _get_node(db, node_id)
+    if node.status != "draining":
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Node is not draining")
+    await cancel_drain(db, node)
     await db.refresh(node)
     return AdminNodeResponse.model_validate(node)
 
 
+async def _get_node(db: AsyncSession, node_id: uuid.UUID) -> Node:
+    result = await db.execute(select(Node).options(noload(Node.sessions)).where(Node.id == node_id))
+    node = result.scalar_one_or_none()
+    if not node:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Node not found")
+    return node
+
+
 # ──────────────── Games ────────────────
 
 
@@ -232,6 +293,48 @@ async def list_games(
     return [AdminGameResponse.model_validate(g) for g in games]
 
 
+@router.get("/games/normalization-report", response_model=GameNormalizationReport)
+async def game_normalization_report(
+    only_shrunk: bool = True,
+    _admin: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """How much CIDR aggregation and port merging shrinks each profile's filter."""
+    result = await db.execute(
+        select(GameProfile).options(noload(GameProfile.sessions)).order_by(GameProfile.name)
+    )
+    games = result.scalars().all()
+
+    items = []
+    clauses_before = clauses_after = 0
+    for g in games:
+        before = len(g.server_ips) + len(g.ports)
+        after = len(g.normalized_server_ips) + len(g.port_ranges)
+        clauses_before += before
+        clauses_after += after
+        if only_shrunk and after >= before:
+            continue
+        items.append(GameNormalizationItem(
+            id=g.id,
+            slug=g.slug,
+            cidrs_before=len(g.server_ips),
+            cidrs_after=len(g.normalized_server_ips),
+            ports_before=len(g.ports),
+            ports_after=len(g.port_ranges),
+            clauses_saved=before - after,
+            reduction_pct=round(100 * (before - after) / before, 1) if before else 0.0,
+        ))
+    items.sort(key=lambda i: (-i.clauses_saved, i.slug))
+
+    return GameNormalizationReport(
+        items=items,
+        profiles_total=len(games),
+        profiles_shrunk=sum(1 for i in items if i.clauses_saved > 0),
+        clauses_before=clauses_before,
+        clauses_after=clauses_after,
+    )
+
+
 @router.post("/games", response_model=AdminGameResponse, status_code=status.HTTP_201_CREATED)
 async def create_game(
     body: AdminGameCreate,
@@ -244,7 +347,11 @@ async def create_game(
     if existing.scalar_one_or_none():
         raise HTTPException(status.HTTP_409_CONFLICT, "Game with this slug already exists")
 
-    game = GameProfile(**body.model_dump())
+    await lock_catalog(db)
+    try:
+        game = GameProfile(**body.model_dump())
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
     db.add(game)
     await db.commit()
     await db.refresh(game)
@@ -263,8 +370,12 @@ async def update_game(
     if not game:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Game not found")
 
-    for field, value in body.model_dump(exclude_unset=True).items():
-        setattr(game, field, value)
+    await lock_catalog(db)
+    try:
+        for field, value in body.model_dump(exclude_unset=True).items():
+            setattr(game, field, value)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
 
     await db.commit()
     await db.refresh(game)
@@ -282,6 +393,8 @@ async def delete_game(
     if not game:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Game not found")
 
+    await lock_catalog(db)
+    record_game_deletion(db, game)
     await db.delete(game)
     await db.commit()
 
@@ -325,6 +438,18 @@ async def list_sessions(
     )
 
 
+@router.post("/sessions/bulk-stop", response_model=AdminBulkStopResponse)
+async def bulk_stop(
+    body: AdminBulkStopRequest,
+    _admin: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db),
+):
+    filters = (body.node_id, body.game_profile_id, body.user_id, body.older_than_minutes)
+    if all(f is None for f in filters):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "At least one filter is required")
+    return await bulk_stop_sessions(db, body)
+
+
 @router.get("/sessions/{session_id}", response_model=AdminSessionResponse)
 async def get_session(
     session_id: uuid.UUID,
@@ -353,8 +478,13 @@ async def stop_session(
 
     session.status = "stopped"
     session.ended_at = datetime.now(timezone.utc)
+    await enqueue_unregister(
+        db, session, [n for n in (session.node_id, session.backup_node_id) if n], inline=False,
+    )
     await db.commit()
     await db.refresh(session)
+    await release([session.node_id, session.backup_node_id])
+    await forget_sessions([session.id])
     return AdminSessionResponse.model_validate(session)
 
 
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
@@ -16,6 +16,7 @@ from app.schemas.billing import (
 )
 from app.services import billing_service
 from app.utils.dependencies import get_current_user
+from app.utils.idempotency import run_idempotent
 
 router = APIRouter(prefix="/api/billing", tags=["billing"])
 
@@ -30,7 +31,15 @@ async def subscribe(
     body: CreatePaymentRequest,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
 ):
+    return await run_idempotent(
+        "billing.subscribe", str(user.id), idempotency_key, body,
+        lambda: _subscribe(body, user, db),
+    )
+
+
+async def _subscribe(body: CreatePaymentRequest, user: User, db: AsyncSession) -> PaymentLinkResponse:
     try:
         payment, payment_url = await billing_service.create_payment_link(
             db, user, body.plan, promo_code=body.promo_code
@@ -0,0 +1,97 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+from app.schemas.auth import StreamTokenResponse
+from app.services.auth_service import create_stream_token, decode_access_token, decode_stream_token
+from app.utils.dependencies import get_current_user_id
+from app.utils.events import event_hub
+
+router = APIRouter(prefix="/api/events", tags=["events"])
+
+optional_bearer = HTTPBearer(auto_error=False)
+
+
+async def get_stream_user_id(
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_bearer),
+    stream_token: str | None = Query(None),
+) -> str:
+    """Like ``get_current_user_id``, but browsers' EventSource can only pass a token in the URL.
+
+    URLs end up in access logs, so the query parameter takes a stream token
+    from ``POST /api/events/stream-token`` rather than the access token.
+    """
+    if credentials:
+        payload = decode_access_token(credentials.credentials)
+    else:
+        payload = decode_stream_token(stream_token) if stream_token else None
+    if payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+        )
+    return payload["sub"]
+
+
+class EventStreamResponse(Response):
+    """Server-sent events for one user, fed by the worker's event hub.
+
+    Written against raw ASGI rather than ``StreamingResponse`` to keep an
+    idle stream down to this coroutine, its subscriber and one task waiting
+    for the client to disconnect.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.status_code = status.HTTP_200_OK
+        self.background = None
+        self.raw_headers = [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            # Tell nginx not to buffer the stream.
+            (b"x-accel-buffering", b"no"),
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        subscriber = event_hub.subscribe(self.user_id)
+
+        async def watch_disconnect() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        watcher.add_done_callback(lambda _: subscriber.close())
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"retry: 5000\n\n", "more_body": True})
+            while not subscriber.closed:
+                frames = await subscriber.wait(settings.event_stream_keepalive_seconds)
+                if subscriber.closed:
+                    break
+                # Comment lines keep proxies from timing out an idle stream.
+                body = b"".join(frames) if frames else b": keepalive\n\n"
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        finally:
+            watcher.cancel()
+            event_hub.unsubscribe(subscriber)
+
+
+@router.post("/stream-token", response_model=StreamTokenResponse)
+async def issue_stream_token(user_id: str = Depends(get_current_user_id)):
+    """Short-lived token for opening the event stream from a browser."""
+    return StreamTokenResponse(
+        stream_token=create_stream_token(user_id),
+        expires_in=settings.event_stream_token_expire_seconds,
+    )
+
+
+@router.get("/stream")
+async def event_stream(user_id: str = Depends(get_stream_user_id)):
+    """Push channel for session, node and subscription events (text/event-stream)."""
+    return EventStreamResponse(user_id)
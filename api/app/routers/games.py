@@ -1,14 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.game_profile import GameProfile
-from app.schemas.game import GameListResponse, GameProfileResponse
+from app.schemas.game import (
+    CatalogSyncResponse,
+    DetectedGame,
+    DetectRequest,
+    DetectResponse,
+    GameListResponse,
+    GameProfileResponse,
+)
+from app.services.catalog_service import CATALOG_MEDIA_TYPES, get_catalog_snapshot
 
 router = APIRouter(prefix="/api/games", tags=["games"])
 
 
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip (an explicit q=0 refuses it)."""
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding.lower()] = weight
+    weight = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0)))
+    return weight > 0
+
+
 @router.get("", response_model=GameListResponse)
 async def list_games(
     category: str | None = None,
@@ -34,18 +61,60 @@ async def list_games(
 @router.get("/search", response_model=GameListResponse)
 async def search_games(
     q: str = Query(min_length=1, max_length=100),
+    limit: int | None = Query(None, ge=1, le=50),
     db: AsyncSession = Depends(get_db),
 ):
-    query = select(GameProfile).where(
-        func.lower(GameProfile.name).contains(q.lower())
-    ).order_by(GameProfile.name)
+    """Ranked, typo-tolerant search over name, slug and exe names."""
+    snapshot = await get_catalog_snapshot(db)
+    games = snapshot.search_index.search(q, limit)
+    return GameListResponse(items=games, total=len(games))
 
-    result = await db.execute(query)
-    games = result.scalars().all()
 
-    return GameListResponse(
-        items=[GameProfileResponse.model_validate(g) for g in games],
-        total=len(games),
+@router.get("/catalog", responses={200: {"model": CatalogSyncResponse}})
+async def get_catalog(
+    request: Request,
+    since: int = Query(0, ge=0),
+    fmt: str = Query("json", alias="format", pattern=r"^(json|msgpack)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Full catalog (since=0) or the games changed/removed after version `since`."""
+    snapshot = await get_catalog_snapshot(db)
+    compressed = _accepts_gzip(request.headers.get("accept-encoding", ""))
+    # Strong ETags name exact bytes, so the gzip body needs its own.
+    etag = f'"{snapshot.version}-{since}-{fmt}{"-gz" if compressed else ""}"'
+    headers = {
+        "ETag": etag,
+        "X-Catalog-Version": str(snapshot.version),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if compressed:
+        headers["Content-Encoding"] = "gzip"
+    return Response(
+        content=snapshot.encode(since, fmt, compressed),
+        media_type=CATALOG_MEDIA_TYPES[fmt],
+        headers=headers,
+    )
+
+
+@router.post("/detect", response_model=DetectResponse)
+async def detect_games(body: DetectRequest, db: AsyncSession = Depends(get_db)):
+    """Match a batch of running process names to game profiles."""
+    snapshot = await get_catalog_snapshot(db)
+    return DetectResponse(
+        catalog_version=snapshot.version,
+        matches=[
+            DetectedGame(
+                process_name=name,
+                game=game,
+                capture_filter=snapshot.capture_filters[game.id][0],
+                capture_filter_version=snapshot.capture_filters[game.id][1],
+            )
+            for name, game in snapshot.match_processes(body.process_names)
+        ],
     )
 
 
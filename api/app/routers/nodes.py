@@ -1,26 +1,129 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.node import Node
-from app.schemas.node import NodePingResponse, NodeResponse
-from app.services.node_service import get_node_ping
+from app.schemas.node import (
+    GameRttReport,
+    GameRttReportResponse,
+    NodePingResponse,
+    NodeRecommendation,
+    NodeResponse,
+    PathEstimate,
+    PathRecommendRequest,
+    RttTargetsResponse,
+)
+from app.schemas.session import SessionTrafficReport, SessionTrafficReportResponse
+from app.services.node_health import NodeStatus, node_health
+from app.services.node_service import recommend_nodes, with_live_counts
+from app.services.path_latency import recommend_paths, rtt_targets, store_rtt_samples
+from app.services.session_telemetry import apply_traffic_samples
+from app.utils.dependencies import verify_relay_api_key
 
 router = APIRouter(prefix="/api/nodes", tags=["nodes"])
 
 
+def _with_health(entry: NodeStatus) -> NodeResponse:
+    return entry.node.model_copy(update={
+        "latency_ms": entry.latency_ms,
+        "relay_active_sessions": entry.active_sessions,
+        "uptime_secs": entry.uptime_secs,
+    })
+
+
 @router.get("", response_model=list[NodeResponse])
 async def list_nodes(db: AsyncSession = Depends(get_db)):
+    if node_health.last_poll is not None:
+        entries = [e for e in node_health.statuses() if e.node.status == "active"]
+        entries.sort(key=lambda e: e.node.location)
+        return await with_live_counts([_with_health(e) for e in entries])
+
+    # Health monitor not running (or not polled yet): plain DB listing.
     result = await db.execute(
         select(Node).where(Node.status == "active").order_by(Node.location)
     )
     nodes = result.scalars().all()
-    return [NodeResponse.model_validate(n) for n in nodes]
+    return await with_live_counts([NodeResponse.model_validate(n) for n in nodes])
+
+
+@router.get("/recommend", response_model=list[NodeRecommendation])
+async def recommend(
+    location: str | None = Query(None, max_length=10),
+    limit: int = Query(5, ge=1, le=20),
+    db: AsyncSession = Depends(get_db),
+):
+    """Nodes with spare capacity, best first (load headroom, health, probe freshness)."""
+    return await recommend_nodes(db, location=location, limit=limit)
+
+
+@router.post("/recommend/path", response_model=list[PathEstimate])
+async def recommend_path(body: PathRecommendRequest, db: AsyncSession = Depends(get_db)):
+    """Nodes ranked by estimated client→relay→game-server RTT for one game."""
+    try:
+        return await recommend_paths(db, body.game_slug, body.node_pings)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.get(
+    "/rtt-targets",
+    response_model=RttTargetsResponse,
+    dependencies=[Depends(verify_relay_api_key)],
+)
+async def get_rtt_targets(db: AsyncSession = Depends(get_db)):
+    """Game CIDRs gateway agents should measure RTT to."""
+    return RttTargetsResponse(cidrs=await rtt_targets(db))
+
+
+@router.put(
+    "/{node_id}/game-rtt",
+    response_model=GameRttReportResponse,
+    dependencies=[Depends(verify_relay_api_key)],
+)
+async def report_game_rtt(
+    node_id: uuid.UUID,
+    body: GameRttReport,
+    db: AsyncSession = Depends(get_db),
+):
+    """Gateway agent report of its relay's RTT to game CIDRs."""
+    result = await db.execute(select(Node.id).where(Node.id == node_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Node not found")
+    try:
+        accepted = await store_rtt_samples(db, node_id, body.samples)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return GameRttReportResponse(accepted=accepted)
+
+
+@router.post(
+    "/{node_id}/session-traffic",
+    response_model=SessionTrafficReportResponse,
+    dependencies=[Depends(verify_relay_api_key)],
+)
+async def report_session_traffic(
+    node_id: uuid.UUID,
+    body: SessionTrafficReport,
+    db: AsyncSession = Depends(get_db),
+):
+    """Batched per-session traffic counters scraped from the node's relay."""
+    updated = await apply_traffic_samples(db, node_id, body.samples)
+    return SessionTrafficReportResponse(updated=updated)
 
 
 @router.get("/{node_id}/ping", response_model=NodePingResponse)
-async def ping_node(node_id: str, db: AsyncSession = Depends(get_db)):
+async def ping_node(node_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    entry = node_health.get(node_id)
+    if entry is not None:
+        if entry.reachable is None:
+            node_status = "unknown"
+        else:
+            node_status = "ok" if entry.reachable else "unreachable"
+        return NodePingResponse(node_id=node_id, ping_ms=entry.latency_ms, status=node_status)
+
     result = await db.execute(select(Node).where(Node.id == node_id))
     node = result.scalar_one_or_none()
     if node is None:
@@ -28,10 +131,8 @@ async def ping_node(node_id: str, db: AsyncSession = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Node not found",
         )
-
-    ping_ms = await get_node_ping(node.ip_address, node.relay_api_port)
     return NodePingResponse(
         node_id=node.id,
-        ping_ms=ping_ms,
-        status="ok" if ping_ms is not None else "unreachable",
+        ping_ms=None,
+        status="degraded" if node.status == "degraded" else "unknown",
     )
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import uuid
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -6,13 +8,18 @@ from app.database import get_db
 from app.models.session import Session
 from app.models.user import User
 from app.schemas.session import (
+    SessionHeartbeatRequest,
     SessionHistoryItem,
     SessionStartRequest,
     SessionStartResponse,
     SessionStopResponse,
 )
+from app.services.catalog_service import get_catalog_snapshot
+from app.services.relay_tickets import issue_ticket, tickets_enabled
+from app.services.session_heartbeat import heartbeat_from_db, record_heartbeat
 from app.services.session_service import start_session, stop_session
-from app.utils.dependencies import get_current_user, get_subscribed_user
+from app.utils.dependencies import get_current_user, get_current_user_id, get_subscribed_user
+from app.utils.idempotency import run_idempotent
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
@@ -22,7 +29,17 @@ async def create_session(
     body: SessionStartRequest,
     user: User = Depends(get_subscribed_user),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
 ):
+    return await run_idempotent(
+        "sessions.start", str(user.id), idempotency_key, body,
+        lambda: _start(body, user, db),
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+async def _start(body: SessionStartRequest, user: User, db: AsyncSession) -> SessionStartResponse:
+    ticketed = body.relay_ticket and tickets_enabled()
     try:
         session = await start_session(
             db=db,
@@ -30,6 +47,7 @@ async def create_session(
             game_slug=body.game_slug,
             node_id=str(body.node_id),
             multipath=body.multipath,
+            defer_registration=ticketed,
         )
     except ValueError as e:
         raise HTTPException(
@@ -46,6 +64,8 @@ async def create_session(
     # Load game profile for server IPs/ports
     game_result = await db.execute(select(GameProfile).where(GameProfile.id == session.game_profile_id))
     game = game_result.scalar_one()
+    snapshot = await get_catalog_snapshot(db)
+    capture_filter, filter_version = snapshot.capture_filters.get(game.id, (None, None))
 
     # Load backup node if multipath
     backup_node_ip = None
@@ -57,6 +77,8 @@ async def create_session(
             backup_node_ip = backup_node.ip_address
             backup_node_port = backup_node.relay_port
 
+    ticket = issue_ticket(session.node_id, session.session_token, game) if ticketed else None
+
     return SessionStartResponse(
         session_id=session.id,
         session_token=session.session_token,
@@ -68,6 +90,12 @@ async def create_session(
         status=session.status,
         game_server_ips=game.server_ips or [],
         game_ports=game.ports or [],
+        capture_filter=capture_filter,
+        capture_filter_version=filter_version,
+        relay_status=session.relay_status,
+        backup_relay_status=session.backup_relay_status,
+        relay_ticket=ticket[0] if ticket else None,
+        relay_ticket_expires_at=ticket[1] if ticket else None,
     )
 
 
@@ -98,6 +126,26 @@ async def end_session(
     )
 
 
+@router.post("/{session_id}/heartbeat", status_code=status.HTTP_204_NO_CONTENT)
+async def session_heartbeat(
+    session_id: uuid.UUID,
+    body: SessionHeartbeatRequest | None = None,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """Client liveness ping; recorded in Redis and flushed to the DB in bulk."""
+    body = body or SessionHeartbeatRequest()
+    recorded = await record_heartbeat(session_id, user_id, body.rtt_ms, body.packet_loss)
+    if recorded is None:
+        recorded = await heartbeat_from_db(db, session_id, user_id)
+    if not recorded:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Active session not found",
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @router.get("/history", response_model=list[SessionHistoryItem])
 async def session_history(
     user: User = Depends(get_current_user),
@@ -1,8 +1,12 @@
 from app.schemas.admin import (
+    AdminBulkStopNodeSummary,
+    AdminBulkStopRequest,
+    AdminBulkStopResponse,
     AdminGameCreate,
     AdminGameResponse,
     AdminGameUpdate,
     AdminNodeCreate,
+    AdminNodeDrainProgress,
     AdminNodeResponse,
     AdminNodeUpdate,
     AdminPaymentResponse,
@@ -15,6 +19,8 @@ from app.schemas.admin import (
     AdminSubscriptionUpdate,
     AdminUserResponse,
     AdminUserUpdate,
+    GameNormalizationItem,
+    GameNormalizationReport,
     PaginatedList,
 )
 from app.schemas.auth import LoginRequest, RefreshRequest, RegisterRequest, TokenResponse
@@ -28,21 +34,47 @@ from app.schemas.billing import (
     SubscriptionResponse,
     WebhookPayload,
 )
-from app.schemas.game import GameListResponse, GameProfileResponse
-from app.schemas.node import NodePingResponse, NodeResponse
+from app.schemas.game import (
+    CatalogSyncResponse,
+    DetectedGame,
+    DetectRequest,
+    DetectResponse,
+    GameListResponse,
+    GameProfileResponse,
+)
+from app.schemas.node import (
+    GameRttReport,
+    GameRttReportResponse,
+    GameRttSample,
+    NodePingResponse,
+    NodeRecommendation,
+    NodeRecord,
+    NodeResponse,
+    PathEstimate,
+    PathRecommendRequest,
+    RttTargetsResponse,
+)
 from app.schemas.session import (
+    SessionHeartbeatRequest,
     SessionHistoryItem,
     SessionStartRequest,
     SessionStartResponse,
     SessionStopResponse,
+    SessionTrafficReport,
+    SessionTrafficReportResponse,
+    SessionTrafficSample,
 )
 from app.schemas.user import UserResponse, UserStats
 
 __all__ = [
+    "AdminBulkStopNodeSummary",
+    "AdminBulkStopRequest",
+    "AdminBulkStopResponse",
     "AdminGameCreate",
     "AdminGameResponse",
     "AdminGameUpdate",
     "AdminNodeCreate",
+    "AdminNodeDrainProgress",
     "AdminNodeResponse",
     "AdminNodeUpdate",
     "AdminPaymentResponse",
@@ -55,6 +87,8 @@ __all__ = [
     "AdminSubscriptionUpdate",
     "AdminUserResponse",
     "AdminUserUpdate",
+    "GameNormalizationItem",
+    "GameNormalizationReport",
     "PaginatedList",
     "LoginRequest",
     "RefreshRequest",
@@ -68,14 +102,30 @@ __all__ = [
     "PromoCheckResponse",
     "SubscriptionResponse",
     "WebhookPayload",
+    "CatalogSyncResponse",
+    "DetectedGame",
+    "DetectRequest",
+    "DetectResponse",
     "GameListResponse",
     "GameProfileResponse",
+    "GameRttReport",
+    "GameRttReportResponse",
+    "GameRttSample",
     "NodePingResponse",
+    "NodeRecommendation",
+    "NodeRecord",
     "NodeResponse",
+    "PathEstimate",
+    "PathRecommendRequest",
+    "RttTargetsResponse",
+    "SessionHeartbeatRequest",
     "SessionHistoryItem",
     "SessionStartRequest",
     "SessionStartResponse",
     "SessionStopResponse",
+    "SessionTrafficReport",
+    "SessionTrafficReportResponse",
+    "SessionTrafficSample",
     "UserResponse",
     "UserStats",
 ]
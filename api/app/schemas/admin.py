@@ -3,7 +3,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Generic, TypeVar
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 T = TypeVar("T")
 
@@ -79,6 +79,19 @@ class AdminNodeUpdate(BaseModel):
     relay_api_port: int | None = None
 
 
+class AdminNodeDrainProgress(BaseModel):
+    node_id: uuid.UUID
+    status: str
+    # Session legs on the node when the drain started, and still there now.
+    total: int | None = None
+    remaining: int
+    migrated: int = 0
+    # Move attempts that failed (no capacity or relay error); retried.
+    failed: int = 0
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
 # --- Games ---
 
 class AdminGameResponse(BaseModel):
@@ -88,6 +101,8 @@ class AdminGameResponse(BaseModel):
     exe_names: list[str]
     server_ips: list[str]
     ports: list[str]
+    normalized_server_ips: list[str] = []
+    port_ranges: list[tuple[int, int]] = []
     protocol: str
     category: str
     is_popular: bool
@@ -119,6 +134,25 @@ class AdminGameUpdate(BaseModel):
     is_popular: bool | None = None
 
 
+class GameNormalizationItem(BaseModel):
+    id: uuid.UUID
+    slug: str
+    cidrs_before: int
+    cidrs_after: int
+    ports_before: int
+    ports_after: int
+    clauses_saved: int
+    reduction_pct: float
+
+
+class GameNormalizationReport(BaseModel):
+    items: list[GameNormalizationItem]
+    profiles_total: int
+    profiles_shrunk: int
+    clauses_before: int
+    clauses_after: int
+
+
 # --- Sessions ---
 
 class AdminSessionResponse(BaseModel):
@@ -130,12 +164,15 @@ class AdminSessionResponse(BaseModel):
     status: str
     started_at: datetime | None
     ended_at: datetime | None
+    last_seen_at: datetime | None = None
     bytes_sent: int
     bytes_received: int
     avg_ping: float | None
     packet_loss: float | None
     backup_node_id: uuid.UUID | None = None
     multipath_enabled: bool = False
+    relay_status: str | None = None
+    backup_relay_status: str | None = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
@@ -143,6 +180,36 @@ class AdminSessionResponse(BaseModel):
 
 # --- Subscriptions ---
 
+class AdminBulkStopRequest(BaseModel):
+    """Stop all active sessions matching every given filter (at least one)."""
+    node_id: uuid.UUID | None = None
+    game_profile_id: uuid.UUID | None = None
+    user_id: uuid.UUID | None = None
+    older_than_minutes: int | None = Field(None, ge=0)
+    dry_run: bool = False
+
+
+class AdminBulkStopNodeSummary(BaseModel):
+    node_id: uuid.UUID
+    legs: int = 0
+    unregistered: int = 0
+    failed: int = 0
+    pending: int = 0
+
+
+class AdminBulkStopResponse(BaseModel):
+    dry_run: bool = False
+    matched: int
+    stopped: int = 0
+    # Relay legs unregistered now; failed ones, and ones still pending at the
+    # deadline, are retried by the outbox worker.
+    unregistered: int = 0
+    failed: int = 0
+    pending: int = 0
+    nodes: list[AdminBulkStopNodeSummary] = []
+    elapsed_ms: int
+
+
 class AdminSubscriptionResponse(BaseModel):
     id: uuid.UUID
     user_id: uuid.UUID
@@ -20,3 +20,8 @@ class TokenResponse(BaseModel):
     access_token: str
     refresh_token: str
     token_type: str = "bearer"
+
+
+class StreamTokenResponse(BaseModel):
+    stream_token: str
+    expires_in: int
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class GameProfileResponse(BaseModel):
@@ -11,6 +11,8 @@ class GameProfileResponse(BaseModel):
     exe_names: list[str]
     server_ips: list[str]
     ports: list[str]
+    normalized_server_ips: list[str] = []
+    port_ranges: list[tuple[int, int]] = []
     protocol: str
     category: str
     is_popular: bool
@@ -23,3 +25,27 @@ class GameProfileResponse(BaseModel):
 class GameListResponse(BaseModel):
     items: list[GameProfileResponse]
     total: int
+
+
+class CatalogSyncResponse(BaseModel):
+    version: int
+    since: int = 0
+    full: bool
+    games: list[GameProfileResponse]
+    removed: list[uuid.UUID] = []
+
+
+class DetectRequest(BaseModel):
+    process_names: list[str] = Field(max_length=4096)
+
+
+class DetectedGame(BaseModel):
+    process_name: str
+    game: GameProfileResponse
+    capture_filter: str | None = None
+    capture_filter_version: str | None = None
+
+
+class DetectResponse(BaseModel):
+    catalog_version: int
+    matches: list[DetectedGame]
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class NodeResponse(BaseModel):
@@ -15,11 +15,54 @@ class NodeResponse(BaseModel):
     max_sessions: int
     relay_port: int
     created_at: datetime
+    latency_ms: float | None = None
+    relay_active_sessions: int | None = None
+    uptime_secs: int | None = None
 
     model_config = {"from_attributes": True}
 
 
+class NodeRecord(NodeResponse):
+    """Cached node row for internal selection; carries the relay control port."""
+
+    relay_api_port: int
+
+
+class NodeRecommendation(NodeResponse):
+    score: float
+
+
 class NodePingResponse(BaseModel):
     node_id: uuid.UUID
     ping_ms: float | None
     status: str
+
+
+class GameRttSample(BaseModel):
+    cidr: str
+    rtt_ms: float = Field(ge=0)
+    loss_pct: float | None = Field(None, ge=0, le=100)
+
+
+class GameRttReport(BaseModel):
+    samples: list[GameRttSample] = Field(max_length=4096)
+
+
+class GameRttReportResponse(BaseModel):
+    accepted: int
+
+
+class RttTargetsResponse(BaseModel):
+    cidrs: list[str]
+
+
+class PathRecommendRequest(BaseModel):
+    game_slug: str
+    # Client-measured RTT to each node it pinged, in ms.
+    node_pings: dict[uuid.UUID, float] = Field(default_factory=dict, max_length=256)
+
+
+class PathEstimate(NodeRecommendation):
+    client_rtt_ms: float | None = None
+    server_rtt_ms: float | None = None
+    total_rtt_ms: float | None = None
@@ -1,13 +1,15 @@
 import uuid
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class SessionStartRequest(BaseModel):
     game_slug: str
     node_id: uuid.UUID
     multipath: bool = False
+    # Ask for a signed ticket the relays accept on first contact.
+    relay_ticket: bool = False
 
 
 class SessionStartResponse(BaseModel):
@@ -21,6 +23,12 @@ class SessionStartResponse(BaseModel):
     status: str
     game_server_ips: list[str] = []
     game_ports: list[str] = []
+    capture_filter: str | None = None
+    capture_filter_version: str | None = None
+    relay_status: str | None = None
+    backup_relay_status: str | None = None
+    relay_ticket: str | None = None
+    relay_ticket_expires_at: datetime | None = None
 
 
 class SessionStopRequest(BaseModel):
@@ -35,6 +43,12 @@ class SessionStopResponse(BaseModel):
     bytes_received: int
 
 
+class SessionHeartbeatRequest(BaseModel):
+    """Optional client-measured quality since the previous heartbeat."""
+    rtt_ms: float | None = Field(None, ge=0)
+    packet_loss: float | None = Field(None, ge=0, le=100)
+
+
 class SessionHistoryItem(BaseModel):
     id: uuid.UUID
     game_name: str
@@ -48,3 +62,20 @@ class SessionHistoryItem(BaseModel):
     multipath_enabled: bool = False
 
     model_config = {"from_attributes": True}
+
+
+class SessionTrafficSample(BaseModel):
+    """Cumulative relay counters for one session (relay bytes_in/bytes_out)."""
+    session_token: int
+    bytes_sent: int = Field(ge=0)
+    bytes_received: int = Field(ge=0)
+    avg_ping: float | None = Field(None, ge=0)
+    packet_loss: float | None = Field(None, ge=0, le=100)
+
+
+class SessionTrafficReport(BaseModel):
+    samples: list[SessionTrafficSample] = Field(max_length=20000)
+
+
+class SessionTrafficReportResponse(BaseModel):
+    updated: int
@@ -42,6 +42,25 @@ def decode_access_token(token: str) -> dict | None:
         return None
 
 
+def create_stream_token(user_id: str) -> str:
+    """Short-lived token that only opens the event stream, safe to put in a URL."""
+    expire = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.event_stream_token_expire_seconds
+    )
+    payload = {"sub": user_id, "exp": expire, "type": "stream"}
+    return jwt.encode(payload, settings.jwt_secret_key, algorithm=ALGORITHM)
+
+
+def decode_stream_token(token: str) -> dict | None:
+    try:
+        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[ALGORITHM])
+        if payload.get("type") != "stream":
+            return None
+        return payload
+    except JWTError:
+        return None
+
+
 def create_refresh_token_value() -> str:
     return secrets.token_urlsafe(64)
 
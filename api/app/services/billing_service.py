@@ -5,15 +5,22 @@ from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from urllib.parse import quote
 
+from redis.exceptions import RedisError
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.config import settings
+from app.database import async_session
 from app.models.payment import Payment
 from app.models.promo_code import PromoCode
 from app.models.subscription import Subscription
 from app.models.user import User
 from app.schemas.billing import PlanInfo
+from app.utils.events import publish_events
+from app.utils.periodic import PeriodicTask
+from app.utils.redis_pool import get_redis
+
+EXPIRY_NOTICE_PREFIX = "plg:notified:expiring:"
 
 PLANS: dict[str, PlanInfo] = {
     "trial": PlanInfo(
@@ -292,3 +299,42 @@ async def get_payment_history(
         .limit(50)
     )
     return list(result.scalars().all())
+
+
+async def notify_expiring_subscriptions(session_factory: async_sessionmaker = async_session) -> int:
+    """Send ``subscription.expiring`` once per user and expiry date; returns how many went out."""
+    now = datetime.now(timezone.utc)
+    notice = timedelta(hours=settings.subscription_expiry_notice_hours)
+    async with session_factory() as db:
+        result = await db.execute(
+            select(User.id, User.subscription_tier, User.subscription_expires_at)
+            .where(
+                User.subscription_tier != "free",
+                User.subscription_expires_at > now,
+                User.subscription_expires_at <= now + notice,
+            )
+        )
+        expiring = result.all()
+    if not expiring:
+        return 0
+    try:
+        # Every worker runs this; the first to claim a (user, expiry) sends it.
+        pipe = get_redis().pipeline(transaction=False)
+        for user_id, _, expires_at in expiring:
+            key = f"{EXPIRY_NOTICE_PREFIX}{user_id}:{int(expires_at.timestamp())}"
+            pipe.set(key, "1", nx=True, ex=int(notice.total_seconds()) + 86400)
+        claimed = await pipe.execute()
+    except (RedisError, OSError):
+        return 0
+    return await publish_events([
+        (user_id, "subscription.expiring", {"tier": tier, "expires_at": expires_at.isoformat()})
+        for (user_id, tier, expires_at), first in zip(expiring, claimed)
+        if first
+    ])
+
+
+subscription_expiry_notifier = PeriodicTask(
+    "subscription expiry notices",
+    lambda: settings.subscription_expiry_check_seconds,
+    notify_expiring_subscriptions,
+)
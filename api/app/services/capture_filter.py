@@ -0,0 +1,58 @@
+"""WinDivert capture filters compiled from normalized game profiles.
+
+Mirrors the client's ``filter_builder`` output so the client can use the
+server-provided string as-is. Because the expression is built here, clause
+order can be tuned without a client release:
+
+* inside each ``or`` group, the widest ranges come first so a matching
+  packet short-circuits sooner;
+* of the address and port groups, the one covering the smaller share of its
+  space comes first so non-game packets are rejected sooner.
+"""
+import ipaddress
+
+# Bump whenever the layout of the generated expression changes.
+CAPTURE_FILTER_FORMAT = 1
+
+
+def _address_clause(net: ipaddress.IPv4Network | ipaddress.IPv6Network) -> str:
+    field = "ip.DstAddr" if net.version == 4 else "ipv6.DstAddr"
+    first, last = net.network_address, net.broadcast_address
+    if first == last:
+        return f"{field} == {first}"
+    return f"({field} >= {first} and {field} <= {last})"
+
+
+def _port_clause(start: int, end: int) -> str:
+    if start == end:
+        return f"udp.DstPort == {start}"
+    return f"(udp.DstPort >= {start} and udp.DstPort <= {end})"
+
+
+def _or_group(clauses: list[str]) -> str:
+    return clauses[0] if len(clauses) == 1 else f"({' or '.join(clauses)})"
+
+
+def build_capture_filter(server_cidrs: list[str], port_ranges: list[list[int]]) -> str | None:
+    """Build the outbound-UDP filter for a profile, or None if it has no IPs or ports."""
+    if not server_cidrs or not port_ranges:
+        return None
+
+    networks = sorted(
+        (ipaddress.ip_network(c) for c in server_cidrs),
+        key=lambda n: (-n.num_addresses, n.version, n.network_address),
+    )
+    ports = sorted(port_ranges, key=lambda r: (r[0] - r[1], r[0]))
+
+    ip_share = sum(n.num_addresses / 2 ** n.max_prefixlen for n in networks)
+    port_share = sum(end - start + 1 for start, end in ports) / 65535
+
+    ip_group = _or_group([_address_clause(n) for n in networks])
+    port_group = _or_group([_port_clause(start, end) for start, end in ports])
+    groups = [ip_group, port_group] if ip_share <= port_share else [port_group, ip_group]
+    return f"outbound and udp and {groups[0]} and {groups[1]}"
+
+
+def capture_filter_version(catalog_version: int) -> str:
+    """Changes whenever either the profile or the filter format changes."""
+    return f"{CAPTURE_FILTER_FORMAT}.{catalog_version}"
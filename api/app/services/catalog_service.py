@@ -0,0 +1,206 @@
+"""Versioned in-process snapshot of the game catalog.
+
+Every write to ``game_profiles`` (and every deletion tombstone) takes a new
+value from ``catalog_version_seq``, so ``max(catalog_version)`` identifies the
+catalog state. Sequence values follow call order, not commit order, so
+writers first take ``lock_catalog``, held until their transaction ends: a
+version only becomes visible after every smaller one has, and a client that
+synced up to ``since`` never misses a commit below it. Requests only run
+that single indexed query; the games themselves are loaded, serialized and
+compressed once per version.
+"""
+import asyncio
+import gzip
+import json
+import uuid
+
+import msgpack
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
+
+from app.models.game_profile import GameProfile
+from app.models.game_profile_tombstone import GameProfileTombstone
+from app.schemas.game import CatalogSyncResponse, GameProfileResponse
+from app.services.capture_filter import build_capture_filter, capture_filter_version
+from app.services.search_index import GameSearchIndex
+
+CATALOG_MEDIA_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+}
+
+# pg_advisory_xact_lock key serializing catalog writes ("PLGC").
+_CATALOG_LOCK_KEY = 0x504C4743
+
+# Delta blobs are keyed by the client's version; keep only the recent ones.
+_DELTA_CACHE_SIZE = 64
+
+
+def exe_key(process_name: str) -> str:
+    """Case-folded basename, so "C:\\Games\\CS2.EXE" and "cs2.exe" match."""
+    return process_name.replace("\\", "/").rsplit("/", 1)[-1].strip().casefold()
+
+
+def _build_exe_index(games: list[GameProfileResponse]) -> dict[str, GameProfileResponse]:
+    index: dict[str, GameProfileResponse] = {}
+    # Popular games first so they win when several profiles share an exe name.
+    for game in sorted(games, key=lambda g: (not g.is_popular, g.name)):
+        for exe in game.exe_names:
+            index.setdefault(exe_key(exe), game)
+    return index
+
+
+def _encode(payload: dict, fmt: str) -> bytes:
+    if fmt == "msgpack":
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog at one version, with cached encodings."""
+
+    def __init__(
+        self,
+        version: int,
+        games: list[tuple[int, GameProfileResponse]],
+        tombstones: list[tuple[int, uuid.UUID]],
+    ):
+        self.version = version
+        self.games = [g for _, g in games]
+        self.by_slug = {g.slug: g for g in self.games}
+        self._game_versions = games
+        self._tombstones = tombstones
+        self._full_blobs: dict[tuple[str, bool], bytes] = {}
+        self._delta_blobs: dict[tuple[int, str, bool], bytes] = {}
+        self.search_index = GameSearchIndex(self.games)
+        self.exe_index = _build_exe_index(self.games)
+        # game id → (filter expression or None, filter version)
+        self.capture_filters: dict[uuid.UUID, tuple[str | None, str]] = {
+            g.id: (
+                build_capture_filter(g.normalized_server_ips, g.port_ranges),
+                capture_filter_version(v),
+            )
+            for v, g in games
+        }
+        for fmt in CATALOG_MEDIA_TYPES:
+            self._full_blobs[(fmt, False)] = _encode(self._payload(0), fmt)
+            self._full_blobs[(fmt, True)] = gzip.compress(
+                self._full_blobs[(fmt, False)], compresslevel=9, mtime=0
+            )
+
+    def _payload(self, since: int) -> dict:
+        if since <= 0:
+            response = CatalogSyncResponse(
+                version=self.version, since=0, full=True, games=self.games
+            )
+        else:
+            response = CatalogSyncResponse(
+                version=self.version,
+                since=since,
+                full=False,
+                games=[g for v, g in self._game_versions if v > since],
+                removed=[game_id for v, game_id in self._tombstones if v > since],
+            )
+        return response.model_dump(mode="json")
+
+    def match_processes(self, process_names: list[str]) -> list[tuple[str, GameProfileResponse]]:
+        """Match running process names against the catalog, one game per match."""
+        matches = []
+        seen: set[uuid.UUID] = set()
+        for name in process_names:
+            game = self.exe_index.get(exe_key(name))
+            if game is not None and game.id not in seen:
+                seen.add(game.id)
+                matches.append((name, game))
+        return matches
+
+    def encode(self, since: int, fmt: str, compressed: bool) -> bytes:
+        """Return the encoded catalog (full when ``since`` is 0) for a client at ``since``."""
+        if since > self.version:
+            # Client claims a version we never issued (e.g. DB restore) — resync.
+            since = 0
+        if since <= 0:
+            return self._full_blobs[(fmt, compressed)]
+
+        key = (since, fmt, compressed)
+        blob = self._delta_blobs.get(key)
+        if blob is None:
+            if compressed:
+                blob = gzip.compress(self.encode(since, fmt, False), mtime=0)
+            else:
+                blob = _encode(self._payload(since), fmt)
+            if len(self._delta_blobs) >= _DELTA_CACHE_SIZE:
+                self._delta_blobs.pop(next(iter(self._delta_blobs)))
+            self._delta_blobs[key] = blob
+        return blob
+
+
+_snapshot: CatalogSnapshot | None = None
+_lock = asyncio.Lock()
+
+
+async def get_catalog_version(db: AsyncSession) -> int:
+    result = await db.execute(
+        select(
+            func.greatest(
+                select(func.coalesce(func.max(GameProfile.catalog_version), 0)).scalar_subquery(),
+                select(func.coalesce(func.max(GameProfileTombstone.catalog_version), 0)).scalar_subquery(),
+            )
+        )
+    )
+    return result.scalar_one()
+
+
+async def _build_snapshot(db: AsyncSession) -> CatalogSnapshot:
+    result = await db.execute(
+        select(GameProfile)
+        .options(noload(GameProfile.sessions))
+        .order_by(GameProfile.name)
+    )
+    games = [
+        (g.catalog_version, GameProfileResponse.model_validate(g))
+        for g in result.scalars().all()
+    ]
+    result = await db.execute(
+        select(GameProfileTombstone.catalog_version, GameProfileTombstone.game_id)
+    )
+    tombstones = [(row[0], row[1]) for row in result.all()]
+
+    # Derive the version from what was actually loaded so a write racing the
+    # build is picked up by the next version check.
+    version = max([v for v, _ in games] + [v for v, _ in tombstones] + [0])
+    return CatalogSnapshot(version, games, tombstones)
+
+
+async def get_catalog_snapshot(db: AsyncSession) -> CatalogSnapshot:
+    global _snapshot
+    version = await get_catalog_version(db)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    async with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = await _build_snapshot(db)
+        return _snapshot
+
+
+def invalidate_catalog_snapshot() -> None:
+    global _snapshot, _lock
+    _snapshot = None
+    _lock = asyncio.Lock()
+
+
+async def lock_catalog(db: AsyncSession) -> None:
+    """Serialize catalog writes until ``db``'s transaction ends.
+
+    Call before adding or changing game profiles: versions are assigned at
+    flush, so they must be drawn while the lock is held.
+    """
+    await db.execute(select(func.pg_advisory_xact_lock(_CATALOG_LOCK_KEY)))
+
+
+def record_game_deletion(db: AsyncSession, game: GameProfile) -> None:
+    """Leave a tombstone so delta-syncing clients learn about the deletion."""
+    db.add(GameProfileTombstone(game_id=game.id, slug=game.slug))
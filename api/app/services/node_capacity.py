@@ -0,0 +1,157 @@
+"""Per-node session counters in Redis.
+
+Each active session counts once against its primary node and once against
+its backup node (multipath). Admission is a single Lua call that increments
+the counter only while it is below ``max_sessions``, so concurrent starts
+on different API workers cannot overshoot without locking the node row.
+
+Counters drift if a worker dies between admitting and committing (or stop
+paths miss a release), so ``reconcile_node_counters`` periodically resets
+them from the sessions table. The reset is a compare-and-set against the
+values read before counting, so a counter that an admit or release moved
+in the meantime is left for the next round rather than overwritten. When Redis is unreachable every call returns
+None and callers fall back to counting sessions in the DB.
+"""
+import logging
+import uuid
+
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.node import Node
+from app.schemas.node import NodeRecord
+from app.services.node_health import count_active_sessions
+from app.utils.metrics import node_admission_rejected_total, relay_node_sessions
+from app.utils.periodic import PeriodicTask
+from app.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "plg:node_sessions:"
+
+# Returns the new count, or -1 when the node is full.
+_ADMIT_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current >= tonumber(ARGV[1]) then
+    return -1
+end
+return redis.call('INCR', KEYS[1])
+"""
+
+# Never lets a counter go negative (e.g. release after a reconcile reset).
+_RELEASE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current <= 0 then
+    return 0
+end
+return redis.call('DECR', KEYS[1])
+"""
+
+# ARGV holds (expected, new) pairs per key; '' expects a missing key.
+# Returns how many counters were reset.
+_RESET_SCRIPT = """
+local reset = 0
+for i, key in ipairs(KEYS) do
+    local current = redis.call('GET', key) or ''
+    if current == ARGV[2 * i - 1] then
+        redis.call('SET', key, ARGV[2 * i])
+        reset = reset + 1
+    end
+end
+return reset
+"""
+
+
+def _key(node_id: uuid.UUID) -> str:
+    return f"{KEY_PREFIX}{node_id}"
+
+
+async def admit(node: Node | NodeRecord) -> bool | None:
+    """Take one slot on ``node``; False when full, None when Redis is unavailable."""
+    try:
+        count = await get_redis().eval(_ADMIT_SCRIPT, 1, _key(node.id), node.max_sessions)
+    except (RedisError, OSError):
+        logger.warning("node capacity counters unavailable, falling back to DB counts")
+        return None
+    if count < 0:
+        node_admission_rejected_total.labels(node=node.name).inc()
+        return False
+    relay_node_sessions.labels(node=node.name).set(count)
+    return True
+
+
+async def release(node_ids: list[uuid.UUID | None]) -> None:
+    """Give back one slot per node (primary and backup of an ended session)."""
+    ids = [node_id for node_id in node_ids if node_id is not None]
+    if not ids:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for node_id in ids:
+            pipe.eval(_RELEASE_SCRIPT, 1, _key(node_id))
+        await pipe.execute()
+    except (RedisError, OSError):
+        logger.warning("failed to release node capacity counters; reconciler will fix them")
+
+
+async def adjust(deltas: dict[uuid.UUID, int]) -> None:
+    """Move counters by ``deltas`` at once (sessions moved between nodes in bulk)."""
+    deltas = {node_id: delta for node_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for node_id, delta in deltas.items():
+            pipe.incrby(_key(node_id), delta)
+        await pipe.execute()
+    except (RedisError, OSError):
+        logger.warning("failed to adjust node capacity counters; reconciler will fix them")
+
+
+async def get_node_counts(node_ids: list[uuid.UUID]) -> dict[uuid.UUID, int] | None:
+    """Current counters for ``node_ids`` (missing keys are left out); None if Redis is down."""
+    if not node_ids:
+        return {}
+    try:
+        values = await get_redis().mget([_key(node_id) for node_id in node_ids])
+    except (RedisError, OSError):
+        return None
+    return {node_id: int(v) for node_id, v in zip(node_ids, values) if v is not None}
+
+
+async def reconcile_node_counters(db: AsyncSession) -> dict[uuid.UUID, int]:
+    """Reset every node's counter to its active-session count in the DB.
+
+    Counters that changed while the DB was counted are skipped.
+    """
+    result = await db.execute(select(Node.id, Node.name).where(Node.status != "inactive"))
+    nodes = result.all()
+    keys = [_key(node_id) for node_id, _ in nodes]
+    observed = await get_redis().mget(keys) if keys else []
+    counts = await count_active_sessions(db, [node_id for node_id, _ in nodes])
+    truth = {node_id: counts.get(node_id, 0) for node_id, _ in nodes}
+    if truth:
+        args = []
+        for (node_id, _), seen in zip(nodes, observed):
+            args += ["" if seen is None else seen, truth[node_id]]
+        reset = await get_redis().eval(_RESET_SCRIPT, len(keys), *keys, *args)
+        if reset < len(keys):
+            logger.info("%d node counters moved during reconcile; left for the next round", len(keys) - reset)
+    for node_id, name in nodes:
+        relay_node_sessions.labels(node=name).set(truth[node_id])
+    return truth
+
+
+async def _reconcile() -> None:
+    async with async_session() as db:
+        await reconcile_node_counters(db)
+
+
+capacity_reconciler = PeriodicTask(
+    "node capacity reconcile",
+    lambda: settings.node_capacity_reconcile_seconds,
+    _reconcile,
+)
@@ -0,0 +1,390 @@
+"""Draining a relay for maintenance: move its sessions away, then retire it.
+
+A node in ``draining`` receives no new sessions (placement only considers
+``active`` nodes). ``node_drainer`` moves the sessions it carries, as
+primary or backup leg, in batches of ``node_drain_batch_size``:
+
+1. each leg gets a target from the recommendation ranking, same location
+   first, spreading legs by the targets' spare capacity;
+2. the legs are registered on their targets concurrently, at most
+   ``admin_bulk_relay_concurrency`` calls at a time per target, behind
+   pending outbox registrations that keep the reconciler off them;
+3. one UPDATE per leg kind switches the registered legs. Backup legs with
+   no target are dropped (the session goes single-path). Unregistration
+   from the draining relay is queued in the outbox to run after
+   ``node_drain_grace_seconds``, so clients have time to switch;
+4. each client gets a ``session.migrated`` event with its new relay.
+
+Legs that could not be moved stay on the node for the next pass. Progress
+counters live in Redis. The node becomes ``inactive`` once no active
+session references it.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from redis.exceptions import RedisError
+from sqlalchemy import Uuid, bindparam, cast, column, func, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import noload
+
+from app.config import settings
+from app.database import async_session
+from app.models.game_profile import GameProfile
+from app.models.node import Node
+from app.models.session import Session
+from app.schemas.admin import AdminNodeDrainProgress
+from app.schemas.node import NodeRecommendation
+from app.services.node_capacity import adjust
+from app.services.node_health import count_active_sessions, node_health
+from app.services.node_service import get_node_table, invalidate_node_table, recommend_nodes
+from app.services.relay_client import register_session_on_relay, relay_game_lists
+from app.services.relay_outbox import enqueue_register_legs, enqueue_unregister_legs, settle_register_legs
+from app.utils.events import publish_events
+from app.utils.metrics import node_drain_legs_total
+from app.utils.periodic import PeriodicTask
+from app.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_PREFIX = "plg:drain:"
+LOCK_PREFIX = "plg:drain_lock:"
+LOCK_TTL_SECONDS = 60
+# Progress outlives the drain so admins can still read the final numbers.
+PROGRESS_TTL_SECONDS = 7 * 86400
+
+# Deletes the lock only while it still holds this worker's token, so a
+# worker whose lock expired cannot release the one another worker took.
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_moves = func.unnest(
+    cast(bindparam("session_ids"), ARRAY(Uuid)),
+    cast(bindparam("target_ids"), ARRAY(Uuid)),
+).table_valued(
+    column("session_id", Uuid),
+    column("target_id", Uuid),
+).render_derived(name="moves")
+
+_MOVE_PRIMARY = (
+    update(Session)
+    .where(
+        Session.id == _moves.c.session_id,
+        Session.status == "active",
+        Session.node_id == bindparam("draining_node_id"),
+    )
+    .values(node_id=_moves.c.target_id, relay_status="registered")
+    .returning(Session.id)
+    .execution_options(synchronize_session=False)
+)
+
+_MOVE_BACKUP = (
+    update(Session)
+    .where(
+        Session.id == _moves.c.session_id,
+        Session.status == "active",
+        Session.backup_node_id == bindparam("draining_node_id"),
+    )
+    .values(backup_node_id=_moves.c.target_id, backup_relay_status="registered")
+    .returning(Session.id)
+    .execution_options(synchronize_session=False)
+)
+
+
+class Leg:
+    """One session's primary or backup leg on its way to ``target``."""
+
+    __slots__ = ("session_id", "user_id", "token", "backup", "other_node_id", "server_ips", "ports", "target")
+
+    def __init__(self, session_id, user_id, token, backup, other_node_id, cidrs, port_ranges):
+        self.session_id: uuid.UUID = session_id
+        self.user_id: uuid.UUID = user_id
+        self.token: int = token
+        self.backup: bool = backup
+        self.other_node_id: uuid.UUID | None = other_node_id
+        self.server_ips, self.ports = relay_game_lists(cidrs, port_ranges)
+        self.target: NodeRecommendation | None = None
+
+
+def _progress_key(node_id: uuid.UUID) -> str:
+    return f"{PROGRESS_PREFIX}{node_id}"
+
+
+async def _progress_add(node_id: uuid.UUID, **counts: int) -> None:
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for field, amount in counts.items():
+            if amount:
+                pipe.hincrby(_progress_key(node_id), field, amount)
+        await pipe.execute()
+    except (RedisError, OSError):
+        logger.warning("could not record drain progress for node %s", node_id)
+
+
+def _place(legs: list[Leg], candidates: list[NodeRecommendation], location: str) -> None:
+    """Give each leg the target with most spare room, preferring ``location``."""
+    spare = {c.id: c.max_sessions - c.current_load for c in candidates}
+    for leg in legs:
+        best: tuple[tuple, NodeRecommendation] | None = None
+        for candidate in candidates:
+            if candidate.id == leg.other_node_id or spare[candidate.id] <= 0:
+                continue
+            key = (candidate.location != location, -spare[candidate.id], -candidate.score, str(candidate.id))
+            if best is None or key < best[0]:
+                best = (key, candidate)
+        if best is not None:
+            leg.target = best[1]
+            spare[best[1].id] -= 1
+
+
+async def register_legs(db: AsyncSession, legs: list[Leg], api_ports: dict[uuid.UUID, int]) -> list[bool]:
+    """Register each leg on its target, ``admin_bulk_relay_concurrency`` calls per target at a time.
+
+    The legs' outbox registrations are committed first, so the reconciler
+    sees them in flight and does not unregister a new leg as stale before
+    the caller's UPDATE points its session at the target. They are settled
+    with the outcomes in the caller's next commit, together with that UPDATE.
+    """
+    entry_ids = await enqueue_register_legs(
+        db, [(leg.session_id, leg.token, leg.target.id, leg.server_ips, leg.ports) for leg in legs],
+    )
+    await db.commit()
+    limits: dict[uuid.UUID, asyncio.Semaphore] = {}
+
+    async def register(leg: Leg) -> bool:
+        target = leg.target
+        limit = limits.setdefault(target.id, asyncio.Semaphore(settings.admin_bulk_relay_concurrency))
+        async with limit:
+            try:
+                return await register_session_on_relay(
+                    node_ip=target.ip_address,
+                    relay_api_port=api_ports[target.id],
+                    session_token=leg.token,
+                    game_server_ips=leg.server_ips,
+                    game_ports=leg.ports,
+                )
+            except Exception:
+                return False
+
+    registered = list(await asyncio.gather(*(register(leg) for leg in legs)))
+    await settle_register_legs(db, entry_ids, registered)
+    return registered
+
+
+async def migrate_batch(node_id: uuid.UUID, session_factory: async_sessionmaker = async_session) -> tuple[int, int]:
+    """Move one batch of the draining node's legs; returns (moved, not moved)."""
+    async with session_factory() as db:
+        result = await db.execute(select(Node).options(noload(Node.sessions)).where(Node.id == node_id))
+        node = result.scalar_one_or_none()
+        if node is None or node.status != "draining":
+            return 0, 0
+        result = await db.execute(
+            select(
+                Session.id, Session.user_id, Session.session_token, Session.node_id, Session.backup_node_id,
+                GameProfile.normalized_server_ips, GameProfile.port_ranges,
+            )
+            .outerjoin(GameProfile, GameProfile.id == Session.game_profile_id)
+            .where(Session.status == "active", or_(Session.node_id == node_id, Session.backup_node_id == node_id))
+            .order_by(Session.started_at)
+            .limit(settings.node_drain_batch_size)
+        )
+        legs = []
+        for session_id, user_id, token, primary_id, backup_id, cidrs, port_ranges in result.all():
+            backup = primary_id != node_id
+            other = primary_id if backup else backup_id
+            legs.append(Leg(session_id, user_id, token, backup, other, cidrs, port_ranges))
+        if not legs:
+            return 0, 0
+
+        api_ports = {n.id: n.relay_api_port for n in await get_node_table(db)}
+        candidates = [c for c in await recommend_nodes(db) if c.id != node_id and c.id in api_ports]
+        _place(legs, candidates, node.location)
+        placed = [leg for leg in legs if leg.target is not None]
+        registered = [leg for leg, ok in zip(placed, await register_legs(db, placed, api_ports)) if ok]
+        dropped = [leg for leg in legs if leg.backup and leg.target is None]
+
+        params = {"draining_node_id": node_id}
+        moved_ids: set[uuid.UUID] = set()
+        for backup, statement in ((False, _MOVE_PRIMARY), (True, _MOVE_BACKUP)):
+            kind = [leg for leg in registered if leg.backup == backup]
+            if kind:
+                result = await db.execute(statement, {
+                    **params,
+                    "session_ids": [leg.session_id for leg in kind],
+                    "target_ids": [leg.target.id for leg in kind],
+                })
+                moved_ids.update(result.scalars().all())
+        dropped_ids: set[uuid.UUID] = set()
+        if dropped:
+            result = await db.execute(
+                update(Session)
+                .where(
+                    Session.id.in_([leg.session_id for leg in dropped]),
+                    Session.status == "active",
+                    Session.backup_node_id == node_id,
+                )
+                .values(backup_node_id=None, multipath_enabled=False, backup_relay_status=None)
+                .returning(Session.id)
+                .execution_options(synchronize_session=False)
+            )
+            dropped_ids.update(result.scalars().all())
+
+        moved = [leg for leg in registered if leg.session_id in moved_ids]
+        gone = [leg for leg in dropped if leg.session_id in dropped_ids]
+        # Sessions that ended while their new leg was being registered.
+        orphaned = [leg for leg in registered if leg.session_id not in moved_ids]
+        await enqueue_unregister_legs(
+            db, [(leg.session_id, leg.token, node_id) for leg in moved + gone],
+            delay=settings.node_drain_grace_seconds,
+        )
+        await enqueue_unregister_legs(db, [(leg.session_id, leg.token, leg.target.id) for leg in orphaned])
+        await db.commit()
+
+    deltas: dict[uuid.UUID, int] = {node_id: -(len(moved) + len(gone))}
+    for leg in moved:
+        deltas[leg.target.id] = deltas.get(leg.target.id, 0) + 1
+    await adjust(deltas)
+
+    await publish_events(
+        [
+            (leg.user_id, "session.migrated", {
+                "session_id": str(leg.session_id),
+                "leg": "backup" if leg.backup else "primary",
+                "node_id": str(leg.target.id),
+                "node_ip": leg.target.ip_address,
+                "node_port": leg.target.relay_port,
+            })
+            for leg in moved
+        ]
+        + [
+            (leg.user_id, "session.migrated", {
+                "session_id": str(leg.session_id), "leg": "backup", "node_id": None, "node_ip": None, "node_port": None,
+            })
+            for leg in gone
+        ]
+    )
+
+    failed = len(legs) - len(moved) - len(gone)
+    node_drain_legs_total.labels(result="moved").inc(len(moved))
+    node_drain_legs_total.labels(result="dropped").inc(len(gone))
+    node_drain_legs_total.labels(result="failed").inc(failed)
+    await _progress_add(node_id, migrated=len(moved) + len(gone), failed=failed)
+    if failed:
+        logger.warning("drain of node %s: %d legs could not be moved yet", node_id, failed)
+    return len(moved) + len(gone), failed
+
+
+async def _finish_if_empty(db: AsyncSession, node_id: uuid.UUID) -> bool:
+    if (await count_active_sessions(db, [node_id])).get(node_id, 0):
+        return False
+    result = await db.execute(
+        update(Node).where(Node.id == node_id, Node.status == "draining").values(status="inactive")
+    )
+    await db.commit()
+    if result.rowcount:
+        invalidate_node_table()
+        try:
+            await get_redis().hset(_progress_key(node_id), "finished_at", datetime.now(timezone.utc).isoformat())
+        except (RedisError, OSError):
+            pass
+        logger.info("node %s drained and set inactive", node_id)
+    return True
+
+
+async def drain_nodes(session_factory: async_sessionmaker = async_session) -> int:
+    """Run every draining node's migration until it is empty or stuck; returns legs moved."""
+    async with session_factory() as db:
+        node_ids = (await db.execute(select(Node.id).where(Node.status == "draining"))).scalars().all()
+    total = 0
+    for node_id in node_ids:
+        # One worker per node at a time; without Redis, the conditional
+        # UPDATEs still keep concurrent passes from double-moving a leg.
+        lock = f"{LOCK_PREFIX}{node_id}"
+        token = uuid.uuid4().hex
+        try:
+            if not await get_redis().set(lock, token, nx=True, ex=LOCK_TTL_SECONDS):
+                continue
+        except (RedisError, OSError):
+            lock = None
+        try:
+            while True:
+                moved, failed = await migrate_batch(node_id, session_factory)
+                total += moved
+                # A short batch covered every remaining leg; failed ones wait
+                # for the next pass.
+                if not moved or moved + failed < settings.node_drain_batch_size:
+                    break
+            async with session_factory() as db:
+                await _finish_if_empty(db, node_id)
+        finally:
+            if lock is not None:
+                try:
+                    await get_redis().eval(_RELEASE_LOCK_SCRIPT, 1, lock, token)
+                except (RedisError, OSError):
+                    pass
+    return total
+
+
+async def start_drain(db: AsyncSession, node: Node) -> AdminNodeDrainProgress:
+    """Stop placing sessions on ``node`` and queue its sessions for migration."""
+    total = (await count_active_sessions(db, [node.id])).get(node.id, 0)
+    node.status = "draining" if total else "inactive"
+    await db.commit()
+    invalidate_node_table()
+    entry = node_health.get(node.id)
+    if entry is not None:
+        entry.node.status = node.status
+    try:
+        key = _progress_key(node.id)
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hset(key, mapping={
+            "total": total, "migrated": 0, "failed": 0, "started_at": datetime.now(timezone.utc).isoformat(),
+        })
+        pipe.expire(key, PROGRESS_TTL_SECONDS)
+        await pipe.execute()
+    except (RedisError, OSError):
+        logger.warning("could not record drain progress for node %s", node.id)
+    return await get_drain_progress(db, node)
+
+
+async def cancel_drain(db: AsyncSession, node: Node) -> None:
+    """Put a draining node back into service; sessions already moved stay moved."""
+    node.status = "active"
+    await db.commit()
+    invalidate_node_table()
+    try:
+        await get_redis().delete(_progress_key(node.id))
+    except (RedisError, OSError):
+        pass
+
+
+async def get_drain_progress(db: AsyncSession, node: Node) -> AdminNodeDrainProgress:
+    remaining = (await count_active_sessions(db, [node.id])).get(node.id, 0)
+    try:
+        stored = await get_redis().hgetall(_progress_key(node.id))
+    except (RedisError, OSError):
+        stored = {}
+    return AdminNodeDrainProgress(
+        node_id=node.id,
+        status=node.status,
+        remaining=remaining,
+        total=int(stored["total"]) if "total" in stored else None,
+        migrated=int(stored.get("migrated", 0)),
+        failed=int(stored.get("failed", 0)),
+        started_at=stored.get("started_at"),
+        finished_at=stored.get("finished_at"),
+    )
+
+
+node_drainer = PeriodicTask(
+    "node drain",
+    lambda: settings.node_drain_interval_seconds,
+    drain_nodes,
+)
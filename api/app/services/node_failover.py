@@ -0,0 +1,203 @@
+"""Multipath failover: promote the backup relay when a primary goes down.
+
+``node_health`` calls ``fail_over`` with the relays it has just marked
+``degraded``. For every active multipath session with a leg on one of them:
+
+1. one UPDATE rewires the session: where the primary failed and the backup's
+   node is active, the backup becomes the primary; where only the backup
+   failed, it is dropped. Either way the session is single-path for now and
+   the failed leg's unregistration is queued in the relay outbox (it is
+   delivered if the relay comes back);
+2. clients of promoted sessions get ``session.failover`` straight away. They
+   already send every packet to the backup relay too, so traffic recovers
+   as soon as they switch;
+3. new backups are picked as ``find_backup_node`` would (another location
+   than the primary's first), spread by spare capacity, and registered
+   concurrently. The registered ones are attached in one UPDATE and their
+   clients get ``session.migrated`` for the backup leg.
+
+Sessions with both legs on failed relays are left as they are; their clients
+already have ``node.degraded``.
+"""
+import logging
+import uuid
+
+from sqlalchemy import Uuid, and_, bindparam, case, cast, column, func, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import async_session
+from app.models.game_profile import GameProfile
+from app.models.node import Node
+from app.models.session import Session
+from app.schemas.node import NodeRecommendation
+from app.services.node_capacity import adjust
+from app.services.node_drain import Leg, register_legs
+from app.services.node_service import get_node_table, recommend_nodes
+from app.services.relay_outbox import enqueue_unregister_legs
+from app.utils.events import publish_events
+from app.utils.metrics import session_failovers_total
+
+logger = logging.getLogger(__name__)
+
+_backups = func.unnest(
+    cast(bindparam("session_ids"), ARRAY(Uuid)),
+    cast(bindparam("target_ids"), ARRAY(Uuid)),
+).table_valued(
+    column("session_id", Uuid),
+    column("target_id", Uuid),
+).render_derived(name="backups")
+
+_ATTACH_BACKUP = (
+    update(Session)
+    .where(
+        Session.id == _backups.c.session_id,
+        Session.status == "active",
+        Session.backup_node_id.is_(None),
+        Session.node_id != _backups.c.target_id,
+    )
+    .values(backup_node_id=_backups.c.target_id, backup_relay_status="registered", multipath_enabled=True)
+    .returning(Session.id)
+    .execution_options(synchronize_session=False)
+)
+
+
+def _place_backups(legs: list[Leg], candidates: list[NodeRecommendation], locations: dict[uuid.UUID, str]) -> None:
+    """Give each leg a backup away from its primary's location if possible, then by spare room."""
+    spare = {c.id: c.max_sessions - c.current_load for c in candidates}
+    for leg in legs:
+        primary_location = locations.get(leg.other_node_id)
+        best: tuple[tuple, NodeRecommendation] | None = None
+        for candidate in candidates:
+            if candidate.id == leg.other_node_id or spare[candidate.id] <= 0:
+                continue
+            key = (
+                candidate.location == primary_location, -spare[candidate.id], -candidate.score, str(candidate.id),
+            )
+            if best is None or key < best[0]:
+                best = (key, candidate)
+        if best is not None:
+            leg.target = best[1]
+            spare[best[1].id] -= 1
+
+
+async def fail_over(node_ids: list[uuid.UUID], session_factory: async_sessionmaker = async_session) -> int:
+    """Move multipath sessions off failed ``node_ids``; returns how many were promoted."""
+    if not node_ids:
+        return 0
+    failed = set(node_ids)
+    async with session_factory() as db:
+        primary_failed = Session.node_id.in_(node_ids)
+        affected = (
+            select(Session.id, Session.node_id.label("old_node_id"), Session.backup_node_id.label("old_backup_id"))
+            .where(
+                Session.status == "active",
+                or_(
+                    and_(
+                        Session.node_id.in_(node_ids),
+                        Session.backup_node_id.in_(select(Node.id).where(Node.status == "active")),
+                    ),
+                    and_(Session.backup_node_id.in_(node_ids), Session.node_id.not_in(node_ids)),
+                ),
+            )
+            .with_for_update()
+            .subquery()
+        )
+        result = await db.execute(
+            update(Session)
+            .where(Session.id == affected.c.id)
+            .values(
+                node_id=case((primary_failed, Session.backup_node_id), else_=Session.node_id),
+                relay_status=case((primary_failed, Session.backup_relay_status), else_=Session.relay_status),
+                backup_node_id=None,
+                backup_relay_status=None,
+                multipath_enabled=False,
+            )
+            .returning(
+                Session.id, Session.user_id, Session.session_token, Session.node_id, Session.game_profile_id,
+                affected.c.old_node_id, affected.c.old_backup_id,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        if not rows:
+            return 0
+
+        promoted = [row for row in rows if row.old_node_id in failed]
+        dead_legs = [
+            (row.id, row.session_token, row.old_node_id if row.old_node_id in failed else row.old_backup_id)
+            for row in rows
+        ]
+        await enqueue_unregister_legs(db, dead_legs)
+        await db.commit()
+
+        result = await db.execute(
+            select(Node.id, Node.ip_address, Node.relay_port, Node.location)
+            .where(Node.id.in_({row.node_id for row in rows}))
+        )
+        primaries = {node_id: (ip, port, location) for node_id, ip, port, location in result.all()}
+        result = await db.execute(
+            select(GameProfile.id, GameProfile.normalized_server_ips, GameProfile.port_ranges)
+            .where(GameProfile.id.in_({row.game_profile_id for row in rows}))
+        )
+        games = {game_id: (cidrs, port_ranges) for game_id, cidrs, port_ranges in result.all()}
+
+        deltas: dict[uuid.UUID, int] = {}
+        for _, _, node_id in dead_legs:
+            deltas[node_id] = deltas.get(node_id, 0) - 1
+        await adjust(deltas)
+        await publish_events([
+            (row.user_id, "session.failover", {
+                "session_id": str(row.id),
+                "node_id": str(row.node_id),
+                "node_ip": primaries[row.node_id][0] if row.node_id in primaries else None,
+                "node_port": primaries[row.node_id][1] if row.node_id in primaries else None,
+            })
+            for row in promoted
+        ])
+        session_failovers_total.labels(result="promoted").inc(len(promoted))
+        logger.warning(
+            "failed over %d session(s) off %d relay node(s); %d backup leg(s) lost",
+            len(promoted), len(node_ids), len(rows) - len(promoted),
+        )
+
+        # New backups.
+        legs = [
+            Leg(row.id, row.user_id, row.session_token, True, row.node_id, *games.get(row.game_profile_id, ([], [])))
+            for row in rows
+        ]
+        api_ports = {n.id: n.relay_api_port for n in await get_node_table(db)}
+        candidates = [c for c in await recommend_nodes(db) if c.id not in failed and c.id in api_ports]
+        _place_backups(legs, candidates, {node_id: p[2] for node_id, p in primaries.items()})
+        placed = [leg for leg in legs if leg.target is not None]
+        registered = [leg for leg, ok in zip(placed, await register_legs(db, placed, api_ports)) if ok]
+        attached_ids: set[uuid.UUID] = set()
+        if registered:
+            result = await db.execute(_ATTACH_BACKUP, {
+                "session_ids": [leg.session_id for leg in registered],
+                "target_ids": [leg.target.id for leg in registered],
+            })
+            attached_ids.update(result.scalars().all())
+        attached = [leg for leg in registered if leg.session_id in attached_ids]
+        # Sessions that ended or changed while their backup was registered.
+        orphaned = [leg for leg in registered if leg.session_id not in attached_ids]
+        await enqueue_unregister_legs(db, [(leg.session_id, leg.token, leg.target.id) for leg in orphaned])
+        await db.commit()
+
+    deltas = {}
+    for leg in attached:
+        deltas[leg.target.id] = deltas.get(leg.target.id, 0) + 1
+    await adjust(deltas)
+    await publish_events([
+        (leg.user_id, "session.migrated", {
+            "session_id": str(leg.session_id),
+            "leg": "backup",
+            "node_id": str(leg.target.id),
+            "node_ip": leg.target.ip_address,
+            "node_port": leg.target.relay_port,
+        })
+        for leg in attached
+    ])
+    session_failovers_total.labels(result="backup_added").inc(len(attached))
+    session_failovers_total.labels(result="single_path").inc(len(legs) - len(attached))
+    return len(promoted)
@@ -0,0 +1,266 @@
+"""Background relay health polling with an in-process status cache.
+
+One ``NodeHealthMonitor`` per worker probes every active (degraded, draining) relay's
+``/health`` endpoint concurrently on a fixed interval. Request handlers read
+the cached result instead of calling relays themselves. Relays that miss
+``node_degrade_after_failures`` consecutive probes are set to ``degraded`` (and
+stop receiving new sessions) until they answer again.
+
+Each poll also refreshes ``Node.current_load`` from active DB sessions and the
+relay-reported session count. Clients with a session on a node that changes
+state get ``node.degraded`` / ``node.restored`` events, and multipath sessions
+on a degraded node fail over to their backup (``node_failover``). Failover
+runs as its own task under ``node_failover_deadline_seconds`` and is driven
+from the nodes' stored status, not from the transition: every poll retries
+it for degraded nodes that still carry active sessions, so a failed or
+timed-out run is picked up again.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
+
+from app.config import settings
+from app.database import async_session
+from app.models.node import Node
+from app.models.session import Session
+from app.schemas.node import NodeResponse
+from app.services.relay_client import get_relay_http
+from app.utils.events import publish_events
+from app.utils.metrics import relay_node_latency_seconds, relay_node_up
+
+logger = logging.getLogger(__name__)
+
+POLLED_STATUSES = ("active", "degraded", "draining")
+
+
+class NodeStatus:
+    """Last known health of one relay node."""
+
+    __slots__ = (
+        "node", "reachable", "latency_ms", "active_sessions", "uptime_secs",
+        "checked_at", "failures",
+    )
+
+    def __init__(self, node: NodeResponse):
+        self.node = node
+        self.reachable: bool | None = None  # None until the first probe
+        self.latency_ms: float | None = None
+        self.active_sessions: int | None = None
+        self.uptime_secs: int | None = None
+        self.checked_at: datetime | None = None
+        self.failures = 0
+
+
+async def count_active_sessions(
+    db: AsyncSession,
+    node_ids: list[uuid.UUID] | None = None,
+) -> dict[uuid.UUID, int]:
+    """Active sessions per node, counting both primary and backup (multipath) legs."""
+    counts: dict[uuid.UUID, int] = {}
+    for column in (Session.node_id, Session.backup_node_id):
+        stmt = (
+            select(column, func.count())
+            .where(Session.status == "active", column.is_not(None))
+            .group_by(column)
+        )
+        if node_ids is not None:
+            stmt = stmt.where(column.in_(node_ids))
+        for node_id, count in (await db.execute(stmt)).all():
+            counts[node_id] = counts.get(node_id, 0) + count
+    return counts
+
+
+def live_load(db_count: int, relay_count: int | None) -> int:
+    """The relay may still hold sessions the DB already ended (and vice versa)."""
+    return max(db_count, relay_count or 0)
+
+
+async def _node_notices(
+    db: AsyncSession,
+    node_ids: list[uuid.UUID],
+    event_type: str,
+) -> list[tuple[uuid.UUID, str, dict]]:
+    """One ``event_type`` event per active session leg on ``node_ids``."""
+    if not node_ids:
+        return []
+    result = await db.execute(
+        select(Session.user_id, Session.id, Session.node_id, Session.backup_node_id)
+        .where(
+            Session.status == "active",
+            or_(Session.node_id.in_(node_ids), Session.backup_node_id.in_(node_ids)),
+        )
+    )
+    notices = []
+    for user_id, session_id, primary_id, backup_id in result.all():
+        for leg, node_id in (("primary", primary_id), ("backup", backup_id)):
+            if node_id in node_ids:
+                notices.append((user_id, event_type, {
+                    "session_id": str(session_id), "node_id": str(node_id), "leg": leg,
+                }))
+    return notices
+
+
+class NodeHealthMonitor:
+    def __init__(self, session_factory=async_session):
+        self.session_factory = session_factory
+        self._statuses: dict[uuid.UUID, NodeStatus] = {}
+        self._task: asyncio.Task | None = None
+        self.failover_task: asyncio.Task | None = None
+        self.last_poll: datetime | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def get(self, node_id: uuid.UUID) -> NodeStatus | None:
+        return self._statuses.get(node_id)
+
+    def statuses(self) -> list[NodeStatus]:
+        return list(self._statuses.values())
+
+    async def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        for task in (self._task, self.failover_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self.failover_task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll_once(get_relay_http())
+            except Exception:
+                logger.exception("node health poll failed")
+            await asyncio.sleep(settings.node_health_interval_seconds)
+
+    async def _fail_over(self, node_ids: list[uuid.UUID]) -> None:
+        # Imported here: node_failover builds on node_service, which imports this module.
+        from app.services.node_failover import fail_over
+
+        try:
+            await asyncio.wait_for(
+                fail_over(node_ids, self.session_factory), settings.node_failover_deadline_seconds,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("failover off %d relay node(s) timed out; retrying next poll", len(node_ids))
+        except Exception:
+            logger.exception("failover off %d relay node(s) failed; retrying next poll", len(node_ids))
+
+    async def _probe(self, client: httpx.AsyncClient, node: Node) -> tuple[float, dict] | None:
+        url = f"http://{node.ip_address}:{node.relay_api_port}/health"
+        start = time.perf_counter()
+        try:
+            resp = await client.get(url, timeout=settings.node_health_timeout_seconds)
+        except httpx.HTTPError:
+            return None
+        latency_ms = (time.perf_counter() - start) * 1000
+        if resp.status_code != 200:
+            return None
+        try:
+            return latency_ms, resp.json()
+        except ValueError:
+            return None
+
+    async def poll_once(self, client: httpx.AsyncClient) -> None:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(Node)
+                .options(noload(Node.sessions))
+                .where(Node.status.in_(POLLED_STATUSES))
+            )
+            nodes = result.scalars().all()
+            db_counts = await count_active_sessions(db, [n.id for n in nodes])
+
+        probes = await asyncio.gather(*(self._probe(client, n) for n in nodes))
+
+        now = datetime.now(timezone.utc)
+        statuses: dict[uuid.UUID, NodeStatus] = {}
+        degrade, restore, loads = [], [], []
+        for node, probe in zip(nodes, probes):
+            entry = self._statuses.get(node.id) or NodeStatus(NodeResponse.model_validate(node))
+            entry.node = NodeResponse.model_validate(node)
+            entry.checked_at = now
+            if probe is None:
+                entry.reachable = False
+                entry.latency_ms = None
+                entry.failures += 1
+                if node.status == "active" and entry.failures >= settings.node_degrade_after_failures:
+                    degrade.append(node.id)
+            else:
+                latency_ms, data = probe
+                entry.reachable = True
+                entry.latency_ms = round(latency_ms, 2)
+                entry.active_sessions = data.get("active_sessions")
+                entry.uptime_secs = data.get("uptime_secs")
+                entry.failures = 0
+                if node.status == "degraded":
+                    restore.append(node.id)
+            load = live_load(db_counts.get(node.id, 0), entry.active_sessions if entry.reachable else None)
+            if load != node.current_load:
+                loads.append({"id": node.id, "current_load": load})
+                entry.node.current_load = load
+            statuses[node.id] = entry
+
+            relay_node_up.labels(node=node.name).set(1 if entry.reachable else 0)
+            if entry.latency_ms is not None:
+                relay_node_latency_seconds.labels(node=node.name).set(entry.latency_ms / 1000)
+
+        if degrade or restore or loads:
+            notices: list[tuple[uuid.UUID, str, dict]] = []
+            async with self.session_factory() as db:
+                if loads:
+                    await db.execute(update(Node), loads)
+                if degrade:
+                    # Only the worker whose UPDATE flips the status notifies.
+                    result = await db.execute(
+                        update(Node)
+                        .where(Node.id.in_(degrade), Node.status == "active")
+                        .values(status="degraded")
+                        .returning(Node.id)
+                    )
+                    degraded: list[uuid.UUID] = result.scalars().all()
+                    notices += await _node_notices(db, degraded, "node.degraded")
+                    if degraded:
+                        logger.warning("marked %d relay node(s) degraded", len(degraded))
+                if restore:
+                    result = await db.execute(
+                        update(Node)
+                        .where(Node.id.in_(restore), Node.status == "degraded")
+                        .values(status="active")
+                        .returning(Node.id)
+                    )
+                    notices += await _node_notices(db, result.scalars().all(), "node.restored")
+                await db.commit()
+            for node_id in degrade:
+                statuses[node_id].node.status = "degraded"
+            for node_id in restore:
+                statuses[node_id].node.status = "active"
+            await publish_events(notices)
+
+        self._statuses = statuses
+        self.last_poll = now
+
+        failed = [
+            node_id for node_id, entry in statuses.items()
+            if entry.node.status == "degraded" and (node_id in degrade or db_counts.get(node_id, 0) > 0)
+        ]
+        if failed and (self.failover_task is None or self.failover_task.done()):
+            self.failover_task = asyncio.create_task(self._fail_over(failed))
+
+
+node_health = NodeHealthMonitor()
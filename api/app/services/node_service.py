@@ -1,49 +1,177 @@
+import time
 import uuid
+from datetime import datetime, timezone
+from typing import TypeVar
 
-import httpx
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
 
+from app.config import settings
 from app.models.node import Node
+from app.schemas.node import NodeRecommendation, NodeRecord, NodeResponse
+from app.services.node_capacity import get_node_counts
+from app.services.node_health import count_active_sessions, live_load, node_health
+
+N = TypeVar("N", bound=NodeResponse)
+
+# Recommendation score weights (sum to 1.0).
+HEADROOM_WEIGHT = 0.5
+HEALTH_WEIGHT = 0.3
+FRESHNESS_WEIGHT = 0.2
+
+
+async def with_live_counts(nodes: list[N]) -> list[N]:
+    """Replace ``current_load`` with the Redis admission counter where one exists."""
+    counts = await get_node_counts([n.id for n in nodes])
+    if not counts:
+        return nodes
+    return [
+        n.model_copy(update={"current_load": counts[n.id]}) if n.id in counts else n
+        for n in nodes
+    ]
+
+
+async def get_node_load(db: AsyncSession, node: Node) -> int:
+    counts = await count_active_sessions(db, [node.id])
+    entry = node_health.get(node.id)
+    relay_count = entry.active_sessions if entry is not None and entry.reachable else None
+    return live_load(counts.get(node.id, 0), relay_count)
+
+
+def node_score(
+    node: NodeResponse,
+    reachable: bool | None,
+    checked_at: datetime | None,
+    now: datetime,
+) -> float:
+    """Rank a node by load headroom, last probe result and probe freshness.
+
+    Full or unreachable nodes score 0. Unknown health (not probed yet) and
+    stale probes count for half.
+    """
+    headroom = 1.0 - node.current_load / max(node.max_sessions, 1)
+    if headroom <= 0 or reachable is False:
+        return 0.0
+    health = 1.0 if reachable else 0.5
+
+    if checked_at is None:
+        freshness = 0.5
+    else:
+        age = (now - checked_at).total_seconds()
+        interval = settings.node_health_interval_seconds
+        # Full credit within two poll intervals, then decay to 0 over ten more.
+        freshness = max(0.0, 1.0 - max(0.0, age - 2 * interval) / (10 * interval))
+
+    score = HEADROOM_WEIGHT * headroom + HEALTH_WEIGHT * health + FRESHNESS_WEIGHT * freshness
+    return round(score, 4)
+
+
+async def recommend_nodes(
+    db: AsyncSession,
+    location: str | None = None,
+    limit: int | None = None,
+) -> list[NodeRecommendation]:
+    """Active nodes ranked best-first; nodes that cannot take sessions are left out."""
+    now = datetime.now(timezone.utc)
+    # (node, reachable, checked_at)
+    candidates: list[tuple[NodeResponse, bool | None, datetime | None]] = []
+
+    if node_health.last_poll is not None:
+        for entry in node_health.statuses():
+            if entry.node.status != "active":
+                continue
+            node = entry.node.model_copy(update={
+                "latency_ms": entry.latency_ms,
+                "relay_active_sessions": entry.active_sessions,
+                "uptime_secs": entry.uptime_secs,
+            })
+            candidates.append((node, entry.reachable, entry.checked_at))
+    else:
+        # Health monitor not running: load from the DB, health unknown.
+        result = await db.execute(
+            select(Node).options(noload(Node.sessions)).where(Node.status == "active")
+        )
+        nodes = result.scalars().all()
+        counts = await count_active_sessions(db, [n.id for n in nodes])
+        for node in nodes:
+            base = NodeResponse.model_validate(node).model_copy(
+                update={"current_load": counts.get(node.id, 0)}
+            )
+            candidates.append((base, None, None))
+
+    if location is not None:
+        candidates = [c for c in candidates if c[0].location == location]
+    live = await with_live_counts([node for node, _, _ in candidates])
+
+    ranked = [
+        NodeRecommendation(**node.model_dump(), score=score)
+        for node, (_, reachable, checked_at) in zip(live, candidates)
+        if (score := node_score(node, reachable, checked_at, now)) > 0
+    ]
+    ranked.sort(
+        key=lambda c: (-c.score, c.latency_ms if c.latency_ms is not None else float("inf"), c.name),
+    )
+    if limit is not None:
+        ranked = ranked[:limit]
+    return ranked
+
+
+_node_table: list[NodeRecord] | None = None
+_node_table_loaded_at = 0.0
+
+
+async def get_node_table(db: AsyncSession) -> list[NodeRecord]:
+    """Active nodes, re-read from the DB at most every ``node_table_ttl_seconds``."""
+    global _node_table, _node_table_loaded_at
+    now = time.monotonic()
+    if _node_table is None or now - _node_table_loaded_at > settings.node_table_ttl_seconds:
+        result = await db.execute(
+            select(Node).options(noload(Node.sessions)).where(Node.status == "active")
+        )
+        _node_table = [NodeRecord.model_validate(n) for n in result.scalars().all()]
+        _node_table_loaded_at = now
+    return _node_table
+
+
+def invalidate_node_table() -> None:
+    global _node_table
+    _node_table = None
 
 
 async def find_backup_node(
     db: AsyncSession,
     primary_node_id: uuid.UUID,
     primary_location: str,
-) -> Node | None:
-    """Find a backup node for multipath: prefer different location, else any other active node."""
-    # Try different location first
-    result = await db.execute(
-        select(Node).where(
-            Node.id != primary_node_id,
-            Node.status == "active",
-            Node.location != primary_location,
-        )
-    )
-    node = result.scalar_one_or_none()
-    if node:
-        return node
-
-    # Fallback: any other active node
-    result = await db.execute(
-        select(Node).where(
-            Node.id != primary_node_id,
-            Node.status == "active",
+) -> NodeRecord | None:
+    """Pick the backup relay for a multipath session.
+
+    Candidates are other active nodes with spare capacity that have not
+    failed their last health probe. A node in another location (an
+    independent network path) always wins over one sharing the primary's
+    location; within that, the recommendation score (headroom, health,
+    probe freshness) decides, and name/id break ties deterministically.
+    """
+    now = datetime.now(timezone.utc)
+    table = await get_node_table(db)
+    counts = await get_node_counts([n.id for n in table]) or {}
+    best: tuple[tuple, NodeRecord] | None = None
+    for node in table:
+        if node.id == primary_node_id:
+            continue
+        entry = node_health.get(node.id)
+        if entry is not None and entry.node.status != "active":
+            continue
+        load = counts.get(node.id, entry.node.current_load if entry else node.current_load)
+        score = node_score(
+            node.model_copy(update={"current_load": load}),
+            entry.reachable if entry else None,
+            entry.checked_at if entry else None,
+            now,
         )
-    )
-    return result.scalar_one_or_none()
-
-
-async def get_node_ping(node_ip: str, relay_api_port: int) -> float | None:
-    """Get ping/health from a relay node."""
-    url = f"http://{node_ip}:{relay_api_port}/health"
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(url)
-            if resp.status_code == 200:
-                data = resp.json()
-                return data.get("ping_ms")
-    except httpx.RequestError:
-        pass
-    return None
+        if score <= 0:
+            continue
+        key = (node.location == primary_location, -score, node.name, str(node.id))
+        if best is None or key < best[0]:
+            best = (key, node)
+    return best[1] if best else None
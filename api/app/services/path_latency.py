@@ -0,0 +1,188 @@
+"""End-to-end path latency: client→relay plus relay→game server.
+
+Gateway agents report the RTT from their relay to each game CIDR. Those
+samples are folded into a per-game matrix (game → node → best RTT) once per
+catalog/sample version, so ranking nodes for a game is a dict lookup per
+node on top of the client's own pings.
+"""
+import asyncio
+import ipaddress
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.node_game_rtt import NodeGameRtt
+from app.schemas.game import GameProfileResponse
+from app.schemas.node import GameRttSample, PathEstimate
+from app.services.catalog_service import CatalogSnapshot, get_catalog_snapshot
+from app.services.node_service import recommend_nodes
+
+
+class LatencyMatrix:
+    """Best measured relay→game RTT per (game, node)."""
+
+    def __init__(
+        self,
+        stamp: tuple,
+        games: list[GameProfileResponse],
+        samples: list[tuple[uuid.UUID, str, float]],
+    ):
+        self.stamp = stamp
+        self.built_at = time.monotonic()
+
+        by_node: dict[uuid.UUID, list[tuple[ipaddress.IPv4Network | ipaddress.IPv6Network, float]]] = {}
+        for node_id, cidr, rtt_ms in samples:
+            by_node.setdefault(node_id, []).append((ipaddress.ip_network(cidr, strict=False), rtt_ms))
+
+        # A game's RTT from a node is its best-served CIDR: matchmaking puts
+        # players on the closest datacenter the game offers.
+        self.by_game: dict[uuid.UUID, dict[uuid.UUID, float]] = {}
+        for game in games:
+            networks = [ipaddress.ip_network(c) for c in game.normalized_server_ips]
+            rtts: dict[uuid.UUID, float] = {}
+            for node_id, measured in by_node.items():
+                hits = [
+                    rtt for net, rtt in measured
+                    if any(net.version == g.version and net.overlaps(g) for g in networks)
+                ]
+                if hits:
+                    rtts[node_id] = min(hits)
+            self.by_game[game.id] = rtts
+
+    def for_game(self, game_id: uuid.UUID) -> dict[uuid.UUID, float]:
+        return self.by_game.get(game_id, {})
+
+
+_matrix: LatencyMatrix | None = None
+_lock = asyncio.Lock()
+
+
+async def _sample_stamp(db: AsyncSession) -> tuple[int, datetime | None]:
+    result = await db.execute(select(func.count(), func.max(NodeGameRtt.measured_at)))
+    count, latest = result.one()
+    return count, latest
+
+
+async def get_latency_matrix(db: AsyncSession, catalog: CatalogSnapshot) -> LatencyMatrix:
+    """Return the matrix, rebuilding when samples or the catalog changed.
+
+    Samples also age out, so the matrix is rebuilt at least every
+    ``node_rtt_matrix_ttl_seconds`` even without new reports.
+    """
+    global _matrix
+    stamp = (catalog.version, *await _sample_stamp(db))
+    matrix = _matrix
+    if (
+        matrix is not None
+        and matrix.stamp == stamp
+        and time.monotonic() - matrix.built_at < settings.node_rtt_matrix_ttl_seconds
+    ):
+        return matrix
+
+    async with _lock:
+        if _matrix is None or _matrix is matrix:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.node_rtt_max_age_seconds)
+            result = await db.execute(
+                select(NodeGameRtt.node_id, NodeGameRtt.cidr, NodeGameRtt.rtt_ms)
+                .where(NodeGameRtt.measured_at >= cutoff)
+            )
+            _matrix = LatencyMatrix(stamp, catalog.games, [tuple(row) for row in result.all()])
+        return _matrix
+
+
+def invalidate_latency_matrix() -> None:
+    global _matrix, _lock
+    _matrix = None
+    _lock = asyncio.Lock()
+
+
+async def store_rtt_samples(db: AsyncSession, node_id: uuid.UUID, samples: list[GameRttSample]) -> int:
+    """Upsert a gateway agent's report; returns the number of samples stored.
+
+    Raises ValueError on a malformed CIDR.
+    """
+    now = datetime.now(timezone.utc)
+    rows = {}
+    for sample in samples:
+        try:
+            cidr = str(ipaddress.ip_network(sample.cidr.strip(), strict=False))
+        except ValueError:
+            raise ValueError(f"Invalid CIDR: {sample.cidr!r}") from None
+        # Last sample for a CIDR wins (one row per key in a single upsert).
+        rows[cidr] = {
+            "id": uuid.uuid4(),
+            "node_id": node_id,
+            "cidr": cidr,
+            "rtt_ms": sample.rtt_ms,
+            "loss_pct": sample.loss_pct,
+            "measured_at": now,
+        }
+    if not rows:
+        return 0
+
+    stmt = insert(NodeGameRtt).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_node_game_rtts_node_cidr",
+        set_={
+            "rtt_ms": stmt.excluded.rtt_ms,
+            "loss_pct": stmt.excluded.loss_pct,
+            "measured_at": stmt.excluded.measured_at,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+    await db.commit()
+    return len(rows)
+
+
+async def recommend_paths(
+    db: AsyncSession,
+    game_slug: str,
+    node_pings: dict[uuid.UUID, float],
+) -> list[PathEstimate]:
+    """Rank nodes that can take a session by estimated client→game RTT.
+
+    Nodes with both legs known come first, by total RTT. The rest follow by
+    whichever leg is known, then by the load/health score.
+    Raises ValueError for an unknown game.
+    """
+    catalog = await get_catalog_snapshot(db)
+    game = catalog.by_slug.get(game_slug)
+    if game is None:
+        raise ValueError("Game not found")
+    server_rtts = (await get_latency_matrix(db, catalog)).for_game(game.id)
+
+    estimates = []
+    for node in await recommend_nodes(db):
+        client_rtt = node_pings.get(node.id)
+        server_rtt = server_rtts.get(node.id)
+        total = client_rtt + server_rtt if client_rtt is not None and server_rtt is not None else None
+        estimates.append(PathEstimate(
+            **node.model_dump(),
+            client_rtt_ms=client_rtt,
+            server_rtt_ms=server_rtt,
+            total_rtt_ms=round(total, 2) if total is not None else None,
+        ))
+
+    def rank(e: PathEstimate):
+        partial = e.client_rtt_ms if e.client_rtt_ms is not None else e.server_rtt_ms
+        return (
+            e.total_rtt_ms is None,
+            e.total_rtt_ms if e.total_rtt_ms is not None else (partial if partial is not None else float("inf")),
+            -e.score,
+            e.name,
+        )
+
+    estimates.sort(key=rank)
+    return estimates
+
+
+async def rtt_targets(db: AsyncSession) -> list[str]:
+    """Every normalized game CIDR, for gateway agents to probe."""
+    catalog = await get_catalog_snapshot(db)
+    return sorted({c for g in catalog.games for c in g.normalized_server_ips})
@@ -1,6 +1,119 @@
+"""HTTP client for the relay nodes' control API.
+
+All calls share one ``httpx.AsyncClient`` so connections to each relay are
+kept alive between session starts and stops instead of paying a fresh
+(often cross-region) TCP handshake per call. The client is created lazily
+and closed from the app lifespan.
+"""
+import asyncio
+import time
+
 import httpx
 
 from app.config import settings
+from app.utils.metrics import (
+    relay_api_request_duration_seconds,
+    relay_http_connections_opened_total,
+    relay_http_pool_connections,
+    relay_http_requests_in_flight,
+)
+
+_client: httpx.AsyncClient | None = None
+# Override for tests (e.g. httpx.MockTransport); None means a real pooled transport.
+_transport: httpx.AsyncBaseTransport | None = None
+
+
+def _pool_size() -> int:
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    return len(getattr(pool, "connections", ()))
+
+
+relay_http_pool_connections.set_function(_pool_size)
+
+
+def get_relay_http() -> httpx.AsyncClient:
+    """Return the shared relay API client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        transport = _transport or httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.relay_pool_max_connections,
+                max_keepalive_connections=settings.relay_pool_max_keepalive,
+                keepalive_expiry=settings.relay_keepalive_expiry_seconds,
+            ),
+        )
+        _client = httpx.AsyncClient(
+            transport=transport,
+            headers={"X-API-Key": settings.relay_api_key},
+            timeout=httpx.Timeout(
+                settings.relay_read_timeout_seconds,
+                connect=settings.relay_connect_timeout_seconds,
+            ),
+        )
+    return _client
+
+
+async def close_relay_http() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def set_relay_transport(transport: httpx.AsyncBaseTransport | None) -> None:
+    """Route relay calls through ``transport`` (tests); drops the current client."""
+    global _client, _transport
+    _transport = transport
+    _client = None
+
+
+async def _trace(event: str, info: dict) -> None:
+    if event == "connection.connect_tcp.complete":
+        stream = info.get("return_value")
+        peer = stream.get_extra_info("server_addr") if stream is not None else None
+        relay_http_connections_opened_total.labels(host=peer[0] if peer else "unknown").inc()
+
+
+async def relay_request(
+    operation: str, method: str, url: str, **kwargs
+) -> httpx.Response | None:
+    """Send one relay API request; None on connection errors or timeouts.
+
+    ``relay_total_timeout_seconds`` bounds the whole call, on top of the
+    per-phase connect/read timeouts.
+    """
+    client = get_relay_http()
+    outcome = "error"
+    start = time.perf_counter()
+    relay_http_requests_in_flight.inc()
+    try:
+        async with asyncio.timeout(settings.relay_total_timeout_seconds):
+            resp = await client.request(method, url, extensions={"trace": _trace}, **kwargs)
+        outcome = str(resp.status_code)
+        return resp
+    except (httpx.RequestError, TimeoutError):
+        return None
+    finally:
+        relay_http_requests_in_flight.dec()
+        relay_api_request_duration_seconds.labels(
+            operation=operation, outcome=outcome,
+        ).observe(time.perf_counter() - start)
+
+
+def relay_game_lists(cidrs: list[str] | None, port_ranges: list[list[int]] | None) -> tuple[list[str], list[str]]:
+    """A profile's normalized address and port lists as ``POST /sessions`` takes them.
+
+    Single hosts are plain IPs and ranges ``start-end``, which is exactly what
+    a relay decodes from a session ticket for the same profile, so the API's
+    registration of a ticket-admitted session matches what the relay holds.
+    """
+    server_ips = []
+    for cidr in cidrs or []:
+        address, _, prefix = cidr.partition("/")
+        host_prefix = "128" if ":" in address else "32"
+        server_ips.append(address if prefix in ("", host_prefix) else cidr)
+    ports = [str(start) if start == end else f"{start}-{end}" for start, end in port_ranges or []]
+    return server_ips, ports
 
 
 async def register_session_on_relay(
@@ -17,13 +130,8 @@ async def register_session_on_relay(
         "game_server_ips": game_server_ips,
         "game_ports": game_ports,
     }
-    headers = {"X-API-Key": settings.relay_api_key}
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.post(url, json=payload, headers=headers)
-            return resp.status_code == 200
-    except httpx.RequestError:
-        return False
+    resp = await relay_request("register", "POST", url, json=payload)
+    return resp is not None and resp.status_code == 200
 
 
 async def unregister_session_on_relay(
@@ -33,10 +141,17 @@ async def unregister_session_on_relay(
 ) -> bool:
     """Remove a session from the relay node."""
     url = f"http://{node_ip}:{relay_api_port}/sessions/{session_token}"
-    headers = {"X-API-Key": settings.relay_api_key}
+    resp = await relay_request("unregister", "DELETE", url)
+    return resp is not None and resp.status_code == 200
+
+
+async def list_sessions_on_relay(node_ip: str, relay_api_port: int) -> set[int] | None:
+    """Session tokens the relay currently holds; None if it could not be listed."""
+    url = f"http://{node_ip}:{relay_api_port}/sessions"
+    resp = await relay_request("list", "GET", url)
+    if resp is None or resp.status_code != 200:
+        return None
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.delete(url, headers=headers)
-            return resp.status_code == 200
-    except httpx.RequestError:
-        return False
+        return {int(token) for token in resp.json()["session_tokens"]}
+    except (ValueError, KeyError, TypeError):
+        return None
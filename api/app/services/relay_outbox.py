@@ -0,0 +1,406 @@
+"""Transactional outbox for relay register/unregister calls.
+
+Session changes add outbox rows in the same transaction, so a committed
+session always has its relay calls on record. The request makes one inline
+delivery attempt; whatever fails or runs past the deadline is retried by
+``relay_outbox_worker`` with exponential backoff until delivered or dead.
+
+Deliveries are idempotent on the relay side: re-registering a token with the
+same targets is a no-op and unregistering an unknown token succeeds.
+"""
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import async_session
+from app.models.game_profile import GameProfile
+from app.models.node import Node
+from app.models.relay_outbox import RelayOutbox
+from app.models.session import Session
+from app.services.relay_client import relay_game_lists, register_session_on_relay, unregister_session_on_relay
+from app.utils.metrics import relay_outbox_deliveries_total, relay_outbox_pending
+from app.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+SUCCESS_STATUS = {"register": "registered", "unregister": "unregistered"}
+
+
+def backoff_delay(attempts: int) -> float:
+    """Seconds before retry number ``attempts + 1`` (exponential, capped, ±20% jitter)."""
+    base = settings.relay_outbox_backoff_base_seconds * 2 ** max(attempts - 1, 0)
+    delay = min(base, settings.relay_outbox_backoff_max_seconds)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _inline_lease() -> timedelta:
+    # Keep workers off rows the request is still delivering itself.
+    return timedelta(seconds=settings.relay_registration_deadline_seconds + 1)
+
+
+def enqueue_register(
+    db: AsyncSession,
+    session: Session,
+    node_id: uuid.UUID,
+    game: GameProfile,
+    inline: bool = True,
+) -> RelayOutbox:
+    """Queue a registration; with ``inline=False`` it is due immediately for the worker."""
+    now = datetime.now(timezone.utc)
+    game_server_ips, game_ports = relay_game_lists(game.normalized_server_ips, game.port_ranges)
+    entry = RelayOutbox(
+        id=uuid.uuid4(),
+        session_id=session.id,
+        node_id=node_id,
+        action="register",
+        session_token=session.session_token,
+        payload={"game_server_ips": game_server_ips, "game_ports": game_ports},
+        status="pending",
+        attempts=1 if inline else 0,
+        next_attempt_at=now + _inline_lease() if inline else now,
+    )
+    db.add(entry)
+    return entry
+
+
+async def enqueue_unregister(
+    db: AsyncSession,
+    session: Session,
+    node_ids: list[uuid.UUID],
+    inline: bool = True,
+) -> list[RelayOutbox]:
+    """Queue unregisters and cancel registrations for the session that never went out.
+
+    With ``inline=False`` the rows are due immediately for the worker.
+    """
+    await db.execute(
+        update(RelayOutbox)
+        .where(
+            RelayOutbox.session_id == session.id,
+            RelayOutbox.action == "register",
+            RelayOutbox.status == "pending",
+        )
+        .values(status="superseded")
+    )
+    now = datetime.now(timezone.utc)
+    entries = []
+    for node_id in node_ids:
+        entry = RelayOutbox(
+            id=uuid.uuid4(),
+            session_id=session.id,
+            node_id=node_id,
+            action="unregister",
+            session_token=session.session_token,
+            payload={},
+            status="pending",
+            attempts=1 if inline else 0,
+            next_attempt_at=now + _inline_lease() if inline else now,
+        )
+        db.add(entry)
+        entries.append(entry)
+    return entries
+
+
+async def enqueue_unregister_legs(
+    db: AsyncSession,
+    legs: list[tuple[uuid.UUID, int, uuid.UUID]],
+    inline: bool = False,
+    delay: float = 0.0,
+) -> list[RelayOutbox]:
+    """Bulk ``enqueue_unregister`` for (session_id, session_token, node_id) legs.
+
+    By default rows are due immediately (or after ``delay`` seconds), so the
+    worker delivers them; with ``inline=True`` the caller delivers them
+    itself and reports back through ``record_attempts``.
+    """
+    if not legs:
+        return []
+    await db.execute(
+        update(RelayOutbox)
+        .where(
+            tuple_(RelayOutbox.session_id, RelayOutbox.node_id).in_(
+                {(session_id, node_id) for session_id, _, node_id in legs}
+            ),
+            RelayOutbox.action == "register",
+            RelayOutbox.status == "pending",
+        )
+        .values(status="superseded")
+    )
+    now = datetime.now(timezone.utc)
+    result = await db.scalars(insert(RelayOutbox).returning(RelayOutbox), [
+        {
+            "id": uuid.uuid4(),
+            "session_id": session_id,
+            "node_id": node_id,
+            "action": "unregister",
+            "session_token": token,
+            "payload": {},
+            "status": "pending",
+            "attempts": 1 if inline else 0,
+            "next_attempt_at": now + (_inline_lease() if inline else timedelta(seconds=delay)),
+        }
+        for session_id, token, node_id in legs
+    ])
+    return list(result.all())
+
+
+async def enqueue_register_legs(
+    db: AsyncSession,
+    legs: list[tuple[uuid.UUID, int, uuid.UUID, list[str], list[str]]],
+) -> list[uuid.UUID]:
+    """Pending registrations for (session_id, session_token, node_id, game_server_ips, game_ports) legs.
+
+    For legs the caller registers itself before the session points at the
+    node (a drain or failover move): committed first, they mark the legs in
+    flight for the reconciler. Leased like an inline attempt; the caller
+    settles them with ``settle_register_legs``.
+    """
+    if not legs:
+        return []
+    next_attempt_at = datetime.now(timezone.utc) + _inline_lease()
+    result = await db.scalars(insert(RelayOutbox).returning(RelayOutbox.id), [
+        {
+            "id": uuid.uuid4(),
+            "session_id": session_id,
+            "node_id": node_id,
+            "action": "register",
+            "session_token": token,
+            "payload": {"game_server_ips": game_server_ips, "game_ports": game_ports},
+            "status": "pending",
+            "attempts": 1,
+            "next_attempt_at": next_attempt_at,
+        }
+        for session_id, token, node_id, game_server_ips, game_ports in legs
+    ])
+    return list(result.all())
+
+
+async def settle_register_legs(db: AsyncSession, entry_ids: list[uuid.UUID], registered: list[bool]) -> None:
+    """Close ``enqueue_register_legs`` entries: delivered, or superseded where the move gave up.
+
+    A leg that failed to register is retried by the next move, possibly on
+    another node, so its registration is no longer owed.
+    """
+    now = datetime.now(timezone.utc)
+    for ok, values in ((True, {"status": "delivered", "delivered_at": now}), (False, {"status": "superseded"})):
+        ids = [entry_id for entry_id, result in zip(entry_ids, registered) if result is ok]
+        if ids:
+            await db.execute(
+                update(RelayOutbox)
+                .where(RelayOutbox.id.in_(ids), RelayOutbox.status == "pending")
+                .values(values)
+            )
+
+
+def record_attempt(entry: RelayOutbox, outcome: str) -> None:
+    """Apply an inline delivery outcome (see ``session_service._relay_round``)."""
+    now = datetime.now(timezone.utc)
+    if outcome == SUCCESS_STATUS[entry.action]:
+        entry.status = "delivered"
+        entry.delivered_at = now
+        relay_outbox_deliveries_total.labels(action=entry.action, result="delivered").inc()
+        return
+    entry.last_error = outcome
+    if outcome == "pending":
+        # Cut short when the request returned: hand over to the worker now.
+        entry.next_attempt_at = now
+    else:
+        entry.next_attempt_at = now + timedelta(seconds=backoff_delay(entry.attempts))
+        relay_outbox_deliveries_total.labels(action=entry.action, result=outcome).inc()
+
+
+async def record_attempts(db: AsyncSession, entries: list[RelayOutbox], outcomes: list[str]) -> None:
+    """``record_attempt`` for a batch, mirroring deliveries onto the sessions.
+
+    Each UPDATE only matches rows still pending at the attempt count the
+    caller wrote: an entry whose inline lease ran out has been claimed by the
+    worker (which bumps ``attempts``), and the worker's result stands.
+    """
+    now = datetime.now(timezone.utc)
+    # (action, attempts, outcome) → entries; one guarded UPDATE each.
+    groups: dict[tuple[str, int, str], list[RelayOutbox]] = {}
+    for entry, outcome in zip(entries, outcomes):
+        groups.setdefault((entry.action, entry.attempts, outcome), []).append(entry)
+
+    delivered: list[RelayOutbox] = []
+    for (action, attempts, outcome), group in groups.items():
+        if outcome == SUCCESS_STATUS[action]:
+            values = {"status": "delivered", "delivered_at": now}
+        elif outcome == "pending":
+            # Cut short at the deadline: hand over to the worker now.
+            values = {"next_attempt_at": now, "last_error": outcome}
+        else:
+            values = {"next_attempt_at": now + timedelta(seconds=backoff_delay(attempts)), "last_error": outcome}
+        result = await db.execute(
+            update(RelayOutbox)
+            .where(
+                RelayOutbox.id.in_([e.id for e in group]),
+                RelayOutbox.status == "pending",
+                RelayOutbox.attempts == attempts,
+            )
+            .values(values)
+            .returning(RelayOutbox.id)
+            .execution_options(synchronize_session=False)
+        )
+        applied = set(result.scalars().all())
+        if outcome == SUCCESS_STATUS[action]:
+            delivered += [e for e in group if e.id in applied]
+        if outcome != "pending":
+            result_label = "delivered" if outcome == SUCCESS_STATUS[action] else outcome
+            relay_outbox_deliveries_total.labels(action=action, result=result_label).inc(len(applied))
+    if delivered:
+        await _record_session_status(db, delivered)
+
+
+async def _deliver(entry: RelayOutbox, node: tuple[str, int]) -> bool:
+    ip, api_port = node
+    if entry.action == "register":
+        return await register_session_on_relay(
+            node_ip=ip,
+            relay_api_port=api_port,
+            session_token=entry.session_token,
+            game_server_ips=entry.payload.get("game_server_ips", []),
+            game_ports=entry.payload.get("game_ports", []),
+        )
+    return await unregister_session_on_relay(
+        node_ip=ip, relay_api_port=api_port, session_token=entry.session_token,
+    )
+
+
+async def process_outbox_batch(session_factory: async_sessionmaker = async_session) -> int:
+    """Claim due entries, deliver them concurrently and record the results.
+
+    Claiming pushes ``next_attempt_at`` out by a lease under FOR UPDATE SKIP
+    LOCKED, so several workers never deliver the same entry at once. Returns
+    the number of entries processed.
+    """
+    now = datetime.now(timezone.utc)
+    lease = timedelta(seconds=settings.relay_total_timeout_seconds + 5)
+    async with session_factory() as db:
+        due = (
+            select(RelayOutbox.id)
+            .where(RelayOutbox.status == "pending", RelayOutbox.next_attempt_at <= now)
+            .order_by(RelayOutbox.next_attempt_at)
+            .limit(settings.relay_outbox_batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = await db.execute(
+            update(RelayOutbox)
+            .where(RelayOutbox.id.in_(due.scalar_subquery()))
+            .values(attempts=RelayOutbox.attempts + 1, next_attempt_at=now + lease)
+            .returning(RelayOutbox)
+        )
+        entries = list(result.scalars().all())
+        nodes: dict[uuid.UUID, tuple[str, int]] = {}
+        if entries:
+            result = await db.execute(
+                select(Node.id, Node.ip_address, Node.relay_api_port)
+                .where(Node.id.in_({e.node_id for e in entries}))
+            )
+            nodes = {row[0]: (row[1], row[2]) for row in result.all()}
+        pending = await db.execute(
+            select(func.count()).select_from(RelayOutbox).where(RelayOutbox.status == "pending")
+        )
+        relay_outbox_pending.set(pending.scalar_one())
+        await db.commit()
+        if not entries:
+            return 0
+
+        deliverable = [e for e in entries if e.node_id in nodes]
+        results = await asyncio.gather(
+            *(_deliver(e, nodes[e.node_id]) for e in deliverable),
+            return_exceptions=True,
+        )
+        ok_ids = {e.id for e, ok in zip(deliverable, results) if ok is True}
+
+        done = datetime.now(timezone.utc)
+        delivered, retries, dead = [], [], []
+        for entry in entries:
+            if entry.id in ok_ids:
+                delivered.append(entry)
+                relay_outbox_deliveries_total.labels(action=entry.action, result="delivered").inc()
+            elif entry.attempts >= settings.relay_outbox_max_attempts or entry.node_id not in nodes:
+                dead.append(entry.id)
+                relay_outbox_deliveries_total.labels(action=entry.action, result="dead").inc()
+            else:
+                retries.append({
+                    "id": entry.id,
+                    "next_attempt_at": done + timedelta(seconds=backoff_delay(entry.attempts)),
+                    "last_error": "failed",
+                })
+                relay_outbox_deliveries_total.labels(action=entry.action, result="failed").inc()
+
+        if delivered:
+            result = await db.execute(
+                update(RelayOutbox)
+                .where(RelayOutbox.id.in_([e.id for e in delivered]), RelayOutbox.status == "pending")
+                .values(status="delivered", delivered_at=done, last_error=None)
+                .returning(RelayOutbox.id)
+                .execution_options(synchronize_session=False)
+            )
+            # Entries superseded meanwhile (the session stopped or moved) say
+            # nothing about the session's legs any more.
+            applied = set(result.scalars().all())
+            await _record_session_status(db, [e for e in delivered if e.id in applied])
+        if dead:
+            await db.execute(
+                update(RelayOutbox)
+                .where(RelayOutbox.id.in_(dead), RelayOutbox.status == "pending")
+                .values(status="dead", last_error="gave up after max attempts")
+            )
+            logger.error("relay outbox: %d entries dead after max attempts", len(dead))
+        if retries:
+            await db.execute(update(RelayOutbox), retries)
+        await db.commit()
+    return len(entries)
+
+
+async def drain_outbox(session_factory: async_sessionmaker = async_session) -> int:
+    """Process batches back to back while they come back full; returns entries processed.
+
+    A bulk stop, drain or reap can queue far more than one batch, and each
+    unregistration left waiting keeps a leg live on its relay.
+    """
+    total = 0
+    while True:
+        processed = await process_outbox_batch(session_factory)
+        total += processed
+        if processed < settings.relay_outbox_batch_size:
+            return total
+
+
+async def _record_session_status(db: AsyncSession, entries: list[RelayOutbox]) -> None:
+    """Mirror late deliveries onto the session's per-leg relay status."""
+    if not entries:
+        return
+    result = await db.execute(
+        select(Session.id, Session.node_id, Session.backup_node_id)
+        .where(Session.id.in_({e.session_id for e in entries}))
+    )
+    legs = {row[0]: (row[1], row[2]) for row in result.all()}
+    # (column, value) → session ids
+    changes: dict[tuple[str, str], list[uuid.UUID]] = {}
+    for entry in entries:
+        primary_id, backup_id = legs.get(entry.session_id, (None, None))
+        if entry.node_id == primary_id:
+            column = "relay_status"
+        elif entry.node_id == backup_id:
+            column = "backup_relay_status"
+        else:
+            continue
+        changes.setdefault((column, SUCCESS_STATUS[entry.action]), []).append(entry.session_id)
+    for (column, value), session_ids in changes.items():
+        await db.execute(update(Session).where(Session.id.in_(session_ids)).values({column: value}))
+
+
+relay_outbox_worker = PeriodicTask(
+    "relay outbox delivery",
+    lambda: settings.relay_outbox_poll_seconds,
+    drain_outbox,
+)
@@ -0,0 +1,150 @@
+"""Periodic reconciliation of active DB sessions with what each relay holds.
+
+Relays keep sessions in memory only, so a restarted relay forgets every
+session the DB still considers active, and a lost unregister leaves an
+orphan on the relay. Each cycle lists the relays' sessions, diffs them with
+the DB and repairs both directions in one concurrent round per cycle.
+
+Listing happens before the DB read: a session that starts or stops in
+between then shows up as missing or stale, and the repair is a harmless
+repeat (registrations and unregistrations are idempotent on the relay).
+Legs with a pending outbox entry are left to the outbox worker. Relays whose
+last health probe reported the same session count as the DB are not listed.
+"""
+import asyncio
+import logging
+import time
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database import async_session
+from app.models.game_profile import GameProfile
+from app.models.node import Node
+from app.models.relay_outbox import RelayOutbox
+from app.models.session import Session
+from app.services.node_health import POLLED_STATUSES, count_active_sessions, node_health
+from app.services.relay_client import (
+    list_sessions_on_relay,
+    register_session_on_relay,
+    relay_game_lists,
+    unregister_session_on_relay,
+)
+from app.utils.metrics import (
+    relay_reconcile_diff,
+    relay_reconcile_repair_seconds,
+    relay_reconcile_repairs_total,
+)
+from app.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+def _needs_listing(node_id: uuid.UUID, db_count: int) -> bool:
+    status = node_health.get(node_id)
+    if status is None or not status.reachable or status.active_sessions is None:
+        return True
+    return status.active_sessions != db_count
+
+
+async def reconcile_relays(session_factory: async_sessionmaker = async_session) -> dict[uuid.UUID, tuple[int, int]]:
+    """Run one reconciliation cycle; returns (missing, stale) counts per listed node."""
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Node.id, Node.name, Node.ip_address, Node.relay_api_port)
+            .where(Node.status.in_(POLLED_STATUSES))
+        )
+        nodes = result.all()
+        db_counts = await count_active_sessions(db, [n.id for n in nodes])
+    nodes = [n for n in nodes if _needs_listing(n.id, db_counts.get(n.id, 0))]
+    if not nodes:
+        return {}
+
+    listings = await asyncio.gather(
+        *(list_sessions_on_relay(n.ip_address, n.relay_api_port) for n in nodes)
+    )
+    listed = {n.id: tokens for n, tokens in zip(nodes, listings) if tokens is not None}
+    for node, tokens in zip(nodes, listings):
+        if tokens is None:
+            logger.warning("relay %s: could not list sessions, skipping reconciliation", node.name)
+    if not listed:
+        return {}
+
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Session.session_token, Session.node_id, Session.backup_node_id, Session.game_profile_id)
+            .where(Session.status == "active")
+        )
+        expected: dict[uuid.UUID, dict[int, uuid.UUID]] = {node_id: {} for node_id in listed}
+        for token, primary_id, backup_id, game_id in result.all():
+            for node_id in (primary_id, backup_id):
+                if node_id in expected:
+                    expected[node_id][token] = game_id
+
+        result = await db.execute(
+            select(RelayOutbox.node_id, RelayOutbox.session_token)
+            .where(RelayOutbox.status == "pending", RelayOutbox.node_id.in_(listed))
+        )
+        in_flight = {(node_id, token) for node_id, token in result.all()}
+
+        diffs: dict[uuid.UUID, tuple[list[int], list[int]]] = {}
+        for node_id, tokens in listed.items():
+            missing = [t for t in expected[node_id] if t not in tokens and (node_id, t) not in in_flight]
+            stale = [t for t in tokens if t not in expected[node_id] and (node_id, t) not in in_flight]
+            diffs[node_id] = (missing, stale)
+
+        game_ids = {expected[node_id][t] for node_id, (missing, _) in diffs.items() for t in missing}
+        games = {}
+        if game_ids:
+            result = await db.execute(
+                select(GameProfile.id, GameProfile.normalized_server_ips, GameProfile.port_ranges)
+                .where(GameProfile.id.in_(game_ids))
+            )
+            games = {row[0]: relay_game_lists(row[1], row[2]) for row in result.all()}
+
+    start = time.perf_counter()
+    calls, labels = [], []
+    for node in nodes:
+        if node.id not in diffs:
+            continue
+        missing, stale = diffs[node.id]
+        relay_reconcile_diff.labels(node=node.name, kind="missing").set(len(missing))
+        relay_reconcile_diff.labels(node=node.name, kind="stale").set(len(stale))
+        if missing or stale:
+            logger.warning(
+                "relay %s: %d missing, %d stale sessions; repairing", node.name, len(missing), len(stale),
+            )
+        for token in missing:
+            server_ips, ports = games.get(expected[node.id][token], ([], []))
+            calls.append(register_session_on_relay(
+                node_ip=node.ip_address,
+                relay_api_port=node.relay_api_port,
+                session_token=token,
+                game_server_ips=server_ips,
+                game_ports=ports,
+            ))
+            labels.append("missing")
+        for token in stale:
+            calls.append(unregister_session_on_relay(
+                node_ip=node.ip_address, relay_api_port=node.relay_api_port, session_token=token,
+            ))
+            labels.append("stale")
+
+    if calls:
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for kind, ok in zip(labels, results):
+            relay_reconcile_repairs_total.labels(
+                kind=kind, result="ok" if ok is True else "failed",
+            ).inc()
+        relay_reconcile_repair_seconds.observe(time.perf_counter() - start)
+
+    return {node_id: (len(missing), len(stale)) for node_id, (missing, stale) in diffs.items()}
+
+
+relay_reconciler = PeriodicTask(
+    "relay session reconcile",
+    lambda: settings.relay_reconcile_interval_seconds,
+    reconcile_relays,
+)
@@ -0,0 +1,117 @@
+"""Signed session tickets: a relay admits a session from the client's first packet.
+
+Without a ticket a relay forwards nothing for a session until the API's
+``POST /sessions`` reaches it, so starting a session waits on that round trip.
+A ticket carries what the registration would (session token, game CIDRs and
+port ranges) plus the placed node's id and an expiry, MACed with
+``relay_ticket_key``, which every relay shares. A relay only admits tickets
+naming its own ``RELAY_NODE_ID``, so a ticket cannot bypass placement. The
+client sends it in a ``FLAG_TICKET`` packet on first contact and the relay
+registers the session locally; the relay outbox still delivers the HTTP
+registration in the background.
+
+Layout (big-endian)::
+
+    version u8 | node id (16-byte UUID) | token u32 | expires u32 (unix seconds)
+    | CIDR count u8 | per CIDR: family u8 (4 or 6), prefix u8, address
+    | range count u8 | per range: start u16, end u16
+    | HMAC-SHA256(key, all of the above)[:16]
+
+The expiry bounds admission only: a relay refuses a ticket presented after
+it, not a session admitted before it. Within it, a relay also refuses
+tickets for tokens the API has recently unregistered from it (stop, reap,
+drain), so a client cannot re-admit an ended session. The same format is
+implemented by the relay (``relay/src/ticket.rs``) and the e2e harness
+(``relay/tests/plg_ticket.py``).
+"""
+import base64
+import hashlib
+import hmac
+import ipaddress
+import struct
+import time
+import uuid
+from datetime import datetime, timezone
+
+from app.config import settings
+from app.models.game_profile import GameProfile
+
+TICKET_VERSION = 2
+MAC_SIZE = 16
+_HEAD = struct.Struct(">B16sII")
+_RANGE = struct.Struct(">HH")
+
+
+def tickets_enabled() -> bool:
+    return bool(settings.relay_ticket_key)
+
+
+def _mac(body: bytes) -> bytes:
+    return hmac.new(settings.relay_ticket_key.encode(), body, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def encode_ticket(
+    node_id: uuid.UUID, session_token: int, cidrs: list[str], port_ranges: list[list[int]], expires: int,
+) -> bytes:
+    """Signed ticket bytes. Raises ValueError if the lists do not fit the format."""
+    if len(cidrs) > 255 or len(port_ranges) > 255:
+        raise ValueError("Too many CIDRs or port ranges for a relay ticket")
+    parts = [_HEAD.pack(TICKET_VERSION, node_id.bytes, session_token, expires), bytes([len(cidrs)])]
+    for cidr in cidrs:
+        net = ipaddress.ip_network(cidr, strict=False)
+        parts.append(bytes([net.version, net.prefixlen]) + net.network_address.packed)
+    parts.append(bytes([len(port_ranges)]))
+    parts.extend(_RANGE.pack(start, end) for start, end in port_ranges)
+    body = b"".join(parts)
+    return body + _mac(body)
+
+
+def decode_ticket(
+    ticket: bytes, now: float | None = None,
+) -> tuple[uuid.UUID, int, list[str], list[list[int]], int] | None:
+    """(node id, token, CIDRs, port ranges, expires) of a valid, unexpired ticket, else None.
+
+    The relay's check, for tests and tooling.
+    """
+    if len(ticket) < _HEAD.size + 2 + MAC_SIZE:
+        return None
+    body, mac = ticket[:-MAC_SIZE], ticket[-MAC_SIZE:]
+    if not hmac.compare_digest(mac, _mac(body)):
+        return None
+    try:
+        version, node_id, token, expires = _HEAD.unpack_from(body)
+        offset = _HEAD.size
+        cidrs = []
+        for _ in range(body[offset]):
+            family, prefix = body[offset + 1], body[offset + 2]
+            size = 4 if family == 4 else 16
+            address = body[offset + 3:offset + 3 + size]
+            if family not in (4, 6) or prefix > size * 8 or len(address) != size:
+                return None
+            cidrs.append(f"{ipaddress.ip_address(address)}/{prefix}")
+            offset += 2 + size
+        offset += 1
+        ranges = []
+        for _ in range(body[offset]):
+            ranges.append(list(_RANGE.unpack_from(body, offset + 1)))
+            offset += _RANGE.size
+    except (IndexError, struct.error):
+        return None
+    if version != TICKET_VERSION or offset + 1 != len(body):
+        return None
+    if expires <= (time.time() if now is None else now):
+        return None
+    return uuid.UUID(bytes=node_id), token, cidrs, ranges, expires
+
+
+def issue_ticket(node_id: uuid.UUID, session_token: int, game: GameProfile) -> tuple[str, datetime] | None:
+    """URL-safe ticket for a session on ``game`` placed on ``node_id`` and its expiry, or None if tickets are off."""
+    if not tickets_enabled():
+        return None
+    expires = int(time.time()) + settings.relay_ticket_ttl_seconds
+    try:
+        ticket = encode_ticket(node_id, session_token, game.normalized_server_ips, game.port_ranges, expires)
+    except ValueError:
+        return None
+    encoded = base64.urlsafe_b64encode(ticket).rstrip(b"=").decode()
+    return encoded, datetime.fromtimestamp(expires, tz=timezone.utc)
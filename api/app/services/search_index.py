@@ -0,0 +1,117 @@
+"""In-memory ranked game search over name, slug and executable names.
+
+Built once per catalog version (see ``catalog_service.CatalogSnapshot``).
+Token prefixes give instant autocomplete matches; padded trigrams make the
+search tolerant to typos ("valornt", "conter strike").
+"""
+import re
+import unicodedata
+from collections import defaultdict
+
+from app.schemas.game import GameProfileResponse
+
+# Field weights: a hit on the display name beats a slug or exe hit.
+NAME_WEIGHT = 3.0
+SLUG_WEIGHT = 2.0
+EXE_WEIGHT = 1.5
+
+EXACT_SCORE = 100.0
+PREFIX_SCORE = 10.0
+TRIGRAM_SCORE = 20.0
+# Share of the query's trigrams a game must contain to count as a fuzzy hit.
+MIN_TRIGRAM_SIMILARITY = 0.5
+
+_MAX_PREFIX_LEN = 24
+# Any run of non-word characters (or underscores) separates tokens; letters
+# and digits of every script are kept, so "Мир танков" and "原神" stay searchable.
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    # NFKC folds full-width and compatibility forms; casefold maps "Straße" to "strasse".
+    return _NON_WORD.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _searchable_fields(game: GameProfileResponse) -> list[tuple[str, float]]:
+    fields = [(game.name, NAME_WEIGHT), (game.slug, SLUG_WEIGHT)]
+    for exe in game.exe_names:
+        stem = exe[:-4] if exe.lower().endswith(".exe") else exe
+        fields.append((stem, EXE_WEIGHT))
+    return fields
+
+
+class GameSearchIndex:
+    def __init__(self, games: list[GameProfileResponse]):
+        self.games = games
+        # text → {doc: weight}
+        self._exact: dict[str, dict[int, float]] = defaultdict(dict)
+        self._prefixes: dict[str, dict[int, float]] = defaultdict(dict)
+        self._trigrams: dict[str, set[int]] = defaultdict(set)
+
+        for doc, game in enumerate(games):
+            for text, weight in _searchable_fields(game):
+                norm = normalize(text)
+                if not norm:
+                    continue
+                for key in {norm, norm.replace(" ", "")}:
+                    if self._exact[key].get(doc, 0.0) < weight:
+                        self._exact[key][doc] = weight
+                for token in norm.split():
+                    for i in range(1, min(len(token), _MAX_PREFIX_LEN) + 1):
+                        postings = self._prefixes[token[:i]]
+                        if postings.get(doc, 0.0) < weight:
+                            postings[doc] = weight
+                    for tri in _trigrams(token):
+                        self._trigrams[tri].add(doc)
+
+    def search(self, query: str, limit: int | None = None) -> list[GameProfileResponse]:
+        norm = normalize(query)
+        tokens = norm.split()
+        if not tokens:
+            return []
+
+        scores: dict[int, float] = defaultdict(float)
+
+        for key in {norm, norm.replace(" ", "")}:
+            for doc, weight in self._exact.get(key, {}).items():
+                scores[doc] = max(scores[doc], EXACT_SCORE * weight)
+
+        # Every query token must prefix some token of the game.
+        prefix_hits: dict[int, float] | None = None
+        for token in tokens:
+            postings = self._prefixes.get(token[:_MAX_PREFIX_LEN], {})
+            if prefix_hits is None:
+                prefix_hits = dict(postings)
+            else:
+                prefix_hits = {
+                    doc: w + postings[doc] for doc, w in prefix_hits.items() if doc in postings
+                }
+            if not prefix_hits:
+                break
+        for doc, weight in (prefix_hits or {}).items():
+            scores[doc] += PREFIX_SCORE * weight
+
+        query_trigrams: set[str] = set()
+        for token in tokens:
+            query_trigrams |= _trigrams(token)
+        hits: dict[int, int] = defaultdict(int)
+        for tri in query_trigrams:
+            for doc in self._trigrams.get(tri, ()):
+                hits[doc] += 1
+        for doc, count in hits.items():
+            similarity = count / len(query_trigrams)
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scores[doc] += TRIGRAM_SCORE * similarity
+
+        ranked = sorted(
+            scores,
+            key=lambda d: (-scores[d], not self.games[d].is_popular, self.games[d].name),
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.games[d] for d in ranked]
@@ -0,0 +1,251 @@
+"""Client heartbeats kept in Redis and written behind to Postgres.
+
+A heartbeat is one EVALSHA: the script checks the session belongs to the
+caller, stores the time and folds the client's RTT/loss into running sums,
+and marks the session dirty. ``heartbeat_flusher`` drains the dirty set
+every ``session_heartbeat_flush_seconds`` and applies last-seen times and
+session-average RTT/loss to the sessions table in one bulk UPDATE per
+batch.
+
+Sessions are tracked from start; an untracked session (Redis was down at
+start, or its key expired) is checked against the DB once and re-tracked.
+The heartbeat route is not rate limited, so a DB miss (a stopped, unknown
+or foreign session) is remembered in Redis for a while and repeated beats
+for it are rejected without touching Postgres.
+"""
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+
+from redis.asyncio.client import Redis
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+from sqlalchemy import DateTime, Float, bindparam, cast, column, func, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import async_session
+from app.models.session import Session
+from app.utils.metrics import session_heartbeats_flushed_total, session_heartbeats_total
+from app.utils.periodic import PeriodicTask
+from app.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "plg:hb:"
+DIRTY_KEY = "plg:hb:dirty"
+MISS_PREFIX = "plg:hb:miss:"
+
+# Returns 1 when recorded, 0 when the session belongs to someone else and
+# -1 when the session is not tracked.
+_HEARTBEAT_SCRIPT = """
+local owner = redis.call('HGET', KEYS[1], 'user_id')
+if not owner then
+    return -1
+end
+if owner ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'last_seen', ARGV[2])
+if ARGV[3] ~= '' then
+    redis.call('HINCRBYFLOAT', KEYS[1], 'rtt_sum', ARGV[3])
+    redis.call('HINCRBY', KEYS[1], 'rtt_n', 1)
+end
+if ARGV[4] ~= '' then
+    redis.call('HINCRBYFLOAT', KEYS[1], 'loss_sum', ARGV[4])
+    redis.call('HINCRBY', KEYS[1], 'loss_n', 1)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('SADD', KEYS[2], ARGV[6])
+return 1
+"""
+
+_script: AsyncScript | None = None
+_script_client: Redis | None = None
+
+
+def _key(session_id: uuid.UUID | str) -> str:
+    return f"{KEY_PREFIX}{session_id}"
+
+
+def _ttl() -> int:
+    # Outlive the reaper's idle window so a slow client is never re-checked in the DB.
+    return int(settings.session_idle_timeout_seconds * 2)
+
+
+def _heartbeat_script() -> AsyncScript:
+    global _script, _script_client
+    client = get_redis()
+    if _script is None or _script_client is not client:
+        _script = client.register_script(_HEARTBEAT_SCRIPT)
+        _script_client = client
+    return _script
+
+
+async def track_session(session_id: uuid.UUID, user_id: uuid.UUID | str) -> None:
+    """Start accepting Redis-only heartbeats for a session (best-effort)."""
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hset(_key(session_id), mapping={"user_id": str(user_id), "last_seen": time.time()})
+        pipe.expire(_key(session_id), _ttl())
+        await pipe.execute()
+    except (RedisError, OSError):
+        logger.warning("could not track session %s for heartbeats", session_id)
+
+
+async def forget_sessions(session_ids: list[uuid.UUID]) -> None:
+    """Stop accepting heartbeats for ended sessions (best-effort; keys also expire)."""
+    if not session_ids:
+        return
+    try:
+        await get_redis().delete(*(_key(session_id) for session_id in session_ids))
+    except (RedisError, OSError):
+        pass
+
+
+async def record_heartbeat(
+    session_id: uuid.UUID,
+    user_id: str,
+    rtt_ms: float | None = None,
+    packet_loss: float | None = None,
+) -> bool | None:
+    """Record a heartbeat in Redis.
+
+    Returns False when the session is tracked for another user, and None when
+    it is not tracked or Redis is unavailable (the caller checks the DB).
+    """
+    try:
+        result = await _heartbeat_script()(
+            keys=[_key(session_id), DIRTY_KEY],
+            args=[
+                user_id,
+                time.time(),
+                "" if rtt_ms is None else rtt_ms,
+                "" if packet_loss is None else packet_loss,
+                _ttl(),
+                str(session_id),
+            ],
+        )
+    except (RedisError, OSError):
+        session_heartbeats_total.labels(result="redis_error").inc()
+        return None
+    if result < 0:
+        return None
+    session_heartbeats_total.labels(result="ok" if result else "rejected").inc()
+    return bool(result)
+
+
+def _miss_key(session_id: uuid.UUID, user_id: str) -> str:
+    return f"{MISS_PREFIX}{session_id}:{user_id}"
+
+
+async def heartbeat_from_db(db: AsyncSession, session_id: uuid.UUID, user_id: str) -> bool:
+    """Slow path for untracked sessions: touch the row, then track it in Redis.
+
+    Misses are cached for ``session_heartbeat_miss_ttl_seconds``.
+    """
+    try:
+        if await get_redis().exists(_miss_key(session_id, user_id)):
+            session_heartbeats_total.labels(result="rejected").inc()
+            return False
+    except (RedisError, OSError):
+        pass
+    result = await db.execute(
+        update(Session)
+        .where(Session.id == session_id, Session.user_id == user_id, Session.status == "active")
+        .values(last_seen_at=func.now())
+        .returning(Session.id)
+    )
+    found = result.scalar_one_or_none() is not None
+    await db.commit()
+    session_heartbeats_total.labels(result="db" if found else "rejected").inc()
+    if found:
+        await track_session(session_id, user_id)
+    else:
+        try:
+            await get_redis().set(
+                _miss_key(session_id, user_id), 1, ex=settings.session_heartbeat_miss_ttl_seconds,
+            )
+        except (RedisError, OSError):
+            pass
+    return found
+
+
+_beats = func.unnest(
+    cast(bindparam("session_ids"), ARRAY(UUID(as_uuid=True))),
+    cast(bindparam("seen_times"), ARRAY(DateTime(timezone=True))),
+    cast(bindparam("avg_pings"), ARRAY(Float)),
+    cast(bindparam("packet_losses"), ARRAY(Float)),
+).table_valued(
+    column("session_id", UUID(as_uuid=True)),
+    column("last_seen_at", DateTime(timezone=True)),
+    column("avg_ping", Float),
+    column("packet_loss", Float),
+).render_derived(name="beats")
+
+_APPLY_HEARTBEATS = (
+    update(Session)
+    .where(Session.id == _beats.c.session_id, Session.status == "active")
+    .values(
+        last_seen_at=func.greatest(Session.last_seen_at, _beats.c.last_seen_at),
+        avg_ping=func.coalesce(_beats.c.avg_ping, Session.avg_ping),
+        packet_loss=func.coalesce(_beats.c.packet_loss, Session.packet_loss),
+    )
+    .execution_options(synchronize_session=False)
+)
+
+
+def _mean(total: str | None, count: str | None) -> float | None:
+    if not total or not count or int(count) == 0:
+        return None
+    return round(float(total) / int(count), 2)
+
+
+async def flush_heartbeats(session_factory: async_sessionmaker = async_session) -> int:
+    """Persist dirty sessions' heartbeat aggregates; returns sessions written."""
+    redis = get_redis()
+    batch_size = settings.session_heartbeat_flush_batch_size
+    flushed = 0
+    while True:
+        session_ids = await redis.spop(DIRTY_KEY, batch_size)
+        if not session_ids:
+            break
+        pipe = redis.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hmget(_key(session_id), "last_seen", "rtt_sum", "rtt_n", "loss_sum", "loss_n")
+        states = await pipe.execute()
+
+        rows = [
+            (uuid.UUID(session_id), datetime.fromtimestamp(float(last_seen), timezone.utc),
+             _mean(rtt_sum, rtt_n), _mean(loss_sum, loss_n))
+            for session_id, (last_seen, rtt_sum, rtt_n, loss_sum, loss_n) in zip(session_ids, states)
+            if last_seen is not None
+        ]
+        if rows:
+            try:
+                async with session_factory() as db:
+                    await db.execute(_APPLY_HEARTBEATS, {
+                        "session_ids": [r[0] for r in rows],
+                        "seen_times": [r[1] for r in rows],
+                        "avg_pings": [r[2] for r in rows],
+                        "packet_losses": [r[3] for r in rows],
+                    })
+                    await db.commit()
+            except Exception:
+                # Keep them dirty for the next flush.
+                await redis.sadd(DIRTY_KEY, *session_ids)
+                raise
+        flushed += len(rows)
+        session_heartbeats_flushed_total.inc(len(rows))
+        if len(session_ids) < batch_size:
+            break
+    return flushed
+
+
+heartbeat_flusher = PeriodicTask(
+    "session heartbeat flush",
+    lambda: settings.session_heartbeat_flush_seconds,
+    flush_heartbeats,
+)
@@ -0,0 +1,85 @@
+"""Expiry of sessions whose client went away without stopping them.
+
+A session counts as alive while heartbeats or client traffic keep moving
+``last_seen_at``. Clients that send neither (older desktop builds, relays
+without traffic reporting) leave it NULL and are never reaped. Sessions idle for ``session_idle_timeout_seconds`` are
+expired in batches of ``session_reaper_batch_size``, one short transaction
+per batch, so a large backlog never holds locks for long. Each batch also
+queues relay unregistrations for both legs in the outbox, gives the
+sessions' node slots back and tells connected clients (``session.expired``).
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database import async_session
+from app.models.session import Session
+from app.services.node_capacity import release
+from app.services.relay_outbox import enqueue_unregister_legs
+from app.services.session_heartbeat import forget_sessions
+from app.utils.events import publish_events
+from app.utils.metrics import sessions_reaped_total
+from app.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+async def reap_stale_sessions(session_factory: async_sessionmaker = async_session) -> int:
+    """Expire every session idle past the timeout; returns how many were expired."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.session_idle_timeout_seconds)
+    batch_size = settings.session_reaper_batch_size
+    total = 0
+    while True:
+        async with session_factory() as db:
+            stale = (
+                select(Session.id)
+                # NULL last_seen_at (never heard from) does not match.
+                .where(Session.status == "active", Session.last_seen_at < cutoff)
+                .order_by(Session.last_seen_at)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            result = await db.execute(
+                update(Session)
+                .where(Session.id.in_(stale.scalar_subquery()), Session.status == "active")
+                # The client was last alive at last_seen_at, not when we noticed.
+                .values(status="expired", ended_at=Session.last_seen_at)
+                .returning(Session.id, Session.session_token, Session.node_id, Session.backup_node_id, Session.user_id)
+                .execution_options(synchronize_session=False)
+            )
+            expired = result.all()
+            legs: list[tuple[uuid.UUID, int, uuid.UUID]] = []
+            for session_id, token, node_id, backup_node_id, _ in expired:
+                legs.append((session_id, token, node_id))
+                if backup_node_id is not None:
+                    legs.append((session_id, token, backup_node_id))
+            await enqueue_unregister_legs(db, legs)
+            await db.commit()
+
+        if not expired:
+            break
+        await release([node_id for _, _, node_id in legs])
+        await forget_sessions([row[0] for row in expired])
+        await publish_events([
+            (user_id, "session.expired", {"session_id": str(session_id)})
+            for session_id, _, _, _, user_id in expired
+        ])
+        total += len(expired)
+        sessions_reaped_total.inc(len(expired))
+        if len(expired) < batch_size:
+            break
+
+    if total:
+        logger.info("expired %d idle sessions", total)
+    return total
+
+
+session_reaper = PeriodicTask(
+    "stale session reaper",
+    lambda: settings.session_reaper_interval_seconds,
+    reap_stale_sessions,
+)
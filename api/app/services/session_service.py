@@ -1,19 +1,118 @@
-import random
-from datetime import datetime, timezone
+import asyncio
+import time
+import uuid
+from collections.abc import Awaitable
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select
+from sqlalchemy import case, func, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models.game_profile import GameProfile
 from app.models.node import Node
+from app.models.relay_outbox import RelayOutbox
 from app.models.session import Session
-from app.services.node_service import find_backup_node
-from app.services.relay_client import register_session_on_relay, unregister_session_on_relay
+from app.schemas.admin import AdminBulkStopNodeSummary, AdminBulkStopRequest, AdminBulkStopResponse
+from app.schemas.node import NodeRecord
+from app.services.node_capacity import admit, release
+from app.services.node_service import find_backup_node, get_node_load, recommend_nodes
+from app.services.relay_client import relay_game_lists, register_session_on_relay, unregister_session_on_relay
+from app.services.relay_outbox import (
+    enqueue_register,
+    enqueue_unregister,
+    enqueue_unregister_legs,
+    record_attempt,
+    record_attempts,
+)
+from app.services.session_heartbeat import forget_sessions, track_session
+from app.services.session_tokens import allocate_session_token
 
 
-def generate_session_token() -> int:
-    """Generate a random session token compatible with PLG Protocol u32."""
-    return random.randint(1, 2**31 - 1)
+async def _relay_round(
+    calls: list[Awaitable[bool]],
+    success: str,
+    wait_for_all: bool = True,
+) -> list[str]:
+    """Run relay API calls concurrently under one deadline; one outcome per call.
+
+    Outcomes are ``success`` (the relay answered 200), "failed" or "timeout".
+    With ``wait_for_all=False`` only the first call (the primary relay) is
+    waited for; others still running then are cut short as "pending" and
+    left to the relay outbox worker.
+    """
+    if not calls:
+        return []
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    deadline = settings.relay_registration_deadline_seconds
+    if wait_for_all:
+        await asyncio.wait(tasks, timeout=deadline)
+    else:
+        await asyncio.wait(tasks[:1], timeout=deadline)
+    outcomes = []
+    for i, task in enumerate(tasks):
+        if not task.done():
+            task.cancel()
+            outcomes.append("timeout" if wait_for_all or i == 0 else "pending")
+        elif task.exception() is None and task.result():
+            outcomes.append(success)
+        else:
+            outcomes.append("failed")
+    return outcomes
+
+
+def _record_relay_status(session: Session, outcomes: list[str | None]) -> None:
+    """Store per-relay outcomes: primary first, then backup. None leaves a status as is."""
+    if outcomes and outcomes[0] is not None:
+        session.relay_status = outcomes[0]
+    if len(outcomes) > 1 and outcomes[1] is not None:
+        session.backup_relay_status = outcomes[1]
+
+
+async def _take_slot(db: AsyncSession, node: Node | NodeRecord) -> bool:
+    """Admit one session on ``node`` (Redis counter, or a DB count if Redis is down)."""
+    admitted = await admit(node)
+    if admitted is None:
+        return await get_node_load(db, node) < node.max_sessions
+    return admitted
+
+
+async def _admit_node(db: AsyncSession, node: Node) -> Node:
+    """Take a slot on ``node``, or on the best same-location node if it is at capacity."""
+    if await _take_slot(db, node):
+        return node
+    for candidate in await recommend_nodes(db, location=node.location):
+        if candidate.id == node.id:
+            continue
+        result = await db.execute(
+            select(Node).where(Node.id == candidate.id, Node.status == "active")
+        )
+        alternative = result.scalar_one_or_none()
+        if alternative is not None and await _take_slot(db, alternative):
+            return alternative
+    raise ValueError("Node is at capacity")
+
+
+async def _reregister(db: AsyncSession, session: Session, game: GameProfile) -> None:
+    """Queue registrations for a returned session's legs that have none pending.
+
+    A repeated start usually means the client could not reach its relay, so
+    the worker re-sends the registration (the relay keeps a live session).
+    """
+    if session.game_profile_id != game.id:
+        game = await db.get(GameProfile, session.game_profile_id)
+    result = await db.execute(
+        select(RelayOutbox.node_id).where(
+            RelayOutbox.session_id == session.id,
+            RelayOutbox.action == "register",
+            RelayOutbox.status == "pending",
+        )
+    )
+    queued = set(result.scalars().all())
+    for node_id in (session.node_id, session.backup_node_id):
+        if node_id is not None and node_id not in queued:
+            enqueue_register(db, session, node_id, game, inline=False)
 
 
 async def start_session(
@@ -22,7 +121,14 @@ async def start_session(
     game_slug: str,
     node_id: str,
     multipath: bool = False,
+    defer_registration: bool = False,
 ) -> Session:
+    """Start a session for ``user_id``, or return the user's active one.
+
+    Relay registration normally happens inline, up to the registration
+    deadline. With ``defer_registration`` (the client was handed a relay
+    ticket) it is left entirely to the relay outbox worker.
+    """
     # Find game profile
     result = await db.execute(
         select(GameProfile).where(GameProfile.slug == game_slug)
@@ -39,60 +145,110 @@ async def start_session(
     if node is None:
         raise ValueError("Node not found or inactive")
 
-    # Check for existing active session
-    result = await db.execute(
-        select(Session).where(
-            Session.user_id == user_id,
-            Session.status == "active",
-        )
-    )
-    existing = result.scalar_one_or_none()
-    if existing is not None:
-        raise ValueError("User already has an active session")
+    node = await _admit_node(db, node)
+    backup_node = None
+    # From here until the commit, any failure (or cancellation) gives the
+    # slots taken so far back.
+    try:
+        # Allocate token and create session
+        session_token = await allocate_session_token(db)
 
-    # Generate token and create session
-    session_token = generate_session_token()
+        # Multipath: find backup node
+        multipath_enabled = False
+        if multipath:
+            candidate = await find_backup_node(db, node.id, node.location)
+            if candidate and await _take_slot(db, candidate):
+                backup_node = candidate
+                multipath_enabled = True
+
+        now = datetime.now(timezone.utc)
+        # One active session per user (ux_sessions_user_active). A concurrent or
+        # repeated start gets the existing row back from the same statement.
+        # The token can still be held by an active session from before the
+        # permuted allocator or a session_token_key rotation; ON CONFLICT only
+        # covers the user index, so that surfaces as ux_sessions_token_active
+        # and the insert is retried once with a fresh token.
+        for attempt in range(2):
+            stmt = insert(Session).values(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                node_id=node.id,
+                game_profile_id=game.id,
+                session_token=session_token,
+                status="active",
+                started_at=now,
+                backup_node_id=backup_node.id if backup_node else None,
+                multipath_enabled=multipath_enabled,
+                bytes_sent=0,
+                bytes_received=0,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Session.user_id],
+                index_where=Session.status == "active",
+                set_={
+                    "updated_at": func.now(),
+                    # Refresh liveness, but only for a client that has proven it
+                    # sends heartbeats or traffic (see session_reaper).
+                    "last_seen_at": case((Session.last_seen_at.is_(None), None), else_=func.now()),
+                },
+            ).returning(Session, literal_column("xmax = 0").label("inserted"))
+            try:
+                async with db.begin_nested():
+                    session, inserted = (await db.execute(stmt)).one()
+                break
+            except IntegrityError as e:
+                if attempt or "ux_sessions_token_active" not in str(e.orig):
+                    raise
+                session_token = await allocate_session_token(db)
+
+        if inserted:
+            # Registrations are owed from the moment the session exists.
+            targets = [node] + ([backup_node] if backup_node else [])
+            entries = [
+                enqueue_register(db, session, target.id, game, inline=not defer_registration)
+                for target in targets
+            ]
+            if defer_registration:
+                _record_relay_status(session, ["pending"] * len(targets))
+        else:
+            await _reregister(db, session, game)
+        await db.commit()
+    except BaseException:
+        await release([node.id, backup_node.id if backup_node else None])
+        raise
+
+    if not inserted:
+        # The user's existing session was returned; the new slots are not used.
+        await release([node.id, backup_node.id if backup_node else None])
+        await track_session(session.id, user_id)
+        return session
 
-    # Multipath: find backup node
-    backup_node = None
-    multipath_enabled = False
-    if multipath:
-        backup_node = await find_backup_node(db, node.id, node.location)
-        if backup_node:
-            multipath_enabled = True
-
-    session = Session(
-        user_id=user_id,
-        node_id=node_id,
-        game_profile_id=game.id,
-        session_token=session_token,
-        status="active",
-        started_at=datetime.now(timezone.utc),
-        backup_node_id=backup_node.id if backup_node else None,
-        multipath_enabled=multipath_enabled,
-    )
-    db.add(session)
-    await db.commit()
     await db.refresh(session)
+    await track_session(session.id, user_id)
+    if defer_registration:
+        return session
 
-    # Register on primary relay (best-effort)
-    await register_session_on_relay(
-        node_ip=node.ip_address,
-        relay_api_port=node.relay_api_port,
-        session_token=session_token,
-        game_server_ips=game.server_ips,
-        game_ports=game.ports,
+    # Deliver inline, returning once the primary is confirmed or the deadline
+    # passes; the outbox worker retries anything not delivered.
+    game_server_ips, game_ports = relay_game_lists(game.normalized_server_ips, game.port_ranges)
+    outcomes = await _relay_round(
+        [
+            register_session_on_relay(
+                node_ip=target.ip_address,
+                relay_api_port=target.relay_api_port,
+                session_token=session_token,
+                game_server_ips=game_server_ips,
+                game_ports=game_ports,
+            )
+            for target in targets
+        ],
+        success="registered",
+        wait_for_all=False,
     )
-
-    # Register on backup relay if multipath
-    if backup_node:
-        await register_session_on_relay(
-            node_ip=backup_node.ip_address,
-            relay_api_port=backup_node.relay_api_port,
-            session_token=session_token,
-            game_server_ips=game.server_ips,
-            game_ports=game.ports,
-        )
+    _record_relay_status(session, outcomes)
+    for entry, outcome in zip(entries, outcomes):
+        record_attempt(entry, outcome)
+    await db.commit()
 
     return session
 
@@ -102,41 +258,156 @@ async def stop_session(
     session_id: str,
     user_id: str,
 ) -> Session:
+    # Row lock: a concurrent stop, reap or bulk stop that got here first has
+    # already ended the session (and released its slots), so this finds none.
     result = await db.execute(
-        select(Session).where(
+        select(Session)
+        .where(
             Session.id == session_id,
             Session.user_id == user_id,
             Session.status == "active",
         )
+        .with_for_update()
+        .execution_options(populate_existing=True)
     )
     session = result.scalar_one_or_none()
     if session is None:
         raise ValueError("Active session not found")
 
+    node_ids = [session.node_id] + ([session.backup_node_id] if session.backup_node_id else [])
     session.status = "stopped"
     session.ended_at = datetime.now(timezone.utc)
+    entries = await enqueue_unregister(db, session, node_ids)
     await db.commit()
     await db.refresh(session)
+    await release([session.node_id, session.backup_node_id])
+    await forget_sessions([session.id])
 
-    # Load node for relay unregister
-    result = await db.execute(select(Node).where(Node.id == session.node_id))
-    node = result.scalar_one_or_none()
-    if node:
-        await unregister_session_on_relay(
-            node_ip=node.ip_address,
-            relay_api_port=node.relay_api_port,
-            session_token=session.session_token,
-        )
-
-    # Unregister from backup relay if multipath
-    if session.backup_node_id:
-        result = await db.execute(select(Node).where(Node.id == session.backup_node_id))
-        backup_node = result.scalar_one_or_none()
-        if backup_node:
-            await unregister_session_on_relay(
-                node_ip=backup_node.ip_address,
-                relay_api_port=backup_node.relay_api_port,
+    # Unregister from primary and backup relays concurrently
+    result = await db.execute(select(Node).where(Node.id.in_(node_ids)))
+    nodes = {n.id: n for n in result.scalars().all()}
+    targets = [nodes[node_id] for node_id in node_ids if node_id in nodes]
+    outcomes = await _relay_round(
+        [
+            unregister_session_on_relay(
+                node_ip=target.ip_address,
+                relay_api_port=target.relay_api_port,
                 session_token=session.session_token,
             )
+            for target in targets
+        ],
+        success="unregistered",
+    )
+    by_node = dict(zip((t.id for t in targets), outcomes))
+    _record_relay_status(session, [by_node.get(node_id) for node_id in node_ids])
+    for entry in entries:
+        if entry.node_id in by_node:
+            record_attempt(entry, by_node[entry.node_id])
+    await db.commit()
 
     return session
+
+
+def _bulk_filter(body: AdminBulkStopRequest) -> list:
+    conditions = [Session.status == "active"]
+    if body.node_id is not None:
+        conditions.append(or_(Session.node_id == body.node_id, Session.backup_node_id == body.node_id))
+    if body.game_profile_id is not None:
+        conditions.append(Session.game_profile_id == body.game_profile_id)
+    if body.user_id is not None:
+        conditions.append(Session.user_id == body.user_id)
+    if body.older_than_minutes is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=body.older_than_minutes)
+        conditions.append(Session.started_at < cutoff)
+    return conditions
+
+
+async def bulk_stop_sessions(db: AsyncSession, body: AdminBulkStopRequest) -> AdminBulkStopResponse:
+    """Stop every active session matching the filters and unregister them.
+
+    One UPDATE closes the sessions and the outbox rows for both legs are
+    written in the same transaction. Unregistrations then go out concurrently,
+    at most ``admin_bulk_relay_concurrency`` at a time per node, until
+    ``relay_registration_deadline_seconds``; legs that fail or are still
+    waiting at the deadline stay in the outbox for the worker.
+    """
+    started = time.monotonic()
+    conditions = _bulk_filter(body)
+    if body.dry_run:
+        count = await db.execute(select(func.count()).select_from(Session).where(*conditions))
+        return AdminBulkStopResponse(
+            dry_run=True,
+            matched=count.scalar_one(),
+            elapsed_ms=round((time.monotonic() - started) * 1000),
+        )
+
+    result = await db.execute(
+        update(Session)
+        .where(*conditions)
+        .values(status="stopped", ended_at=func.now())
+        .returning(Session.id, Session.session_token, Session.node_id, Session.backup_node_id)
+        .execution_options(synchronize_session=False)
+    )
+    stopped = result.all()
+    legs: list[tuple[uuid.UUID, int, uuid.UUID]] = []
+    for session_id, token, node_id, backup_node_id in stopped:
+        legs.append((session_id, token, node_id))
+        if backup_node_id is not None:
+            legs.append((session_id, token, backup_node_id))
+    entries = await enqueue_unregister_legs(db, legs, inline=True)
+    await db.commit()
+    await release([node_id for _, _, node_id in legs])
+    await forget_sessions([row[0] for row in stopped])
+
+    result = await db.execute(
+        select(Node.id, Node.ip_address, Node.relay_api_port)
+        .where(Node.id.in_({entry.node_id for entry in entries}))
+    )
+    nodes = {row[0]: (row[1], row[2]) for row in result.all()}
+    limits = {node_id: asyncio.Semaphore(settings.admin_bulk_relay_concurrency) for node_id in nodes}
+
+    async def unregister(entry: RelayOutbox) -> str:
+        if entry.node_id not in nodes:
+            return "failed"
+        ip, api_port = nodes[entry.node_id]
+        async with limits[entry.node_id]:
+            try:
+                ok = await unregister_session_on_relay(
+                    node_ip=ip, relay_api_port=api_port, session_token=entry.session_token,
+                )
+            except Exception:
+                ok = False
+        return "unregistered" if ok else "failed"
+
+    outcomes = []
+    if entries:
+        tasks = [asyncio.ensure_future(unregister(entry)) for entry in entries]
+        await asyncio.wait(tasks, timeout=settings.relay_registration_deadline_seconds)
+        for task in tasks:
+            if task.done():
+                outcomes.append(task.result())
+            else:
+                task.cancel()
+                outcomes.append("pending")
+    await record_attempts(db, entries, outcomes)
+    await db.commit()
+
+    per_node: dict[uuid.UUID, AdminBulkStopNodeSummary] = {}
+    for entry, outcome in zip(entries, outcomes):
+        summary = per_node.setdefault(entry.node_id, AdminBulkStopNodeSummary(node_id=entry.node_id))
+        summary.legs += 1
+        if outcome == "unregistered":
+            summary.unregistered += 1
+        elif outcome == "pending":
+            summary.pending += 1
+        else:
+            summary.failed += 1
+    return AdminBulkStopResponse(
+        matched=len(stopped),
+        stopped=len(stopped),
+        unregistered=sum(s.unregistered for s in per_node.values()),
+        failed=sum(s.failed for s in per_node.values()),
+        pending=sum(s.pending for s in per_node.values()),
+        nodes=list(per_node.values()),
+        elapsed_ms=round((time.monotonic() - started) * 1000),
+    )
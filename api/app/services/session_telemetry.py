@@ -0,0 +1,122 @@
+"""Ingestion of per-session traffic counters reported by relay nodes.
+
+A node's report is applied with a single ``UPDATE sessions ... FROM`` over
+the whole batch rather than one statement per session. Counters are
+cumulative on the relay, so they only move forward here (GREATEST): a
+late or repeated report cannot roll a session's totals back. A relay
+restart resets its counters, and the session then keeps its old totals
+until the new ones overtake them.
+
+Liveness cannot use those totals: after a restart, drain or failover the
+reporting relay counts from zero and would not pass them for a long time.
+Each relay's last client→relay counter is kept per session
+(``relay_bytes_sent``), and the session is seen alive whenever that relay's
+own counter has moved, including a reset to a new non-zero count.
+
+The updated totals go out to connected clients as ``session.stats`` events.
+"""
+import time
+import uuid
+
+from sqlalchemy import BigInteger, Float, Integer, String, and_, bindparam, case, cast, column, func, or_, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.session import Session
+from app.schemas.session import SessionTrafficSample
+from app.utils.events import publish_batch
+from app.utils.metrics import session_traffic_apply_seconds, session_traffic_samples_total
+
+# The report travels as one array per column and is unnested into rows, so
+# the statement compiles once and any batch size is five parameters.
+_traffic = func.unnest(
+    cast(bindparam("session_tokens"), ARRAY(Integer)),
+    cast(bindparam("sent_counts"), ARRAY(BigInteger)),
+    cast(bindparam("received_counts"), ARRAY(BigInteger)),
+    cast(bindparam("avg_pings"), ARRAY(Float)),
+    cast(bindparam("packet_losses"), ARRAY(Float)),
+).table_valued(
+    column("session_token", Integer),
+    column("bytes_sent", BigInteger),
+    column("bytes_received", BigInteger),
+    column("avg_ping", Float),
+    column("packet_loss", Float),
+).render_derived(name="traffic")
+
+_node_key = bindparam("reporting_node_key", type_=String)
+_previous_sent = cast(Session.relay_bytes_sent.op("->>")(_node_key), BigInteger)
+
+_APPLY_TRAFFIC = (
+    update(Session)
+    .where(
+        Session.session_token == _traffic.c.session_token,
+        Session.status == "active",
+        or_(Session.node_id == bindparam("reporting_node_id"), Session.backup_node_id == bindparam("reporting_node_id")),
+    )
+    .values(
+        bytes_sent=func.greatest(Session.bytes_sent, _traffic.c.bytes_sent),
+        bytes_received=func.greatest(Session.bytes_received, _traffic.c.bytes_received),
+        avg_ping=func.coalesce(_traffic.c.avg_ping, Session.avg_ping),
+        packet_loss=func.coalesce(_traffic.c.packet_loss, Session.packet_loss),
+        relay_bytes_sent=Session.relay_bytes_sent.op("||")(func.jsonb_build_object(_node_key, _traffic.c.bytes_sent)),
+        # Only client→relay bytes prove the client is alive; the game server
+        # keeps sending for a while after a client disappears.
+        last_seen_at=case(
+            (
+                and_(_traffic.c.bytes_sent > 0, _previous_sent.is_distinct_from(_traffic.c.bytes_sent)),
+                func.now(),
+            ),
+            else_=Session.last_seen_at,
+        ),
+    )
+    .returning(
+        Session.user_id, Session.id, Session.bytes_sent, Session.bytes_received, Session.avg_ping, Session.packet_loss,
+    )
+    .execution_options(synchronize_session=False)
+)
+
+
+async def apply_traffic_samples(
+    db: AsyncSession,
+    node_id: uuid.UUID,
+    samples: list[SessionTrafficSample],
+) -> int:
+    """Write a node's traffic report to its active sessions; returns rows updated.
+
+    Only sessions with ``node_id`` as primary or backup leg are touched, so a
+    relay cannot write to sessions it does not carry.
+    """
+    start = time.perf_counter()
+    # Last sample for a token wins (one row per session in the statement).
+    latest = list({s.session_token: s for s in samples}.values())
+    if not latest:
+        return 0
+    result = await db.execute(_APPLY_TRAFFIC, {
+        "reporting_node_id": node_id,
+        "reporting_node_key": str(node_id),
+        "session_tokens": [s.session_token for s in latest],
+        "sent_counts": [s.bytes_sent for s in latest],
+        "received_counts": [s.bytes_received for s in latest],
+        "avg_pings": [s.avg_ping for s in latest],
+        "packet_losses": [s.packet_loss for s in latest],
+    })
+    rows = result.all()
+    updated = len(rows)
+    await db.commit()
+    # One message for the whole report; workers forward each user's stats
+    # only if that user has a stream open.
+    await publish_batch("session.stats", [
+        (user_id, {
+            "session_id": str(session_id),
+            "bytes_sent": sent,
+            "bytes_received": received,
+            "avg_ping": ping,
+            "packet_loss": loss,
+        })
+        for user_id, session_id, sent, received, ping, loss in rows
+    ])
+
+    session_traffic_samples_total.labels(result="applied").inc(updated)
+    session_traffic_samples_total.labels(result="unmatched").inc(max(len(latest) - updated, 0))
+    session_traffic_apply_seconds.observe(time.perf_counter() - start)
+    return updated
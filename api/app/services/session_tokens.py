@@ -0,0 +1,84 @@
+"""Session token allocation: a keyed permutation over a database counter.
+
+Tokens identify a session in every relay packet, so two active sessions must
+never share one and a user must not be able to guess another's. Each token
+is ``1 + feistel(counter)``: a 4-round Feistel network over 30 bits keyed
+from ``session_token_key`` maps distinct counter values to distinct,
+unpredictable tokens in ``[1, 2**30]`` (within the relay's u32 and the
+column's int32).
+
+Counter values come from the ``session_token_seq`` sequence in blocks of
+``TOKEN_BLOCK_SIZE`` (the sequence's increment), so a worker queries the
+database once per block and allocation is otherwise pure arithmetic. A token
+repeats only after 2**30 allocations; the partial unique index on active
+sessions' tokens backs the guarantee.
+"""
+import asyncio
+import hashlib
+import hmac
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.session import TOKEN_BLOCK_SIZE, session_token_seq
+
+TOKEN_BITS = 30
+_HALF_BITS = TOKEN_BITS // 2
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_ROUNDS = 4
+
+_round_keys: list[bytes] | None = None
+_next = 0
+_end = 0
+_lock: asyncio.Lock | None = None
+
+
+def _keys() -> list[bytes]:
+    global _round_keys
+    if _round_keys is None:
+        secret = (settings.session_token_key or settings.jwt_secret_key).encode()
+        _round_keys = [
+            hmac.new(secret, f"session-token-round-{i}".encode(), hashlib.sha256).digest()
+            for i in range(_ROUNDS)
+        ]
+    return _round_keys
+
+
+def _round(key: bytes, half: int) -> int:
+    digest = hashlib.blake2s(half.to_bytes(2, "big"), key=key, digest_size=4).digest()
+    return int.from_bytes(digest, "big") & _HALF_MASK
+
+
+def permute(counter: int) -> int:
+    """Bijection on ``[0, 2**30)``: distinct counters give distinct results."""
+    left, right = (counter >> _HALF_BITS) & _HALF_MASK, counter & _HALF_MASK
+    for key in _keys():
+        left, right = right, left ^ _round(key, right)
+    return (left << _HALF_BITS) | right
+
+
+def token_for(counter: int) -> int:
+    return 1 + permute(counter % (1 << TOKEN_BITS))
+
+
+async def allocate_session_token(db: AsyncSession) -> int:
+    """Next session token; reserves a new counter block from the DB when needed."""
+    global _next, _end, _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    async with _lock:
+        if _next >= _end:
+            start = (await db.execute(select(session_token_seq.next_value()))).scalar_one()
+            _next, _end = start, start + TOKEN_BLOCK_SIZE
+        counter = _next
+        _next += 1
+    return token_for(counter)
+
+
+def reset_token_allocator() -> None:
+    """Forget the reserved block and key schedule (tests, key rotation)."""
+    global _round_keys, _next, _end, _lock
+    _round_keys = None
+    _next = _end = 0
+    _lock = None
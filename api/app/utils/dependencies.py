@@ -1,9 +1,11 @@
+import hmac
 from datetime import datetime, timezone
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import get_db
 from app.models.user import User
 from app.services.auth_service import decode_access_token, get_user_by_id
@@ -30,6 +32,19 @@ async def get_current_user(
     return user
 
 
+async def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> str:
+    """User id from the access token alone, for hot paths that skip the users table."""
+    payload = decode_access_token(credentials.credentials)
+    if payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+        )
+    return payload["sub"]
+
+
 async def get_admin_user(
     user: User = Depends(get_current_user),
 ) -> User:
@@ -56,3 +71,12 @@ async def get_subscribed_user(
             detail="Subscription expired",
         )
     return user
+
+
+async def verify_relay_api_key(x_api_key: str = Header("")) -> None:
+    """Authenticate calls from relay nodes and gateway agents (shared RELAY_API_KEY)."""
+    if not hmac.compare_digest(x_api_key, settings.relay_api_key):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+        )
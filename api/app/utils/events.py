@@ -0,0 +1,199 @@
+"""Client-facing events over Redis pub/sub.
+
+Services publish small JSON events addressed to one user on a single
+channel; each API worker holds one subscription to it (``event_hub``) and
+forwards every event to that user's open streams on the worker. Delivery is
+best-effort: anything an event announces is also visible to a client that
+polls the API.
+
+Event types: ``session.expired``, ``session.migrated``, ``session.failover``,
+``session.stats``, ``node.degraded``, ``node.restored`` and
+``subscription.expiring``. High-volume events (traffic stats) go out as one
+batch message per report instead of one message per user.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.utils.metrics import event_stream_connections, events_delivered_total
+from app.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "plg:events"
+
+
+def encode_event(user_id: uuid.UUID | str, event_type: str, data: dict[str, Any]) -> str:
+    return json.dumps({"user_id": str(user_id), "type": event_type, "data": data}, default=str)
+
+
+async def publish_events(events: list[tuple[uuid.UUID | str, str, dict[str, Any]]]) -> int:
+    """Publish (user_id, type, data) events in one pipeline; returns how many went out."""
+    if not events:
+        return 0
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for user_id, event_type, data in events:
+            pipe.publish(CHANNEL, encode_event(user_id, event_type, data))
+        await pipe.execute()
+    except (RedisError, OSError):
+        logger.warning("could not publish %d events", len(events))
+        return 0
+    return len(events)
+
+
+async def publish_batch(event_type: str, items: list[tuple[uuid.UUID | str, dict[str, Any]]]) -> bool:
+    """Publish one message carrying an event of ``event_type`` for each (user_id, data)."""
+    if not items:
+        return False
+    message = json.dumps(
+        {"type": event_type, "batch": [{"user_id": str(user_id), "data": data} for user_id, data in items]},
+        default=str,
+    )
+    try:
+        await get_redis().publish(CHANNEL, message)
+    except (RedisError, OSError):
+        logger.warning("could not publish %s batch of %d", event_type, len(items))
+        return False
+    return True
+
+
+def sse_frame(event_type: str, data: Any) -> bytes:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+class Subscriber:
+    """One open stream: a short buffer of encoded frames and a wake-up future."""
+
+    __slots__ = ("user_id", "frames", "waiter", "closed")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.frames: list[bytes] = []
+        self.waiter: asyncio.Future | None = None
+        self.closed = False
+
+    def _wake(self) -> None:
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def push(self, frame: bytes) -> None:
+        if len(self.frames) >= settings.event_stream_buffer_size:
+            # A client this far behind gets the newest events, not all of them.
+            del self.frames[0]
+        self.frames.append(frame)
+        self._wake()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake()
+
+    async def wait(self, timeout: float) -> list[bytes]:
+        """Frames received so far, waiting up to ``timeout`` if there are none."""
+        if not self.frames and not self.closed:
+            loop = asyncio.get_running_loop()
+            self.waiter = loop.create_future()
+            # A timer handle is cheaper than wait_for's extra future per wait.
+            timer = loop.call_later(timeout, self._wake)
+            try:
+                await self.waiter
+            finally:
+                timer.cancel()
+                self.waiter = None
+        frames, self.frames = self.frames, []
+        return frames
+
+
+class EventHub:
+    """The worker's single Redis subscription, fanned out to local subscribers.
+
+    The subscription starts with the first stream and reconnects on errors;
+    events published while it is down are lost (see the module docstring).
+    """
+
+    def __init__(self):
+        self._subscribers: dict[str, set[Subscriber]] = {}
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, user_id: str) -> Subscriber:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="event hub")
+        subscriber = Subscriber(user_id)
+        self._subscribers.setdefault(user_id, set()).add(subscriber)
+        event_stream_connections.inc()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers is not None and subscriber in subscribers:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.user_id]
+            event_stream_connections.dec()
+
+    def dispatch(self, raw: str) -> int:
+        """Hand one published message to the local streams it addresses."""
+        message = json.loads(raw)
+        event_type = message["type"]
+        items = message["batch"] if "batch" in message else [message]
+        delivered = 0
+        for item in items:
+            subscribers = self._subscribers.get(item["user_id"])
+            if not subscribers:
+                continue
+            frame = sse_frame(event_type, item["data"])
+            for subscriber in subscribers:
+                subscriber.push(frame)
+                delivered += 1
+        if delivered:
+            events_delivered_total.labels(type=event_type).inc(delivered)
+        return delivered
+
+    async def _run(self) -> None:
+        while True:
+            # A dedicated connection without the pool's socket timeout: the
+            # subscription is idle for as long as nothing is published.
+            client = aioredis.from_url(
+                settings.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=settings.redis_connect_timeout_seconds,
+                health_check_interval=30,
+            )
+            try:
+                async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            try:
+                                self.dispatch(message["data"])
+                            except (ValueError, KeyError, TypeError):
+                                logger.warning("dropping malformed event message")
+            except (RedisError, OSError):
+                logger.warning("event subscription lost, reconnecting")
+                await asyncio.sleep(1.0)
+            finally:
+                await client.aclose()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+event_hub = EventHub()
+
+
+def reset_event_hub() -> None:
+    """Forget subscribers and the subscription task (tests: one event loop each)."""
+    event_hub._subscribers.clear()
+    event_hub._task = None
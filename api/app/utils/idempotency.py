@@ -0,0 +1,123 @@
+"""Idempotency-Key support for endpoints that must not run twice on retry.
+
+The first request with a key claims it in Redis (SET NX) and runs; its
+response (success or 4xx) is stored for ``idempotency_ttl_seconds`` and
+replayed verbatim to later requests with the same key. A duplicate that
+arrives while the first is still running waits for its result instead of
+running in parallel. Keys are scoped per endpoint and user, and a key reused
+with a different request body is rejected.
+
+Server errors release the key so the client can retry. Without Redis the
+request simply runs.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "plg:idem:"
+_PENDING = "pending"
+
+
+def _fingerprint(body: BaseModel | None) -> str:
+    raw = body.model_dump_json() if body is not None else ""
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _replay(stored: dict, fingerprint: str) -> JSONResponse:
+    if stored["fingerprint"] != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request",
+        )
+    return JSONResponse(
+        status_code=stored["status"],
+        content=stored["body"],
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+async def _wait_for_result(key: str) -> dict | None:
+    """Poll until the in-flight request stores its result (None if it gave up)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.idempotency_lock_seconds
+    delay = 0.02
+    while loop.time() < deadline:
+        await asyncio.sleep(delay)
+        value = await get_redis().get(key)
+        if value is None:
+            return None
+        if value != _PENDING:
+            return json.loads(value)
+        delay = min(delay * 2, 0.25)
+    return None
+
+
+async def run_idempotent(
+    scope: str,
+    user_id: str,
+    idempotency_key: str | None,
+    body: BaseModel | None,
+    handler: Callable[[], Awaitable[BaseModel]],
+    status_code: int = status.HTTP_200_OK,
+) -> Any:
+    """Run ``handler`` at most once per (scope, user, key) within the TTL."""
+    if not idempotency_key:
+        return await handler()
+
+    key = f"{KEY_PREFIX}{scope}:{user_id}:{idempotency_key}"
+    fingerprint = _fingerprint(body)
+    redis = get_redis()
+    try:
+        claimed = await redis.set(key, _PENDING, nx=True, ex=int(settings.idempotency_lock_seconds))
+        if not claimed:
+            value = await redis.get(key)
+            stored = json.loads(value) if value and value != _PENDING else await _wait_for_result(key)
+            if stored is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress",
+                )
+            return _replay(stored, fingerprint)
+    except (RedisError, OSError):
+        logger.warning("idempotency store unavailable, running %s without it", scope)
+        return await handler()
+
+    async def release() -> None:
+        try:
+            await redis.delete(key)
+        except (RedisError, OSError):
+            pass
+
+    async def store(code: int, content: Any) -> None:
+        record = {"fingerprint": fingerprint, "status": code, "body": content}
+        try:
+            await redis.set(key, json.dumps(record), ex=int(settings.idempotency_ttl_seconds))
+        except (RedisError, OSError):
+            logger.warning("could not store idempotent response for %s", scope)
+
+    try:
+        result = await handler()
+    except HTTPException as e:
+        if e.status_code < 500:
+            await store(e.status_code, {"detail": e.detail})
+        else:
+            await release()
+        raise
+    except BaseException:
+        await release()
+        raise
+    await store(status_code, result.model_dump(mode="json"))
+    return result
@@ -1,6 +1,6 @@
 import time
 
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from starlette.responses import Response
 from starlette.types import ASGIApp, Receive, Scope, Send
 
@@ -17,6 +17,133 @@ api_request_duration_seconds = Histogram(
     buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
 )
 
+relay_node_up = Gauge(
+    "relay_node_up",
+    "Whether the relay answered its last health probe",
+    ["node"],
+)
+
+relay_node_latency_seconds = Gauge(
+    "relay_node_latency_seconds",
+    "Round-trip time of the last relay health probe",
+    ["node"],
+)
+
+relay_node_sessions = Gauge(
+    "relay_node_sessions",
+    "Active sessions counted against each relay's capacity",
+    ["node"],
+)
+
+node_admission_rejected_total = Counter(
+    "node_admission_rejected_total",
+    "Session starts refused because the node was at max_sessions",
+    ["node"],
+)
+
+relay_outbox_deliveries_total = Counter(
+    "relay_outbox_deliveries_total",
+    "Relay outbox delivery attempts by action and result",
+    ["action", "result"],
+)
+
+relay_outbox_pending = Gauge(
+    "relay_outbox_pending",
+    "Relay outbox entries waiting for delivery",
+)
+
+relay_reconcile_diff = Gauge(
+    "relay_reconcile_diff",
+    "Sessions out of sync with the DB at the last reconcile, per node",
+    ["node", "kind"],
+)
+
+relay_reconcile_repairs_total = Counter(
+    "relay_reconcile_repairs_total",
+    "Relay session repairs issued by the reconciler",
+    ["kind", "result"],
+)
+
+relay_reconcile_repair_seconds = Histogram(
+    "relay_reconcile_repair_seconds",
+    "Time to push one reconcile cycle's repairs to the relays",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+node_drain_legs_total = Counter(
+    "node_drain_legs_total",
+    "Session legs handled while draining nodes (moved, dropped backup, failed)",
+    ["result"],
+)
+
+session_failovers_total = Counter(
+    "session_failovers_total",
+    "Multipath failover outcomes (promoted backup, new backup added, left single-path)",
+    ["result"],
+)
+
+event_stream_connections = Gauge(
+    "event_stream_connections",
+    "Open server-sent event streams on this worker",
+)
+
+events_delivered_total = Counter(
+    "events_delivered_total",
+    "Events written to open streams, by type",
+    ["type"],
+)
+
+session_heartbeats_total = Counter(
+    "session_heartbeats_total",
+    "Session heartbeats received, by how they were recorded",
+    ["result"],
+)
+
+session_heartbeats_flushed_total = Counter(
+    "session_heartbeats_flushed_total",
+    "Session heartbeat aggregates written behind to Postgres",
+)
+
+sessions_reaped_total = Counter(
+    "sessions_reaped_total",
+    "Active sessions expired by the reaper after going idle",
+)
+
+session_traffic_samples_total = Counter(
+    "session_traffic_samples_total",
+    "Relay traffic samples received, by whether they matched an active session",
+    ["result"],
+)
+
+session_traffic_apply_seconds = Histogram(
+    "session_traffic_apply_seconds",
+    "Time to apply one relay traffic report to the sessions table",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+relay_api_request_duration_seconds = Histogram(
+    "relay_api_request_duration_seconds",
+    "Relay control API call duration in seconds",
+    ["operation", "outcome"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+relay_http_connections_opened_total = Counter(
+    "relay_http_connections_opened_total",
+    "New TCP connections opened to relay control APIs (pool misses)",
+    ["host"],
+)
+
+relay_http_requests_in_flight = Gauge(
+    "relay_http_requests_in_flight",
+    "Relay control API requests currently in flight",
+)
+
+relay_http_pool_connections = Gauge(
+    "relay_http_pool_connections",
+    "Connections currently held by the relay HTTP pool",
+)
+
 # Paths to exclude from metrics collection (high-cardinality or internal)
 _SKIP_PATHS = {"/api/metrics", "/api/health"}
 
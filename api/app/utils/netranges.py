@@ -0,0 +1,50 @@
+"""Canonical forms for game-server address and port lists.
+
+Profiles are edited by hand and often carry overlapping or adjacent CIDRs and
+port ranges. Capture filters on the client grow with every clause, so the API
+stores the minimal equivalent sets alongside the raw lists.
+"""
+import ipaddress
+
+
+def aggregate_cidrs(cidrs: list[str]) -> list[str]:
+    """Collapse CIDRs/plain IPs into the minimal covering prefix set.
+
+    Raises ValueError on malformed entries.
+    """
+    networks: dict[int, list] = {4: [], 6: []}
+    for raw in cidrs:
+        try:
+            net = ipaddress.ip_network(raw.strip(), strict=False)
+        except ValueError:
+            raise ValueError(f"Invalid CIDR: {raw!r}") from None
+        networks[net.version].append(net)
+
+    collapsed = []
+    for version in (4, 6):
+        collapsed.extend(ipaddress.collapse_addresses(networks[version]))
+    return [str(net) for net in collapsed]
+
+
+def parse_port_range(raw: str) -> tuple[int, int]:
+    """Parse "27015" or "27015-27050" into an inclusive (start, end) pair."""
+    start_str, _, end_str = raw.partition("-")
+    try:
+        start = int(start_str)
+        end = int(end_str) if end_str else start
+    except ValueError:
+        raise ValueError(f"Invalid port range: {raw!r}") from None
+    if not (0 < start <= end <= 65535):
+        raise ValueError(f"Invalid port range: {raw!r}")
+    return start, end
+
+
+def merge_port_ranges(ports: list[str]) -> list[list[int]]:
+    """Merge overlapping and adjacent port ranges into sorted [start, end] pairs."""
+    merged: list[list[int]] = []
+    for start, end in sorted(parse_port_range(p) for p in ports):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
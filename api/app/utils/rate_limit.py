@@ -34,8 +34,9 @@ class RateLimitMiddleware:
 
         path = scope["path"]
 
-        # Skip rate limiting for health check
-        if path == "/api/health":
+        # Skip rate limiting for health check and session heartbeats (periodic,
+        # authenticated, Redis-only; the limiter would double their round trips)
+        if path == "/api/health" or (path.startswith("/api/sessions/") and path.endswith("/heartbeat")):
             await self.app(scope, receive, send)
             return
 
@@ -0,0 +1,35 @@
+"""Shared Redis client for API-side state (counters, idempotency, events).
+
+Created lazily so importing modules (and tests) never need a running Redis.
+Callers treat Redis as best-effort and fall back when it is unreachable.
+"""
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+_redis: aioredis.Redis | None = None
+
+
+def get_redis() -> aioredis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=settings.redis_connect_timeout_seconds,
+            socket_timeout=settings.redis_socket_timeout_seconds,
+        )
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+def reset_redis() -> None:
+    """Drop the client without closing it (its pool is bound to a dead event loop)."""
+    global _redis
+    _redis = None
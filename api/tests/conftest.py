@@ -1,7 +1,12 @@
+import asyncio
+import json
 from datetime import datetime, timedelta, timezone
 
+import httpx
+import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.config import settings
@@ -12,13 +17,106 @@ from app.models.game_profile import GameProfile
 from app.models.node import Node
 from app.models.payment import Payment
 from app.models.promo_code import PromoCode
+from app.models.session import Session
 from app.models.subscription import Subscription
 from app.models.user import User
 from app.services.auth_service import create_access_token, hash_password
+from app.services.catalog_service import invalidate_catalog_snapshot
+from app.services.node_service import invalidate_node_table
+from app.services.path_latency import invalidate_latency_matrix
+from app.services.relay_client import set_relay_transport
+from app.services.session_tokens import reset_token_allocator
+from app.utils.events import reset_event_hub
+from app.utils.redis_pool import reset_redis
 
 TEST_DB_URL = settings.database_url.rsplit("/", 1)[0] + "/plgames_test"
 
 
+class FakeRelay:
+    """Local stand-in for the relays' session API, keyed by host.
+
+    ``sessions`` is what each relay holds; ``registered`` every token POSTed to
+    it and ``deleted`` every token DELETEd. With a ``delay`` each call takes that
+    long, and ``peak`` records the most calls a host had in flight at once.
+    """
+
+    def __init__(self):
+        self.failing_hosts: tuple[str, ...] = ()
+        self.delay = 0.0
+        self.sessions: dict[str, set[int]] = {}
+        self.registered: dict[str, set[int]] = {}
+        self.deleted: dict[str, list[int]] = {}
+        self.requests: list[tuple[str, str]] = []
+        self.in_flight: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.requests.append((request.method, request.url.path))
+        self.in_flight[host] = self.in_flight.get(host, 0) + 1
+        self.peak[host] = max(self.peak.get(host, 0), self.in_flight[host])
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight[host] -= 1
+        if host in self.failing_hosts:
+            return httpx.Response(503)
+        held = self.sessions.setdefault(host, set())
+        if request.method == "GET" and request.url.path == "/sessions":
+            return httpx.Response(200, json={"active_sessions": len(held), "session_tokens": sorted(held)})
+        if request.method == "POST" and request.url.path == "/sessions":
+            token = json.loads(request.content)["session_token"]
+            held.add(token)
+            self.registered.setdefault(host, set()).add(token)
+            return httpx.Response(200, json={"status": "ok"})
+        if request.method == "DELETE":
+            token = int(request.url.path.rsplit("/", 1)[1])
+            held.discard(token)
+            self.deleted.setdefault(host, []).append(token)
+            return httpx.Response(200, json={"status": "ok"})
+        return httpx.Response(404)
+
+
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    """Test databases restart their sequences, so drop per-process caches keyed on them.
+
+    The shared relay HTTP and Redis clients and the event hub are dropped too:
+    they are bound to the previous test's event loop.
+    """
+    invalidate_catalog_snapshot()
+    invalidate_node_table()
+    invalidate_latency_matrix()
+    reset_token_allocator()
+    set_relay_transport(None)
+    reset_redis()
+    reset_event_hub()
+    yield
+
+
+@pytest.fixture
+def relay():
+    """A ``FakeRelay`` behind the shared relay HTTP client."""
+    fake = FakeRelay()
+    set_relay_transport(httpx.MockTransport(fake.handler))
+    return fake
+
+
+@pytest.fixture
+def relay_health():
+    """Factory for clients of stand-in relay /health endpoints; hosts in ``dead_ips`` refuse connections."""
+    def stub(dead_ips: set[str]) -> httpx.AsyncClient:
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host in dead_ips:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(200, json={"status": "ok", "active_sessions": 7, "uptime_secs": 3600})
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    return stub
+
+
 @pytest_asyncio.fixture
 async def engine():
     eng = create_async_engine(TEST_DB_URL, echo=False)
@@ -76,6 +174,18 @@ async def auth_headers(test_user: User):
     return {"Authorization": f"Bearer {token}"}
 
 
+@pytest_asyncio.fixture
+async def make_user(db_session: AsyncSession):
+    """Factory for users of their own: each user holds at most one active session."""
+    async def make(token: int) -> User:
+        user = User(email=f"owner{token}@test.com", username=f"owner{token}", password_hash="x")
+        db_session.add(user)
+        await db_session.commit()
+        return user
+
+    return make
+
+
 @pytest_asyncio.fixture
 async def admin_user(db_session: AsyncSession):
     user = User(
@@ -97,6 +207,11 @@ async def admin_headers(admin_user: User):
     return {"Authorization": f"Bearer {token}"}
 
 
+@pytest.fixture
+def relay_headers():
+    return {"X-API-Key": settings.relay_api_key}
+
+
 @pytest_asyncio.fixture
 async def seed_subscription(db_session: AsyncSession, test_user: User):
     sub = Subscription(
@@ -201,3 +316,91 @@ async def seed_node(db_session: AsyncSession):
     await db_session.commit()
     await db_session.refresh(node)
     return node
+
+
+@pytest_asyncio.fixture
+async def other_node(db_session: AsyncSession):
+    node = Node(
+        name="Test Stockholm",
+        location="SE",
+        city="Stockholm",
+        ip_address="10.0.0.2",
+        status="active",
+        relay_api_port=8443,
+    )
+    db_session.add(node)
+    await db_session.commit()
+    await db_session.refresh(node)
+    return node
+
+
+@pytest_asyncio.fixture
+async def make_node(db_session: AsyncSession):
+    """Factory for further relay nodes beside ``seed_node``."""
+    async def make(name: str, location: str, ip: str, status: str = "active") -> Node:
+        node = Node(name=name, location=location, city=name, ip_address=ip, status=status, relay_api_port=8443)
+        db_session.add(node)
+        await db_session.commit()
+        await db_session.refresh(node)
+        return node
+
+    return make
+
+
+@pytest_asyncio.fixture
+async def make_session(db_session: AsyncSession, make_user):
+    """Factory for sessions registered on their relays, each with its own user unless ``user`` is given."""
+    async def make(
+        game: GameProfile,
+        node: Node,
+        token: int,
+        user: User | None = None,
+        backup: Node | None = None,
+        status: str = "active",
+        idle_minutes: float = 0,
+    ) -> Session:
+        if user is None:
+            user = await make_user(token)
+        last_seen = datetime.now(timezone.utc) - timedelta(minutes=idle_minutes)
+        session = Session(
+            user_id=user.id,
+            node_id=node.id,
+            backup_node_id=backup.id if backup else None,
+            multipath_enabled=backup is not None,
+            game_profile_id=game.id,
+            session_token=token,
+            status=status,
+            relay_status="registered",
+            backup_relay_status="registered" if backup else None,
+            started_at=last_seen,
+            last_seen_at=last_seen,
+        )
+        db_session.add(session)
+        await db_session.commit()
+        return session
+
+    return make
+
+
+@pytest_asyncio.fixture
+async def session_legs(db_session: AsyncSession):
+    """Reader of every session's legs: ``{token: (node_id, backup_node_id, multipath_enabled)}``."""
+    async def legs() -> dict[int, tuple]:
+        db_session.expire_all()
+        result = await db_session.execute(
+            select(Session.session_token, Session.node_id, Session.backup_node_id, Session.multipath_enabled)
+        )
+        return {row[0]: tuple(row[1:]) for row in result.all()}
+
+    return legs
+
+
+@pytest_asyncio.fixture
+async def session_statuses(db_session: AsyncSession):
+    """Reader of every session's status: ``{token: status}``."""
+    async def statuses() -> dict[int, str]:
+        db_session.expire_all()
+        result = await db_session.execute(select(Session.session_token, Session.status))
+        return dict(result.all())
+
+    return statuses
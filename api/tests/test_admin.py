@@ -198,6 +198,59 @@ async def test_admin_update_game(client, admin_headers, seed_games):
     assert data["category"] == "tactical"
 
 
+@pytest.mark.asyncio
+async def test_admin_game_normalized_on_write(client, admin_headers):
+    resp = await client.post("/api/admin/games", json={
+        "name": "Steam Shooter",
+        "slug": "steam-shooter",
+        "server_ips": ["155.133.232.0/23", "155.133.234.0/23"],
+        "ports": ["27015-27030", "27031-27050"],
+    }, headers=admin_headers)
+    assert resp.status_code == 201
+    data = resp.json()
+    assert data["server_ips"] == ["155.133.232.0/23", "155.133.234.0/23"]
+    assert data["normalized_server_ips"] == ["155.133.232.0/22"]
+    assert data["port_ranges"] == [[27015, 27050]]
+
+    resp = await client.patch(
+        f"/api/admin/games/{data['id']}",
+        json={"ports": ["3478"]},
+        headers=admin_headers,
+    )
+    assert resp.json()["port_ranges"] == [[3478, 3478]]
+
+
+@pytest.mark.asyncio
+async def test_admin_game_invalid_cidr(client, admin_headers):
+    resp = await client.post("/api/admin/games", json={
+        "name": "Broken",
+        "slug": "broken",
+        "server_ips": ["not-an-ip"],
+    }, headers=admin_headers)
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_admin_normalization_report(client, admin_headers, seed_games):
+    await client.post("/api/admin/games", json={
+        "name": "Steam Shooter",
+        "slug": "steam-shooter",
+        "server_ips": ["155.133.232.0/23", "155.133.234.0/23", "162.254.192.0/21"],
+        "ports": ["27015-27050"],
+    }, headers=admin_headers)
+
+    resp = await client.get("/api/admin/games/normalization-report", headers=admin_headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["profiles_total"] == 4
+    assert data["profiles_shrunk"] == 1
+    item = data["items"][0]
+    assert item["slug"] == "steam-shooter"
+    assert item["cidrs_before"] == 3
+    assert item["cidrs_after"] == 2
+    assert item["clauses_saved"] == 1
+
+
 @pytest.mark.asyncio
 async def test_admin_delete_game(client, admin_headers, seed_games):
     game_id = seed_games[2].id  # Valorant
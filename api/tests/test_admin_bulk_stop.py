@@ -0,0 +1,150 @@
+"""Tests for stopping sessions in bulk from the admin API."""
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.models.relay_outbox import RelayOutbox
+from app.services.relay_client import set_relay_transport
+
+
+@pytest.mark.asyncio
+async def test_requires_admin_and_a_filter(client, auth_headers, admin_headers):
+    resp = await client.post("/api/admin/sessions/bulk-stop", json={"dry_run": True}, headers=auth_headers)
+    assert resp.status_code == 403
+    resp = await client.post("/api/admin/sessions/bulk-stop", json={}, headers=admin_headers)
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_stop_by_node_covers_backup_legs(
+    client, admin_headers, seed_games, seed_node, other_node, make_session, relay, session_statuses,
+):
+    cs2, dota = seed_games[0], seed_games[1]
+    await make_session(cs2, seed_node, 501)
+    await make_session(dota, other_node, 502, backup=seed_node)
+    await make_session(cs2, other_node, 503)
+    relay.delay = 0.02
+
+    resp = await client.post(
+        "/api/admin/sessions/bulk-stop", json={"node_id": str(seed_node.id)}, headers=admin_headers,
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert (data["stopped"], data["unregistered"], data["failed"]) == (2, 3, 0)
+    assert {n["node_id"]: n["legs"] for n in data["nodes"]} == {str(seed_node.id): 2, str(other_node.id): 1}
+    assert sorted(relay.deleted["10.0.0.1"]) == [501, 502]
+    assert relay.deleted["10.0.0.2"] == [502]
+    assert await session_statuses() == {501: "stopped", 502: "stopped", 503: "active"}
+
+
+@pytest.mark.asyncio
+async def test_filters_combine_and_dry_run_changes_nothing(
+    client, admin_headers, seed_games, seed_node, make_session, relay, session_statuses,
+):
+    cs2, dota = seed_games[0], seed_games[1]
+    await make_session(cs2, seed_node, 511, idle_minutes=120)
+    await make_session(cs2, seed_node, 512, idle_minutes=5)
+    await make_session(dota, seed_node, 513, idle_minutes=120)
+    body = {"game_profile_id": str(cs2.id), "older_than_minutes": 60}
+
+    resp = await client.post("/api/admin/sessions/bulk-stop", json={**body, "dry_run": True}, headers=admin_headers)
+    assert resp.json()["matched"] == 1
+    assert set((await session_statuses()).values()) == {"active"}
+
+    resp = await client.post("/api/admin/sessions/bulk-stop", json=body, headers=admin_headers)
+    assert resp.json()["stopped"] == 1
+    assert await session_statuses() == {511: "stopped", 512: "active", 513: "active"}
+
+
+@pytest.mark.asyncio
+async def test_relay_calls_are_bounded_per_node_and_failures_stay_queued(
+    client, admin_headers, db_session, seed_games, seed_node, other_node, monkeypatch, make_session, relay,
+):
+    monkeypatch.setattr(settings, "admin_bulk_relay_concurrency", 2)
+    node_id = seed_node.id
+    for token in range(521, 527):
+        await make_session(seed_games[0], seed_node, token, backup=other_node)
+    relay.delay = 0.02
+    relay.failing_hosts = ("10.0.0.2",)
+
+    resp = await client.post(
+        "/api/admin/sessions/bulk-stop", json={"older_than_minutes": 0}, headers=admin_headers,
+    )
+    data = resp.json()
+    assert (data["stopped"], data["unregistered"], data["failed"]) == (6, 6, 6)
+    assert relay.peak == {"10.0.0.1": 2, "10.0.0.2": 2}
+
+    result = await db_session.execute(
+        select(RelayOutbox.node_id, RelayOutbox.status).where(RelayOutbox.action == "unregister")
+    )
+    rows = result.all()
+    assert sorted(status for n, status in rows if n == node_id) == ["delivered"] * 6
+    assert sorted(status for n, status in rows if n != node_id) == ["pending"] * 6
+
+
+@pytest.mark.asyncio
+async def test_relay_calls_past_the_deadline_are_left_to_the_outbox(
+    client, admin_headers, db_session, seed_games, seed_node, other_node, monkeypatch, make_session,
+):
+    monkeypatch.setattr(settings, "relay_registration_deadline_seconds", 0.2)
+    node_id = seed_node.id
+    await make_session(seed_games[0], seed_node, 531, backup=other_node)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "10.0.0.2":
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"status": "ok"})
+
+    set_relay_transport(httpx.MockTransport(handler))
+    resp = await client.post(
+        "/api/admin/sessions/bulk-stop", json={"older_than_minutes": 0}, headers=admin_headers,
+    )
+    data = resp.json()
+    assert (data["unregistered"], data["failed"], data["pending"]) == (1, 0, 1)
+    assert data["elapsed_ms"] < 2000
+
+    db_session.expire_all()
+    result = await db_session.execute(
+        select(RelayOutbox.node_id, RelayOutbox.status, RelayOutbox.last_error, RelayOutbox.next_attempt_at)
+        .where(RelayOutbox.action == "unregister")
+    )
+    rows = {row[0]: row[1:] for row in result.all()}
+    assert rows[node_id][:2] == ("delivered", None)
+    (status, last_error, next_attempt_at), = [v for n, v in rows.items() if n != node_id]
+    assert (status, last_error) == ("pending", "pending")
+    assert next_attempt_at <= datetime.now(timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_late_inline_result_does_not_overwrite_the_workers(
+    client, admin_headers, db_session, session_factory, seed_games, seed_node, make_session,
+):
+    await make_session(seed_games[0], seed_node, 541)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        # The inline lease ran out and the worker delivered the entry meanwhile.
+        async with session_factory() as db:
+            await db.execute(
+                update(RelayOutbox)
+                .where(RelayOutbox.session_token == 541)
+                .values(status="delivered", attempts=RelayOutbox.attempts + 1)
+            )
+            await db.commit()
+        return httpx.Response(500)
+
+    set_relay_transport(httpx.MockTransport(handler))
+    resp = await client.post(
+        "/api/admin/sessions/bulk-stop", json={"older_than_minutes": 0}, headers=admin_headers,
+    )
+    assert resp.json()["failed"] == 1
+
+    db_session.expire_all()
+    result = await db_session.execute(
+        select(RelayOutbox.status, RelayOutbox.attempts, RelayOutbox.last_error)
+        .where(RelayOutbox.session_token == 541)
+    )
+    assert result.one() == ("delivered", 2, None)
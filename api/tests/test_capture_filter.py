@@ -0,0 +1,50 @@
+import pytest
+
+from app.services.capture_filter import build_capture_filter
+
+
+def test_filter_matches_client_format():
+    assert build_capture_filter(["1.2.3.4/32"], [[443, 443]]) == (
+        "outbound and udp and ip.DstAddr == 1.2.3.4 and udp.DstPort == 443"
+    )
+
+
+def test_filter_orders_by_selectivity():
+    f = build_capture_filter(
+        ["185.25.180.0/24", "155.133.232.0/22"],
+        [[3478, 3478], [27015, 27050]],
+    )
+    # A few /22s cover far less of the address space than 37 ports do of the
+    # port space, so the address group leads; widest ranges lead each group.
+    assert f == (
+        "outbound and udp and "
+        "((ip.DstAddr >= 155.133.232.0 and ip.DstAddr <= 155.133.235.255) "
+        "or (ip.DstAddr >= 185.25.180.0 and ip.DstAddr <= 185.25.180.255)) and "
+        "((udp.DstPort >= 27015 and udp.DstPort <= 27050) or udp.DstPort == 3478)"
+    )
+
+
+def test_filter_port_group_first_for_wide_address_space():
+    f = build_capture_filter(["0.0.0.0/1"], [[27015, 27050]])
+    assert f.startswith("outbound and udp and (udp.DstPort >= 27015")
+
+
+def test_filter_requires_ips_and_ports():
+    assert build_capture_filter([], [[443, 443]]) is None
+    assert build_capture_filter(["1.2.3.4/32"], []) is None
+
+
+@pytest.mark.asyncio
+async def test_session_start_returns_capture_filter(client, auth_headers, seed_games, seed_node):
+    resp = await client.post("/api/sessions/start", json={
+        "game_slug": "cs2",
+        "node_id": str(seed_node.id),
+    }, headers=auth_headers)
+    assert resp.status_code == 201
+    data = resp.json()
+    assert data["capture_filter"] == (
+        "outbound and udp and "
+        "(ip.DstAddr >= 155.133.232.0 and ip.DstAddr <= 155.133.233.255) and "
+        "(udp.DstPort >= 27015 and udp.DstPort <= 27050)"
+    )
+    assert data["capture_filter_version"].startswith("1.")
@@ -0,0 +1,134 @@
+"""Tests for versioned catalog sync."""
+import asyncio
+
+import msgpack
+import pytest
+
+from app.models.game_profile import GameProfile
+from app.services.catalog_service import get_catalog_version, lock_catalog
+
+
+@pytest.mark.asyncio
+async def test_full_catalog(client, seed_games):
+    resp = await client.get("/api/games/catalog")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["full"] is True
+    assert data["version"] > 0
+    assert int(resp.headers["x-catalog-version"]) == data["version"]
+    assert {g["slug"] for g in data["games"]} == {"cs2", "dota-2", "valorant"}
+
+
+@pytest.mark.asyncio
+async def test_catalog_gzip_encoded(client, seed_games):
+    resp = await client.get("/api/games/catalog", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert len(resp.json()["games"]) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("accept_encoding,compressed", [
+    ("gzip;q=0", False),
+    ("br, gzip;q=0.0, *;q=1", False),
+    ("identity, *;q=0.5", True),
+    ("deflate, GZIP;q=0.8", True),
+])
+async def test_catalog_gzip_respects_q_values(client, seed_games, accept_encoding, compressed):
+    resp = await client.get("/api/games/catalog", headers={"Accept-Encoding": accept_encoding})
+    assert ("content-encoding" in resp.headers) is compressed
+    assert len(resp.json()["games"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_catalog_msgpack(client, seed_games):
+    resp = await client.get("/api/games/catalog", params={"format": "msgpack"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/msgpack"
+    data = msgpack.unpackb(resp.content)
+    assert len(data["games"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_catalog_not_modified(client, seed_games):
+    resp = await client.get("/api/games/catalog")
+    etag = resp.headers["etag"]
+    resp = await client.get("/api/games/catalog", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_catalog_etag_names_the_encoding(client, seed_games):
+    plain = await client.get("/api/games/catalog", headers={"Accept-Encoding": "identity"})
+    gzipped = await client.get("/api/games/catalog", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["etag"] == plain.headers["etag"][:-1] + '-gz"'
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+
+    # A validator for the identity body does not match the gzip one.
+    resp = await client.get(
+        "/api/games/catalog", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["etag"]},
+    )
+    assert resp.status_code == 200
+    resp = await client.get(
+        "/api/games/catalog", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]},
+    )
+    assert resp.status_code == 304
+    assert resp.headers["etag"] == gzipped.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_catalog_delta(client, admin_headers, seed_games):
+    version = (await client.get("/api/games/catalog")).json()["version"]
+
+    resp = await client.get("/api/games/catalog", params={"since": version})
+    data = resp.json()
+    assert data["full"] is False
+    assert data["games"] == []
+    assert data["removed"] == []
+
+    await client.patch(
+        f"/api/admin/games/{seed_games[0].id}",
+        json={"is_popular": False},
+        headers=admin_headers,
+    )
+    await client.delete(f"/api/admin/games/{seed_games[2].id}", headers=admin_headers)
+
+    resp = await client.get("/api/games/catalog", params={"since": version})
+    data = resp.json()
+    assert data["version"] > version
+    assert [g["slug"] for g in data["games"]] == ["cs2"]
+    assert data["removed"] == [str(seed_games[2].id)]
+
+
+@pytest.mark.asyncio
+async def test_catalog_unknown_version_resyncs(client, seed_games):
+    resp = await client.get("/api/games/catalog", params={"since": 10**9})
+    data = resp.json()
+    assert data["full"] is True
+    assert len(data["games"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_catalog_versions_commit_in_order(session_factory, seed_games):
+    async with session_factory() as first, session_factory() as second, session_factory() as reader:
+        await lock_catalog(first)
+        game = await first.get(GameProfile, seed_games[0].id)
+        game.is_popular = False
+        await first.flush()
+        await first.refresh(game, ["catalog_version"])
+        first_version = game.catalog_version
+
+        async def later_write():
+            await lock_catalog(second)
+            game = await second.get(GameProfile, seed_games[1].id)
+            game.is_popular = False
+            await second.commit()
+            await second.refresh(game, ["catalog_version"])
+            return game.catalog_version
+
+        writer = asyncio.create_task(later_write())
+        await asyncio.sleep(0.2)
+        # The later writer waits, so no client can sync past the open write.
+        assert not writer.done()
+        assert await get_catalog_version(reader) < first_version
+        await first.commit()
+        assert await writer > first_version
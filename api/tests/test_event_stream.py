@@ -0,0 +1,144 @@
+"""Tests for the per-user server-sent event stream and its publishers."""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+
+from app.config import settings
+from app.models.session import Session
+from app.routers.events import EventStreamResponse, get_stream_user_id
+from app.services.auth_service import create_access_token
+from app.services.billing_service import notify_expiring_subscriptions
+from app.services.session_reaper import reap_stale_sessions
+from app.utils.events import CHANNEL, event_hub, publish_batch, publish_events
+from app.utils.redis_pool import get_redis
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def stop_hub():
+    yield
+    await event_hub.stop()
+
+
+async def _subscribed() -> None:
+    """Wait until the hub's Redis subscription is live."""
+    for _ in range(100):
+        if dict(await get_redis().pubsub_numsub(CHANNEL)).get(CHANNEL):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("event hub never subscribed")
+
+
+async def _events(subscriber, count: int) -> list[tuple[str, dict]]:
+    frames = []
+    for _ in range(50):
+        frames += await subscriber.wait(0.05)
+        if len(frames) >= count:
+            break
+    events = []
+    for frame in frames:
+        kind, data = frame.decode().strip().split("\n")
+        events.append((kind.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_stream_requires_token(client):
+    resp = await client.get("/api/events/stream")
+    assert resp.status_code == 401
+    resp = await client.get("/api/events/stream", params={"stream_token": "nope"})
+    assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_stream_token_stands_in_for_access_token_in_url(client, auth_headers, test_user):
+    user_id = str(test_user.id)
+    resp = await client.post("/api/events/stream-token", headers=auth_headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["expires_in"] == settings.event_stream_token_expire_seconds
+    assert await get_stream_user_id(None, body["stream_token"]) == user_id
+
+    # The full access token never belongs in a URL, and the stream token
+    # opens nothing but the stream.
+    with pytest.raises(HTTPException):
+        await get_stream_user_id(None, create_access_token(user_id))
+    resp = await client.get("/api/me", headers={"Authorization": f"Bearer {body['stream_token']}"})
+    assert resp.status_code == 401
+
+    resp = await client.post("/api/events/stream-token")
+    assert resp.status_code in (401, 403)
+
+
+@pytest.mark.asyncio
+async def test_stream_forwards_own_events_until_disconnect(monkeypatch):
+    monkeypatch.setattr(settings, "event_stream_keepalive_seconds", 0.05)
+    sent: list[dict] = []
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    stream = asyncio.create_task(EventStreamResponse("user-a")({"type": "http"}, receive, send))
+    await _subscribed()
+    await publish_events([
+        ("user-a", "node.degraded", {"node_id": "n1"}),
+        ("user-b", "node.degraded", {"node_id": "n1"}),
+    ])
+    await publish_batch("session.stats", [("user-b", {"bytes_sent": 1}), ("user-a", {"bytes_sent": 2})])
+    await asyncio.sleep(0.2)
+
+    disconnected.set()
+    await asyncio.wait_for(stream, 1)
+    assert not event_hub._subscribers
+
+    assert sent[0]["status"] == 200
+    assert dict(sent[0]["headers"])[b"content-type"].startswith(b"text/event-stream")
+    body = b"".join(m.get("body", b"") for m in sent[1:]).decode()
+    assert 'event: node.degraded\ndata: {"node_id": "n1"}\n\n' in body
+    assert 'event: session.stats\ndata: {"bytes_sent": 2}\n\n' in body
+    assert body.count("event:") == 2
+    assert ": keepalive" in body
+
+
+@pytest.mark.asyncio
+async def test_reaped_session_is_announced(db_session, session_factory, test_user, seed_games, seed_node):
+    long_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    session = Session(
+        user_id=test_user.id,
+        node_id=seed_node.id,
+        game_profile_id=seed_games[0].id,
+        session_token=9001,
+        status="active",
+        started_at=long_ago,
+        last_seen_at=long_ago,
+    )
+    db_session.add(session)
+    await db_session.commit()
+    session_id = session.id
+
+    subscriber = event_hub.subscribe(str(test_user.id))
+    await _subscribed()
+    assert await reap_stale_sessions(session_factory) == 1
+    assert await _events(subscriber, 1) == [("session.expired", {"session_id": str(session_id)})]
+
+
+@pytest.mark.asyncio
+async def test_subscription_expiry_is_announced_once(db_session, session_factory, test_user):
+    test_user.subscription_expires_at = datetime.now(timezone.utc) + timedelta(hours=5)
+    await db_session.commit()
+    await get_redis().delete(*[k async for k in get_redis().scan_iter("plg:notified:expiring:*")] or ["-"])
+
+    subscriber = event_hub.subscribe(str(test_user.id))
+    await _subscribed()
+    assert await notify_expiring_subscriptions(session_factory) == 1
+    assert await notify_expiring_subscriptions(session_factory) == 0
+    events = await _events(subscriber, 1)
+    assert [(kind, data["tier"]) for kind, data in events] == [("subscription.expiring", "monthly")]
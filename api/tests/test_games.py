@@ -32,3 +32,82 @@ async def test_get_game_by_slug(client, seed_games):
 async def test_get_game_not_found(client):
     resp = await client.get("/api/games/nonexistent-game")
     assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_exact_match_first(client, seed_games):
+    resp = await client.get("/api/games/search", params={"q": "dota 2"})
+    data = resp.json()
+    assert data["items"][0]["slug"] == "dota-2"
+
+
+@pytest.mark.asyncio
+async def test_search_tolerates_typos(client, seed_games):
+    resp = await client.get("/api/games/search", params={"q": "valornt"})
+    data = resp.json()
+    assert data["items"][0]["slug"] == "valorant"
+
+
+@pytest.mark.asyncio
+async def test_search_matches_slug_and_exe(client, seed_games):
+    resp = await client.get("/api/games/search", params={"q": "cs2"})
+    assert resp.json()["items"][0]["slug"] == "cs2"
+
+    resp = await client.get("/api/games/search", params={"q": "VALORANT.exe"})
+    assert resp.json()["items"][0]["slug"] == "valorant"
+
+
+@pytest.mark.asyncio
+async def test_search_limit(client, seed_games):
+    resp = await client.get("/api/games/search", params={"q": "2", "limit": 1})
+    data = resp.json()
+    assert data["total"] == 1
+    assert len(data["items"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_search_reflects_catalog_changes(client, admin_headers, seed_games):
+    resp = await client.get("/api/games/search", params={"q": "apex"})
+    assert resp.json()["total"] == 0
+
+    await client.post("/api/admin/games", json={
+        "name": "Apex Legends",
+        "slug": "apex-legends",
+        "exe_names": ["r5apex.exe"],
+    }, headers=admin_headers)
+
+    resp = await client.get("/api/games/search", params={"q": "apex"})
+    assert resp.json()["items"][0]["slug"] == "apex-legends"
+
+
+@pytest.mark.asyncio
+async def test_search_non_latin_names(client, admin_headers, seed_games):
+    for name, slug in [("Мир танков", "mir-tankov"), ("原神", "genshin-impact"), ("Straße Racer", "strasse-racer")]:
+        resp = await client.post("/api/admin/games", json={"name": name, "slug": slug}, headers=admin_headers)
+        assert resp.status_code == 201
+
+    for query, slug in [("ТАНКОВ", "mir-tankov"), ("мир танк", "mir-tankov"), ("原神", "genshin-impact"),
+                        ("strasse", "strasse-racer"), ("ＳＴＲＡＳＳＥ", "strasse-racer")]:
+        resp = await client.get("/api/games/search", params={"q": query})
+        assert resp.json()["items"][0]["slug"] == slug, query
+
+
+@pytest.mark.asyncio
+async def test_detect_games(client, seed_games):
+    resp = await client.post("/api/games/detect", json={
+        "process_names": ["explorer.exe", "C:\\Games\\Valorant\\valorant.EXE", "CS2.exe", "cs2.exe"],
+    })
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["catalog_version"] > 0
+    matched = {m["game"]["slug"]: m["process_name"] for m in data["matches"]}
+    assert matched == {"valorant": "C:\\Games\\Valorant\\valorant.EXE", "cs2": "CS2.exe"}
+    cs2 = next(m["game"] for m in data["matches"] if m["game"]["slug"] == "cs2")
+    assert cs2["server_ips"] == ["155.133.232.0/23"]
+
+
+@pytest.mark.asyncio
+async def test_detect_no_matches(client, seed_games):
+    resp = await client.post("/api/games/detect", json={"process_names": ["notepad.exe"]})
+    assert resp.status_code == 200
+    assert resp.json()["matches"] == []
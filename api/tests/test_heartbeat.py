@@ -0,0 +1,112 @@
+"""Tests for Redis-backed session heartbeats and their write-behind flush."""
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.session import Session
+from app.services.session_heartbeat import DIRTY_KEY, KEY_PREFIX, flush_heartbeats
+from app.utils.redis_pool import get_redis
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def clean_dirty_set():
+    await get_redis().delete(DIRTY_KEY)
+
+
+@pytest_asyncio.fixture
+async def started(client, auth_headers, seed_games, seed_node):
+    with patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True):
+        resp = await client.post(
+            "/api/sessions/start",
+            json={"game_slug": "cs2", "node_id": str(seed_node.id)},
+            headers=auth_headers,
+        )
+    assert resp.status_code == 201
+    return resp.json()["session_id"]
+
+
+async def _load(db: AsyncSession, session_id) -> Session:
+    db.expire_all()
+    return await db.get(Session, uuid.UUID(str(session_id)))
+
+
+@pytest.mark.asyncio
+async def test_heartbeats_flush_to_session(client, auth_headers, started, db_session, session_factory):
+    # Unknown until the client's first heartbeat.
+    assert (await _load(db_session, started)).last_seen_at is None
+
+    for rtt in (20, 30):
+        resp = await client.post(
+            f"/api/sessions/{started}/heartbeat", json={"rtt_ms": rtt, "packet_loss": 1.0}, headers=auth_headers,
+        )
+        assert resp.status_code == 204
+    # Nothing reaches Postgres until the flush.
+    assert (await _load(db_session, started)).avg_ping is None
+
+    assert await flush_heartbeats(session_factory) == 1
+    session = await _load(db_session, started)
+    assert session.avg_ping == 25.0
+    assert session.packet_loss == 1.0
+    assert session.last_seen_at is not None
+    assert await flush_heartbeats(session_factory) == 0
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_rejects_other_users_and_unknown_sessions(client, admin_headers, auth_headers, started):
+    resp = await client.post(f"/api/sessions/{started}/heartbeat", headers=admin_headers)
+    assert resp.status_code == 404
+    resp = await client.post(f"/api/sessions/{uuid.uuid4()}/heartbeat", headers=auth_headers)
+    assert resp.status_code == 404
+    resp = await client.post(f"/api/sessions/{started}/heartbeat")
+    assert resp.status_code in (401, 403)
+
+
+@pytest.mark.asyncio
+async def test_untracked_session_falls_back_to_db(
+    client, auth_headers, db_session, test_user, seed_games, seed_node,
+):
+    long_ago = datetime.now(timezone.utc) - timedelta(minutes=3)
+    session = Session(
+        user_id=test_user.id,
+        node_id=seed_node.id,
+        game_profile_id=seed_games[0].id,
+        session_token=8123,
+        status="active",
+        started_at=long_ago,
+        last_seen_at=long_ago,
+    )
+    db_session.add(session)
+    await db_session.commit()
+    session_id = session.id
+
+    resp = await client.post(f"/api/sessions/{session_id}/heartbeat", headers=auth_headers)
+    assert resp.status_code == 204
+    assert (await _load(db_session, session_id)).last_seen_at > long_ago
+    assert await get_redis().exists(f"{KEY_PREFIX}{session_id}")
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.unregister_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_no_heartbeats_after_stop(mock_unregister, client, auth_headers, started):
+    resp = await client.post(f"/api/sessions/{started}/stop", headers=auth_headers)
+    assert resp.status_code == 200
+
+    resp = await client.post(f"/api/sessions/{started}/heartbeat", headers=auth_headers)
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.unregister_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_repeated_misses_skip_the_db(mock_unregister, client, auth_headers, started):
+    await client.post(f"/api/sessions/{started}/stop", headers=auth_headers)
+    resp = await client.post(f"/api/sessions/{started}/heartbeat", headers=auth_headers)
+    assert resp.status_code == 404
+
+    with patch("app.services.session_heartbeat.update", side_effect=AssertionError("DB touched")):
+        for _ in range(3):
+            resp = await client.post(f"/api/sessions/{started}/heartbeat", headers=auth_headers)
+            assert resp.status_code == 404
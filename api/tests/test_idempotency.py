@@ -0,0 +1,87 @@
+"""Tests for Idempotency-Key handling on session start and payment links."""
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.payment import Payment
+from app.models.promo_code import PromoCode
+from app.models.session import Session
+
+
+def _key() -> dict:
+    return {"Idempotency-Key": str(uuid.uuid4())}
+
+
+@pytest.mark.asyncio
+async def test_subscribe_replay_creates_one_payment(client, auth_headers, seed_promo, db_session: AsyncSession):
+    headers = {**auth_headers, **_key()}
+    body = {"plan": "monthly", "promo_code": "TEST20"}
+
+    first = await client.post("/api/billing/subscribe", json=body, headers=headers)
+    second = await client.post("/api/billing/subscribe", json=body, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+    db_session.expire_all()
+    assert (await db_session.execute(select(func.count()).select_from(Payment))).scalar_one() == 1
+    promo = (await db_session.execute(select(PromoCode).where(PromoCode.code == "TEST20"))).scalar_one()
+    assert promo.current_uses == 6
+
+
+@pytest.mark.asyncio
+async def test_key_reused_with_other_body_is_rejected(client, auth_headers):
+    headers = {**auth_headers, **_key()}
+    resp = await client.post("/api/billing/subscribe", json={"plan": "monthly"}, headers=headers)
+    assert resp.status_code == 200
+
+    resp = await client.post("/api/billing/subscribe", json={"plan": "yearly"}, headers=headers)
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_replayed(client, auth_headers, seed_node):
+    headers = {**auth_headers, **_key()}
+    body = {"game_slug": "no-such-game", "node_id": str(seed_node.id)}
+    for _ in range(2):
+        resp = await client.post("/api/sessions/start", json=body, headers=headers)
+        assert resp.status_code == 400
+        assert resp.json() == {"detail": "Game not found"}
+    assert resp.headers["Idempotent-Replayed"] == "true"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_waits_for_first(client, auth_headers, seed_games, seed_node, db_session):
+    async def slow_register(**kwargs):
+        await asyncio.sleep(0.2)
+        return True
+
+    headers = {**auth_headers, **_key()}
+    body = {"game_slug": "cs2", "node_id": str(seed_node.id)}
+    with patch("app.services.session_service.register_session_on_relay", side_effect=slow_register) as mock_relay:
+        first, second = await asyncio.gather(
+            client.post("/api/sessions/start", json=body, headers=headers),
+            client.post("/api/sessions/start", json=body, headers=headers),
+        )
+
+    assert first.status_code == second.status_code == 201
+    assert first.json()["session_id"] == second.json()["session_id"]
+    assert mock_relay.call_count == 1
+    db_session.expire_all()
+    assert (await db_session.execute(select(func.count()).select_from(Session))).scalar_one() == 1
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_without_key_requests_run_each_time(mock_relay, client, auth_headers, seed_games, seed_node):
+    body = {"game_slug": "cs2", "node_id": str(seed_node.id)}
+    first = await client.post("/api/sessions/start", json=body, headers=auth_headers)
+    second = await client.post("/api/sessions/start", json=body, headers=auth_headers)
+    # Both run; the second finds the session the first started.
+    assert first.status_code == second.status_code == 201
+    assert "Idempotent-Replayed" not in second.headers
+    assert second.json()["session_id"] == first.json()["session_id"]
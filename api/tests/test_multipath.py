@@ -8,6 +8,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.node import Node
+from app.models.relay_outbox import RelayOutbox
 from app.models.session import Session
 
 
@@ -263,3 +264,137 @@ async def test_multipath_db_fields_stored(mock_relay, client, auth_headers, seed
     session = result.scalar_one()
     assert session.multipath_enabled is True
     assert session.backup_node_id == second_node.id
+
+
+@pytest_asyncio.fixture
+async def many_nodes(db_session: AsyncSession):
+    """Six nodes over four locations, so several backup candidates exist."""
+    nodes = [
+        Node(name=f"Test {loc} {i}", location=loc, city=loc, ip_address=f"10.1.{n}.{i}",
+             status="active", current_load=0, max_sessions=1000, relay_port=443, relay_api_port=8443)
+        for n, loc in enumerate(("SE", "US", "LV"))
+        for i in (1, 2)
+    ]
+    db_session.add_all(nodes)
+    await db_session.commit()
+    return nodes
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.unregister_session_on_relay", new_callable=AsyncMock, return_value=True)
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_backup_with_many_candidates(mock_register, mock_unregister, client, auth_headers, seed_games, seed_node, many_nodes):
+    """Several eligible backups must not break selection, and the pick is stable."""
+    backups = set()
+    for _ in range(2):
+        resp = await client.post(
+            "/api/sessions/start",
+            json={"game_slug": "cs2", "node_id": str(seed_node.id), "multipath": True},
+            headers=auth_headers,
+        )
+        assert resp.status_code == 201
+        data = resp.json()
+        assert data["multipath_enabled"] is True
+        backups.add(data["backup_node_ip"])
+        await client.post(f"/api/sessions/{data['session_id']}/stop", headers=auth_headers)
+    assert len(backups) == 1
+    assert backups.pop().startswith("10.1.")
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_backup_prefers_headroom(mock_relay, client, auth_headers, seed_games, seed_node, many_nodes, db_session):
+    """Among other-location candidates, the least loaded one is chosen."""
+    for node in many_nodes:
+        node.current_load = 900
+    many_nodes[3].current_load = 10
+    await db_session.commit()
+
+    resp = await client.post(
+        "/api/sessions/start",
+        json={"game_slug": "cs2", "node_id": str(seed_node.id), "multipath": True},
+        headers=auth_headers,
+    )
+    assert resp.json()["backup_node_ip"] == many_nodes[3].ip_address
+
+
+@pytest.mark.asyncio
+async def test_registrations_run_concurrently(client, auth_headers, seed_games, seed_node, second_node, db_session):
+    """Both legs register in parallel; a failing backup is recorded, not discarded."""
+    import asyncio
+
+    in_flight = 0
+    peak = 0
+
+    async def fake_register(node_ip, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        is_backup = node_ip == second_node.ip_address
+        await asyncio.sleep(0.01 if is_backup else 0.05)
+        in_flight -= 1
+        return not is_backup
+
+    with patch("app.services.session_service.register_session_on_relay", side_effect=fake_register):
+        resp = await client.post(
+            "/api/sessions/start",
+            json={"game_slug": "cs2", "node_id": str(seed_node.id), "multipath": True},
+            headers=auth_headers,
+        )
+    assert peak == 2
+    data = resp.json()
+    assert data["relay_status"] == "registered"
+    assert data["backup_relay_status"] == "failed"
+
+    result = await db_session.execute(select(Session).where(Session.id == data["session_id"]))
+    session = result.scalar_one()
+    assert session.relay_status == "registered"
+    assert session.backup_relay_status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_registration_deadline(client, auth_headers, seed_games, seed_node, second_node, monkeypatch, db_session):
+    """Start returns once the primary is confirmed; a slow backup is left to the outbox."""
+    import asyncio
+
+    from app.config import settings
+
+    async def fake_register(node_ip, **kwargs):
+        if node_ip == second_node.ip_address:
+            await asyncio.sleep(5)
+        return True
+
+    monkeypatch.setattr(settings, "relay_registration_deadline_seconds", 0.1)
+    with patch("app.services.session_service.register_session_on_relay", side_effect=fake_register):
+        resp = await client.post(
+            "/api/sessions/start",
+            json={"game_slug": "cs2", "node_id": str(seed_node.id), "multipath": True},
+            headers=auth_headers,
+        )
+    data = resp.json()
+    assert resp.status_code == 201
+    assert data["relay_status"] == "registered"
+    assert data["backup_relay_status"] == "pending"
+
+    result = await db_session.execute(
+        select(RelayOutbox.node_id, RelayOutbox.status).where(RelayOutbox.session_id == data["session_id"])
+    )
+    assert dict(result.all()) == {seed_node.id: "delivered", second_node.id: "pending"}
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.unregister_session_on_relay", new_callable=AsyncMock, return_value=True)
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_stop_records_unregistration(mock_register, mock_unregister, client, auth_headers, seed_games, seed_node, second_node, db_session):
+    resp = await client.post(
+        "/api/sessions/start",
+        json={"game_slug": "cs2", "node_id": str(seed_node.id), "multipath": True},
+        headers=auth_headers,
+    )
+    session_id = resp.json()["session_id"]
+    await client.post(f"/api/sessions/{session_id}/stop", headers=auth_headers)
+
+    result = await db_session.execute(select(Session).where(Session.id == session_id))
+    session = result.scalar_one()
+    assert session.relay_status == "unregistered"
+    assert session.backup_relay_status == "unregistered"
@@ -0,0 +1,34 @@
+import pytest
+
+from app.utils.netranges import aggregate_cidrs, merge_port_ranges
+
+
+def test_aggregate_adjacent_and_overlapping():
+    assert aggregate_cidrs([
+        "155.133.232.0/23",
+        "155.133.234.0/23",
+        "155.133.232.128/25",
+        "10.0.0.1",
+    ]) == ["10.0.0.1/32", "155.133.232.0/22"]
+
+
+def test_aggregate_host_bits_set():
+    assert aggregate_cidrs(["192.168.1.7/24"]) == ["192.168.1.0/24"]
+
+
+def test_aggregate_invalid():
+    with pytest.raises(ValueError):
+        aggregate_cidrs(["999.1.1.0/24"])
+
+
+def test_merge_port_ranges():
+    assert merge_port_ranges(["27015-27030", "3478", "27031-27050", "27020", "3479-3480"]) == [
+        [3478, 3480],
+        [27015, 27050],
+    ]
+
+
+@pytest.mark.parametrize("raw", ["abc", "27050-27015", "0", "70000"])
+def test_merge_port_ranges_invalid(raw):
+    with pytest.raises(ValueError):
+        merge_port_ranges([raw])
@@ -0,0 +1,164 @@
+"""Tests for draining a relay node and moving its sessions elsewhere."""
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.relay_outbox import RelayOutbox
+from app.services.node_drain import LOCK_PREFIX, drain_nodes
+from app.services.relay_client import set_relay_transport
+from app.services.relay_reconcile import reconcile_relays
+from app.utils.events import CHANNEL
+from app.utils.redis_pool import get_redis
+
+
+@pytest_asyncio.fixture
+async def nodes(seed_node, other_node, make_node):
+    nearby = await make_node("Test Berlin", "DE", "10.0.0.3")
+    return seed_node, nearby, other_node
+
+
+@pytest.mark.asyncio
+async def test_drain_moves_sessions_and_retires_node(
+    client, admin_headers, db_session, session_factory, seed_games, nodes, make_session, relay, session_legs,
+):
+    draining, nearby, remote = nodes
+    draining_id, nearby_id, remote_id = draining.id, nearby.id, remote.id
+    for token in (801, 802, 803):
+        await make_session(seed_games[0], draining, token)
+    await make_session(seed_games[0], remote, 804, backup=draining)
+    pubsub = get_redis().pubsub()
+    await pubsub.subscribe(CHANNEL)
+
+    resp = await client.post(f"/api/admin/nodes/{draining_id}/drain", headers=admin_headers)
+    assert resp.status_code == 202
+    assert resp.json()["status"] == "draining"
+    assert resp.json()["total"] == resp.json()["remaining"] == 4
+
+    assert await drain_nodes(session_factory) == 4
+
+    # Same location first; the backup leg cannot go to its own primary.
+    assert await session_legs() == {
+        801: (nearby_id, None, False),
+        802: (nearby_id, None, False),
+        803: (nearby_id, None, False),
+        804: (remote_id, nearby_id, True),
+    }
+    assert relay.registered == {"10.0.0.3": {801, 802, 803, 804}}
+
+    result = await db_session.execute(
+        select(RelayOutbox.node_id, RelayOutbox.next_attempt_at).where(RelayOutbox.action == "unregister")
+    )
+    unregisters = result.all()
+    assert {node_id for node_id, _ in unregisters} == {draining_id} and len(unregisters) == 4
+    grace = datetime.now(timezone.utc) + timedelta(seconds=settings.node_drain_grace_seconds - 5)
+    assert all(due > grace for _, due in unregisters)
+
+    events = []
+    while (message := await pubsub.get_message(timeout=0.5)) is not None:
+        if message["type"] == "message":
+            events.append(json.loads(message["data"]))
+    await pubsub.aclose()
+    assert len(events) == 4
+    assert {e["data"]["leg"] for e in events} == {"primary", "backup"}
+    assert all(e["type"] == "session.migrated" and e["data"]["node_ip"] == "10.0.0.3" for e in events)
+
+    resp = await client.get(f"/api/admin/nodes/{draining_id}/drain", headers=admin_headers)
+    progress = resp.json()
+    assert progress["status"] == "inactive"
+    assert (progress["remaining"], progress["migrated"], progress["failed"]) == (0, 4, 0)
+    assert progress["finished_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_unmovable_legs_keep_node_draining(
+    client, admin_headers, db_session, session_factory, seed_games, nodes, make_session, relay, session_legs,
+):
+    draining, nearby, remote = nodes
+    draining_id, remote_id = draining.id, remote.id
+    nearby.status = "inactive"
+    await db_session.commit()
+    await make_session(seed_games[0], draining, 811)
+    # Its primary is the only node left to take sessions: the backup is dropped.
+    await make_session(seed_games[0], remote, 812, backup=draining)
+    relay.failing_hosts = ("10.0.0.2",)
+
+    await client.post(f"/api/admin/nodes/{draining_id}/drain", headers=admin_headers)
+    await drain_nodes(session_factory)
+
+    assert await session_legs() == {811: (draining_id, None, False), 812: (remote_id, None, False)}
+    resp = await client.get(f"/api/admin/nodes/{draining_id}/drain", headers=admin_headers)
+    progress = resp.json()
+    assert progress["status"] == "draining"
+    assert (progress["remaining"], progress["migrated"], progress["failed"]) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_reconciler_leaves_a_leg_being_moved_alone(
+    client, admin_headers, session_factory, seed_games, nodes, make_session, relay, session_legs,
+):
+    draining, nearby, remote = nodes
+    draining_id, nearby_id, remote_id = draining.id, nearby.id, remote.id
+    await make_session(seed_games[0], draining, 821)
+    relay.sessions["10.0.0.1"] = {821}
+    await client.post(f"/api/admin/nodes/{draining_id}/drain", headers=admin_headers)
+    cycles = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        response = await relay.handler(request)
+        if request.method == "POST" and not cycles:
+            # A reconcile cycle between the registration and the move.
+            cycles.append(await reconcile_relays(session_factory))
+        return response
+
+    set_relay_transport(httpx.MockTransport(handler))
+    assert await drain_nodes(session_factory) == 1
+
+    assert cycles == [{draining_id: (0, 0), nearby_id: (0, 0), remote_id: (0, 0)}]
+    assert relay.sessions["10.0.0.3"] == {821}
+    assert (await session_legs())[821] == (nearby_id, None, False)
+
+
+@pytest.mark.asyncio
+async def test_expired_drain_lock_is_not_released_from_under_its_new_holder(
+    client, admin_headers, db_session, session_factory, seed_games, nodes, monkeypatch, make_session,
+):
+    draining_id = nodes[0].id
+    lock = f"{LOCK_PREFIX}{draining_id}"
+    await make_session(seed_games[0], nodes[0], 831)
+    await client.post(f"/api/admin/nodes/{draining_id}/drain", headers=admin_headers)
+
+    async def slow_batch(node_id, session_factory):
+        # This pass outlived its lock and another worker took it over.
+        await get_redis().set(lock, "other-worker")
+        return 0, 0
+
+    monkeypatch.setattr("app.services.node_drain.migrate_batch", slow_batch)
+    await drain_nodes(session_factory)
+    assert await get_redis().get(lock) == "other-worker"
+
+
+@pytest.mark.asyncio
+async def test_delete_node_drains_and_new_sessions_avoid_it(
+    client, admin_headers, auth_headers, db_session, seed_games, nodes, make_session,
+):
+    draining = nodes[0]
+    draining_id = draining.id
+    await make_session(seed_games[1], draining, 821)
+
+    resp = await client.delete(f"/api/admin/nodes/{draining_id}", headers=admin_headers)
+    assert resp.json()["status"] == "draining"
+
+    resp = await client.post(
+        "/api/sessions/start", json={"game_slug": "cs2", "node_id": str(draining_id)}, headers=auth_headers,
+    )
+    assert resp.status_code == 400
+
+    resp = await client.delete(f"/api/admin/nodes/{draining_id}/drain", headers=admin_headers)
+    assert resp.json()["status"] == "active"
+    resp = await client.delete(f"/api/admin/nodes/{draining_id}/drain", headers=admin_headers)
+    assert resp.status_code == 400
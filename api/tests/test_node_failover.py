@@ -0,0 +1,147 @@
+"""Tests for promoting backup relays when a primary relay goes down."""
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.relay_outbox import RelayOutbox
+from app.models.session import Session
+from app.services.node_health import NodeHealthMonitor
+from app.services.relay_client import set_relay_transport
+from app.services.relay_reconcile import reconcile_relays
+from app.utils.events import CHANNEL
+from app.utils.redis_pool import get_redis
+
+
+@pytest.fixture
+def poll(session_factory, relay_health):
+    """One health poll with ``dead_ips`` down, waiting for the failover it starts."""
+    async def run(dead_ips: set[str], monitor: NodeHealthMonitor | None = None) -> None:
+        monitor = monitor or NodeHealthMonitor(session_factory)
+        async with relay_health(dead_ips) as health:
+            await monitor.poll_once(health)
+        if monitor.failover_task is not None:
+            await monitor.failover_task
+
+    return run
+
+
+@pytest_asyncio.fixture
+async def nodes(seed_node, other_node, make_node, monkeypatch):
+    monkeypatch.setattr(settings, "node_degrade_after_failures", 1)
+    spare = await make_node("Test Riga", "LV", "10.0.0.3")
+    retired = await make_node("Test Dallas", "US", "10.0.0.4", status="inactive")
+    return seed_node, other_node, spare, retired
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_promotes_backup_and_gets_new_backup(
+    db_session, seed_games, nodes, make_session, relay, poll, session_legs,
+):
+    failed, backup, spare, retired = nodes
+    failed_id, backup_id, spare_id, retired_id = failed.id, backup.id, spare.id, retired.id
+    game = seed_games[0]
+    promoted = await make_session(game, failed, 901, backup=backup)
+    promoted_id = promoted.id
+    await make_session(game, backup, 902, backup=failed)
+    await make_session(game, failed, 903)
+    await make_session(game, failed, 904, backup=retired)
+    pubsub = get_redis().pubsub()
+    await pubsub.subscribe(CHANNEL)
+
+    await poll({"10.0.0.1"})
+
+    # 901: backup promoted; 902: dead backup replaced. Both get a backup in
+    # another location than their (Stockholm) primary.
+    assert await session_legs() == {
+        901: (backup_id, spare_id, True),
+        902: (backup_id, spare_id, True),
+        903: (failed_id, None, False),
+        904: (failed_id, retired_id, True),
+    }
+    assert relay.registered == {"10.0.0.3": {901, 902}}
+    result = await db_session.execute(
+        select(RelayOutbox.session_token).where(RelayOutbox.action == "unregister", RelayOutbox.node_id == failed_id)
+    )
+    assert sorted(result.scalars().all()) == [901, 902]
+
+    events = []
+    while (message := await pubsub.get_message(timeout=0.5)) is not None:
+        if message["type"] == "message":
+            events.append(json.loads(message["data"]))
+    await pubsub.aclose()
+    failovers = [e for e in events if e["type"] == "session.failover"]
+    assert [e["data"] for e in failovers] == [{
+        "session_id": str(promoted_id), "node_id": str(backup_id), "node_ip": "10.0.0.2", "node_port": 443,
+    }]
+    migrated = [e["data"] for e in events if e["type"] == "session.migrated"]
+    assert len(migrated) == 2
+    assert all(m["leg"] == "backup" and m["node_ip"] == "10.0.0.3" for m in migrated)
+
+
+@pytest.mark.asyncio
+async def test_failover_without_a_new_backup_goes_single_path(
+    db_session, seed_games, nodes, make_session, relay, poll, session_legs,
+):
+    failed, backup, _, _ = nodes
+    backup_id = backup.id
+    session = await make_session(seed_games[0], failed, 911, backup=backup)
+    session.backup_relay_status = "pending"
+    await db_session.commit()
+    relay.failing_hosts = ("10.0.0.3",)
+
+    await poll({"10.0.0.1"})
+
+    assert (await session_legs())[911] == (backup_id, None, False)
+    relay_status = await db_session.scalar(select(Session.relay_status).where(Session.session_token == 911))
+    assert relay_status == "pending"
+
+
+@pytest.mark.asyncio
+async def test_reconciler_leaves_a_backup_being_attached_alone(
+    session_factory, seed_games, nodes, make_session, relay, poll, session_legs,
+):
+    failed, backup, spare, _ = nodes
+    backup_id, spare_id = backup.id, spare.id
+    await make_session(seed_games[0], failed, 931, backup=backup)
+    relay.sessions["10.0.0.2"] = {931}
+    cycles = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        response = await relay.handler(request)
+        if request.method == "POST" and not cycles:
+            # A reconcile cycle between the new backup's registration and its attach.
+            cycles.append(await reconcile_relays(session_factory))
+        return response
+
+    set_relay_transport(httpx.MockTransport(handler))
+    await poll({"10.0.0.1"})
+
+    assert cycles[0][spare_id] == (0, 0)
+    assert relay.sessions["10.0.0.3"] == {931}
+    assert (await session_legs())[931] == (backup_id, spare_id, True)
+
+
+@pytest.mark.asyncio
+async def test_failed_failover_is_retried_on_the_next_poll(
+    db_session, session_factory, seed_games, nodes, monkeypatch, make_session, relay, poll, session_legs,
+):
+    failed, backup, _, _ = nodes
+    failed_id, backup_id = failed.id, backup.id
+    await make_session(seed_games[0], failed, 921, backup=backup)
+    monitor = NodeHealthMonitor(session_factory)
+
+    async def broken(node_ids, session_factory):
+        raise RuntimeError("database went away")
+
+    with monkeypatch.context() as patched:
+        patched.setattr("app.services.node_failover.fail_over", broken)
+        await poll({"10.0.0.1"}, monitor)
+    assert (await session_legs())[921] == (failed_id, backup_id, True)
+
+    # Already degraded, so no new transition: the retry comes from its sessions.
+    await poll({"10.0.0.1"}, monitor)
+    assert (await session_legs())[921][0] == backup_id
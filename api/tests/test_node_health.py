@@ -0,0 +1,79 @@
+"""Tests for background relay health polling."""
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.node import Node
+from app.services.node_health import NodeHealthMonitor
+
+
+@pytest_asyncio.fixture
+async def dead_node(make_node):
+    return await make_node("Test Riga", "LV", "10.0.0.9")
+
+
+@pytest_asyncio.fixture
+async def monitor(session_factory, monkeypatch):
+    mon = NodeHealthMonitor(session_factory)
+    monkeypatch.setattr("app.routers.nodes.node_health", mon)
+    return mon
+
+
+@pytest.mark.asyncio
+async def test_poll_caches_health(client, monitor, seed_node, relay_health):
+    async with relay_health(set()) as relay:
+        await monitor.poll_once(relay)
+
+    entry = monitor.get(seed_node.id)
+    assert entry.reachable is True
+    assert entry.active_sessions == 7
+    assert entry.uptime_secs == 3600
+
+    resp = await client.get(f"/api/nodes/{seed_node.id}/ping")
+    assert resp.json()["status"] == "ok"
+    assert resp.json()["ping_ms"] is not None
+
+    resp = await client.get("/api/nodes")
+    nodes = resp.json()
+    assert len(nodes) == 1
+    assert nodes[0]["relay_active_sessions"] == 7
+
+
+@pytest.mark.asyncio
+async def test_unreachable_node_degraded(client, monitor, seed_node, dead_node, db_session, relay_health):
+    dead_id, live_id = dead_node.id, seed_node.id
+    async with relay_health({dead_node.ip_address}) as relay:
+        for _ in range(settings.node_degrade_after_failures):
+            await monitor.poll_once(relay)
+
+    resp = await client.get(f"/api/nodes/{dead_id}/ping")
+    assert resp.json()["status"] == "unreachable"
+
+    db_session.expire_all()
+    result = await db_session.execute(select(Node).where(Node.id == dead_id))
+    assert result.scalar_one().status == "degraded"
+
+    # Degraded nodes are hidden from clients choosing a relay.
+    resp = await client.get("/api/nodes")
+    assert [n["id"] for n in resp.json()] == [str(live_id)]
+
+    # ...and restored once they answer again.
+    async with relay_health(set()) as relay:
+        await monitor.poll_once(relay)
+    db_session.expire_all()
+    result = await db_session.execute(select(Node).where(Node.id == dead_id))
+    assert result.scalar_one().status == "active"
+
+
+@pytest.mark.asyncio
+async def test_ping_unknown_before_first_poll(client, monitor, seed_node):
+    resp = await client.get(f"/api/nodes/{seed_node.id}/ping")
+    assert resp.status_code == 200
+    assert resp.json()["status"] == "unknown"
+
+
+@pytest.mark.asyncio
+async def test_ping_missing_node(client, monitor):
+    resp = await client.get("/api/nodes/00000000-0000-0000-0000-000000000000/ping")
+    assert resp.status_code == 404
@@ -0,0 +1,193 @@
+"""Tests for live node load tracking, recommendations and capacity checks."""
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.node import Node
+from app.models.session import Session
+from app.models.user import User
+from app.services.node_capacity import reconcile_node_counters
+from app.services.node_health import NodeHealthMonitor
+
+
+@pytest_asyncio.fixture
+async def other_user(db_session: AsyncSession):
+    user = User(email="other@test.com", username="otheruser", password_hash="x")
+    db_session.add(user)
+    await db_session.commit()
+    return user
+
+
+@pytest_asyncio.fixture
+async def spare_node(db_session: AsyncSession):
+    """A second DE node to take sessions when the first is full."""
+    node = Node(
+        name="Test Frankfurt 2",
+        location="DE",
+        city="Frankfurt",
+        ip_address="10.0.0.2",
+        status="active",
+        current_load=0,
+        max_sessions=1000,
+        relay_port=443,
+        relay_api_port=8443,
+    )
+    db_session.add(node)
+    await db_session.commit()
+    await db_session.refresh(node)
+    return node
+
+
+async def fill_node(db: AsyncSession, node: Node, user: User, game) -> None:
+    node.max_sessions = 1
+    db.add(Session(
+        user_id=user.id,
+        node_id=node.id,
+        game_profile_id=game.id,
+        session_token=777,
+        status="active",
+        started_at=datetime.now(timezone.utc),
+    ))
+    await db.commit()
+    await reconcile_node_counters(db)
+
+
+@pytest.mark.asyncio
+async def test_poll_updates_current_load(session_factory, db_session, seed_node, seed_games, other_user):
+    await fill_node(db_session, seed_node, other_user, seed_games[0])
+    node_id = seed_node.id
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"status": "ok", "active_sessions": 0, "uptime_secs": 1})
+
+    monitor = NodeHealthMonitor(session_factory)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as relay:
+        await monitor.poll_once(relay)
+
+    assert monitor.get(node_id).node.current_load == 1
+    db_session.expire_all()
+    result = await db_session.execute(select(Node.current_load).where(Node.id == node_id))
+    assert result.scalar_one() == 1
+
+
+@pytest.mark.asyncio
+async def test_recommend_ranks_by_headroom(client, db_session, seed_node, spare_node, seed_games, other_user):
+    await fill_node(db_session, seed_node, other_user, seed_games[0])
+    spare_id = spare_node.id
+
+    resp = await client.get("/api/nodes/recommend")
+    assert resp.status_code == 200
+    ranked = resp.json()
+    # The full node is left out entirely.
+    assert [n["id"] for n in ranked] == [str(spare_id)]
+    assert ranked[0]["score"] > 0
+
+    resp = await client.get("/api/nodes/recommend", params={"location": "SE"})
+    assert resp.json() == []
+
+
+@pytest.mark.asyncio
+async def test_full_node_redirects_within_location(
+    client, auth_headers, db_session, seed_node, spare_node, seed_games, other_user,
+):
+    await fill_node(db_session, seed_node, other_user, seed_games[0])
+    with patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock):
+        resp = await client.post("/api/sessions/start", json={
+            "game_slug": "cs2",
+            "node_id": str(seed_node.id),
+        }, headers=auth_headers)
+    assert resp.status_code == 201
+    assert resp.json()["node_ip"] == "10.0.0.2"
+
+
+@pytest.mark.asyncio
+async def test_full_node_refused(client, auth_headers, db_session, seed_node, seed_games, other_user):
+    await fill_node(db_session, seed_node, other_user, seed_games[0])
+    with patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock) as reg:
+        resp = await client.post("/api/sessions/start", json={
+            "game_slug": "cs2",
+            "node_id": str(seed_node.id),
+        }, headers=auth_headers)
+    assert resp.status_code == 400
+    assert "capacity" in resp.json()["detail"]
+    assert reg.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_admission_never_overshoots(seed_node, db_session):
+    import asyncio
+
+    from app.services.node_capacity import admit, get_node_counts
+
+    seed_node.max_sessions = 5
+    await db_session.commit()
+    await reconcile_node_counters(db_session)
+
+    results = await asyncio.gather(*(admit(seed_node) for _ in range(20)))
+    assert results.count(True) == 5
+    assert results.count(False) == 15
+    assert (await get_node_counts([seed_node.id]))[seed_node.id] == 5
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_start_and_stop(client, auth_headers, db_session, seed_node, seed_games):
+    from app.services.node_capacity import get_node_counts
+
+    await reconcile_node_counters(db_session)
+    with patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock), \
+            patch("app.services.session_service.unregister_session_on_relay", new_callable=AsyncMock):
+        resp = await client.post("/api/sessions/start", json={
+            "game_slug": "cs2",
+            "node_id": str(seed_node.id),
+        }, headers=auth_headers)
+        session_id = resp.json()["session_id"]
+        assert (await get_node_counts([seed_node.id]))[seed_node.id] == 1
+
+        resp = await client.get("/api/nodes")
+        assert resp.json()[0]["current_load"] == 1
+
+        await client.post(f"/api/sessions/{session_id}/stop", headers=auth_headers)
+        assert (await get_node_counts([seed_node.id]))[seed_node.id] == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_falls_back_to_db_without_redis(
+    client, auth_headers, db_session, seed_node, seed_games, other_user, monkeypatch,
+):
+    from app.utils import redis_pool
+
+    await fill_node(db_session, seed_node, other_user, seed_games[0])
+    monkeypatch.setattr(redis_pool.settings, "redis_url", "redis://127.0.0.1:1/0")
+    redis_pool.reset_redis()
+
+    with patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock):
+        resp = await client.post("/api/sessions/start", json={
+            "game_slug": "cs2",
+            "node_id": str(seed_node.id),
+        }, headers=auth_headers)
+    assert resp.status_code == 400
+    assert "capacity" in resp.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_leaves_counters_that_moved_while_counting(seed_node, db_session, monkeypatch):
+    from app.services import node_capacity
+    from app.services.node_capacity import admit, get_node_counts
+
+    await reconcile_node_counters(db_session)
+    count_sessions = node_capacity.count_active_sessions
+
+    async def count_during_admit(db, node_ids):
+        counts = await count_sessions(db, node_ids)
+        # A start admitted after the snapshot but not yet committed.
+        await admit(seed_node)
+        return counts
+
+    monkeypatch.setattr(node_capacity, "count_active_sessions", count_during_admit)
+    await reconcile_node_counters(db_session)
+    assert (await get_node_counts([seed_node.id]))[seed_node.id] == 1
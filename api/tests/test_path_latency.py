@@ -0,0 +1,98 @@
+"""Tests for the relay→game RTT matrix and path recommendations."""
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.node import Node
+
+
+@pytest_asyncio.fixture
+async def far_node(db_session: AsyncSession):
+    node = Node(
+        name="Test New York",
+        location="US",
+        city="New York",
+        ip_address="10.0.0.3",
+        status="active",
+        relay_api_port=8443,
+    )
+    db_session.add(node)
+    await db_session.commit()
+    await db_session.refresh(node)
+    return node
+
+
+@pytest.mark.asyncio
+async def test_report_requires_api_key(client, seed_node):
+    resp = await client.put(f"/api/nodes/{seed_node.id}/game-rtt", json={"samples": []})
+    assert resp.status_code == 401
+    resp = await client.get("/api/nodes/rtt-targets", headers={"X-API-Key": "wrong"})
+    assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_rtt_targets(client, seed_games, relay_headers):
+    resp = await client.get("/api/nodes/rtt-targets", headers=relay_headers)
+    assert resp.status_code == 200
+    assert resp.json()["cidrs"] == ["155.133.232.0/23", "162.249.72.0/22"]
+
+
+@pytest.mark.asyncio
+async def test_report_rejects_bad_cidr(client, seed_node, relay_headers):
+    resp = await client.put(
+        f"/api/nodes/{seed_node.id}/game-rtt",
+        json={"samples": [{"cidr": "nope", "rtt_ms": 10}]},
+        headers=relay_headers,
+    )
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_path_recommendation_uses_both_legs(client, seed_games, seed_node, far_node, relay_headers):
+    # Valorant servers: 80 ms from DE, 5 ms from US.
+    for node, rtt in ((seed_node, 80.0), (far_node, 5.0)):
+        resp = await client.put(
+            f"/api/nodes/{node.id}/game-rtt",
+            json={"samples": [{"cidr": "162.249.72.0/24", "rtt_ms": rtt}]},
+            headers=relay_headers,
+        )
+        assert resp.status_code == 200
+        assert resp.json() == {"accepted": 1}
+
+    # Client is closer to DE, but the US path is shorter end to end.
+    resp = await client.post("/api/nodes/recommend/path", json={
+        "game_slug": "valorant",
+        "node_pings": {str(seed_node.id): 20.0, str(far_node.id): 70.0},
+    })
+    assert resp.status_code == 200
+    ranked = resp.json()
+    assert [n["id"] for n in ranked] == [str(far_node.id), str(seed_node.id)]
+    assert ranked[0]["total_rtt_ms"] == 75.0
+    assert ranked[1]["total_rtt_ms"] == 100.0
+
+    # No samples for CS2 servers: falls back to client pings.
+    resp = await client.post("/api/nodes/recommend/path", json={
+        "game_slug": "cs2",
+        "node_pings": {str(seed_node.id): 20.0, str(far_node.id): 70.0},
+    })
+    ranked = resp.json()
+    assert ranked[0]["id"] == str(seed_node.id)
+    assert ranked[0]["total_rtt_ms"] is None
+
+
+@pytest.mark.asyncio
+async def test_newer_report_replaces_sample(client, seed_games, seed_node, relay_headers):
+    for rtt in (50.0, 12.5):
+        await client.put(
+            f"/api/nodes/{seed_node.id}/game-rtt",
+            json={"samples": [{"cidr": "162.249.72.0/22", "rtt_ms": rtt}]},
+            headers=relay_headers,
+        )
+    resp = await client.post("/api/nodes/recommend/path", json={"game_slug": "valorant"})
+    assert resp.json()[0]["server_rtt_ms"] == 12.5
+
+
+@pytest.mark.asyncio
+async def test_path_unknown_game(client, seed_node):
+    resp = await client.post("/api/nodes/recommend/path", json={"game_slug": "nope"})
+    assert resp.status_code == 404
@@ -0,0 +1,70 @@
+"""Tests for the shared relay API client."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import relay_client
+from app.services.relay_client import (
+    get_relay_http,
+    register_session_on_relay,
+    set_relay_transport,
+    unregister_session_on_relay,
+)
+
+
+@pytest.fixture
+def relay_requests():
+    """Stand-in relay that records requests and answers 200."""
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json={"status": "ok"})
+
+    set_relay_transport(httpx.MockTransport(handler))
+    yield seen
+    set_relay_transport(None)
+
+
+@pytest.mark.asyncio
+async def test_register_and_unregister(relay_requests):
+    assert await register_session_on_relay("10.0.0.1", 8443, 42, ["1.2.3.0/24"], ["27015"])
+    assert await unregister_session_on_relay("10.0.0.1", 8443, 42)
+
+    register, unregister = relay_requests
+    assert register.method == "POST"
+    assert str(register.url) == "http://10.0.0.1:8443/sessions"
+    assert register.headers["X-API-Key"] == settings.relay_api_key
+    assert unregister.method == "DELETE"
+    assert str(unregister.url) == "http://10.0.0.1:8443/sessions/42"
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared(relay_requests):
+    client = get_relay_http()
+    await register_session_on_relay("10.0.0.1", 8443, 1, [], [])
+    await unregister_session_on_relay("10.0.0.2", 8443, 1)
+    assert get_relay_http() is client
+
+
+@pytest.mark.asyncio
+async def test_connection_error_returns_false():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    set_relay_transport(httpx.MockTransport(handler))
+    assert await register_session_on_relay("10.0.0.1", 8443, 1, [], []) is False
+    assert await unregister_session_on_relay("10.0.0.1", 8443, 1) is False
+
+
+@pytest.mark.asyncio
+async def test_total_timeout(monkeypatch):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(1)
+        return httpx.Response(200)
+
+    monkeypatch.setattr(relay_client.settings, "relay_total_timeout_seconds", 0.05)
+    set_relay_transport(httpx.MockTransport(handler))
+    assert await register_session_on_relay("10.0.0.1", 8443, 1, [], []) is False
@@ -0,0 +1,168 @@
+"""Tests for relay register/unregister delivery through the outbox."""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.relay_outbox import RelayOutbox
+from app.models.session import Session
+from app.services.relay_client import set_relay_transport
+from app.services.relay_outbox import drain_outbox, process_outbox_batch
+
+
+def relay_stub(ok: bool, calls: list[httpx.Request]) -> httpx.MockTransport:
+    """Stand-in for the relay session API, answering 200 or 503."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200 if ok else 503, json={})
+
+    return httpx.MockTransport(handler)
+
+
+async def _entries(db: AsyncSession, session_id: str) -> list[RelayOutbox]:
+    db.expire_all()
+    result = await db.execute(
+        select(RelayOutbox).where(RelayOutbox.session_id == session_id).order_by(RelayOutbox.created_at)
+    )
+    return list(result.scalars().all())
+
+
+async def _start(client, auth_headers, node_id) -> dict:
+    resp = await client.post(
+        "/api/sessions/start",
+        json={"game_slug": "cs2", "node_id": str(node_id)},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 201
+    return resp.json()
+
+
+async def _make_due(db: AsyncSession) -> None:
+    await db.execute(
+        update(RelayOutbox)
+        .where(RelayOutbox.status == "pending")
+        .values(next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+    )
+    await db.commit()
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_start_records_delivered_registration(mock_relay, client, auth_headers, seed_games, seed_node, db_session):
+    data = await _start(client, auth_headers, seed_node.id)
+
+    entries = await _entries(db_session, data["session_id"])
+    assert [(e.action, e.status, e.attempts) for e in entries] == [("register", "delivered", 1)]
+    assert entries[0].payload["game_ports"] == ["27015-27050"]
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=False)
+async def test_worker_retries_failed_registration(
+    mock_relay, client, auth_headers, seed_games, seed_node, db_session, session_factory,
+):
+    node_ip = seed_node.ip_address
+    data = await _start(client, auth_headers, seed_node.id)
+    assert data["relay_status"] == "failed"
+
+    [entry] = await _entries(db_session, data["session_id"])
+    assert entry.status == "pending"
+    assert entry.next_attempt_at > datetime.now(timezone.utc)
+    # Not due yet: backoff keeps the worker away.
+    assert await process_outbox_batch(session_factory) == 0
+
+    await _make_due(db_session)
+    calls: list[httpx.Request] = []
+    set_relay_transport(relay_stub(True, calls))
+    assert await process_outbox_batch(session_factory) == 1
+
+    assert [(r.method, r.url.host) for r in calls] == [("POST", node_ip)]
+    [entry] = await _entries(db_session, data["session_id"])
+    assert (entry.status, entry.attempts) == ("delivered", 2)
+    session = await db_session.get(Session, entry.session_id)
+    assert session.relay_status == "registered"
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.unregister_session_on_relay", new_callable=AsyncMock, return_value=True)
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=False)
+async def test_stop_supersedes_pending_registration(
+    mock_register, mock_unregister, client, auth_headers, seed_games, seed_node, db_session,
+):
+    data = await _start(client, auth_headers, seed_node.id)
+    resp = await client.post(f"/api/sessions/{data['session_id']}/stop", headers=auth_headers)
+    assert resp.status_code == 200
+
+    entries = await _entries(db_session, data["session_id"])
+    assert sorted((e.action, e.status) for e in entries) == [
+        ("register", "superseded"), ("unregister", "delivered"),
+    ]
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=False)
+async def test_entry_dead_after_max_attempts(
+    mock_relay, client, auth_headers, seed_games, seed_node, db_session, session_factory, monkeypatch,
+):
+    monkeypatch.setattr(settings, "relay_outbox_max_attempts", 2)
+    data = await _start(client, auth_headers, seed_node.id)
+
+    await _make_due(db_session)
+    calls: list[httpx.Request] = []
+    set_relay_transport(relay_stub(False, calls))
+    assert await process_outbox_batch(session_factory) == 1
+
+    [entry] = await _entries(db_session, data["session_id"])
+    assert (entry.status, entry.attempts) == ("dead", 2)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=False)
+async def test_registration_superseded_in_flight_leaves_session_status(
+    mock_relay, client, auth_headers, seed_games, seed_node, db_session, session_factory,
+):
+    data = await _start(client, auth_headers, seed_node.id)
+    await _make_due(db_session)
+
+    async def stop_while_delivering(request: httpx.Request) -> httpx.Response:
+        # The session is stopped while the worker's registration is in flight.
+        async with session_factory() as db:
+            await db.execute(
+                update(RelayOutbox).where(RelayOutbox.status == "pending").values(status="superseded")
+            )
+            await db.execute(update(Session).values(status="stopped"))
+            await db.commit()
+        return httpx.Response(200, json={})
+
+    set_relay_transport(httpx.MockTransport(stop_while_delivering))
+    assert await process_outbox_batch(session_factory) == 1
+
+    [entry] = await _entries(db_session, data["session_id"])
+    assert entry.status == "superseded"
+    session = await db_session.get(Session, entry.session_id)
+    assert session.relay_status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_worker_keeps_taking_full_batches(
+    db_session, session_factory, seed_games, seed_node, make_session, monkeypatch,
+):
+    monkeypatch.setattr(settings, "relay_outbox_batch_size", 2)
+    now = datetime.now(timezone.utc)
+    for token in range(601, 606):
+        session = await make_session(seed_games[0], seed_node, token, status="stopped")
+        db_session.add(RelayOutbox(
+            session_id=session.id, node_id=seed_node.id, action="unregister", session_token=token,
+            payload={}, status="pending", next_attempt_at=now,
+        ))
+    await db_session.commit()
+    calls: list[httpx.Request] = []
+    set_relay_transport(relay_stub(True, calls))
+
+    assert await drain_outbox(session_factory) == 5
+    assert len(calls) == 5
@@ -0,0 +1,70 @@
+"""Tests for DB ↔ relay session reconciliation."""
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.relay_outbox import RelayOutbox
+from app.models.session import Session
+from app.schemas.node import NodeResponse
+from app.services.node_health import NodeStatus
+from app.services.relay_reconcile import reconcile_relays
+
+
+@pytest_asyncio.fixture
+async def active_session(db_session: AsyncSession, test_user, seed_games, seed_node):
+    session = Session(
+        user_id=test_user.id,
+        node_id=seed_node.id,
+        game_profile_id=seed_games[0].id,
+        session_token=4242,
+        status="active",
+        started_at=datetime.now(timezone.utc),
+    )
+    db_session.add(session)
+    await db_session.commit()
+    await db_session.refresh(session)
+    return session
+
+
+@pytest.mark.asyncio
+async def test_restarted_relay_gets_sessions_back(relay, active_session, seed_node, session_factory):
+    # The relay lost the active session and kept one the DB already ended.
+    relay.sessions[seed_node.ip_address] = {999}
+
+    diff = await reconcile_relays(session_factory)
+
+    assert diff == {seed_node.id: (1, 1)}
+    assert relay.sessions[seed_node.ip_address] == {4242}
+    assert ("DELETE", "/sessions/999") in relay.requests
+
+
+@pytest.mark.asyncio
+async def test_in_flight_legs_are_left_to_outbox(relay, active_session, seed_node, db_session, session_factory):
+    db_session.add(RelayOutbox(
+        session_id=active_session.id,
+        node_id=seed_node.id,
+        action="register",
+        session_token=active_session.session_token,
+        payload={},
+        status="pending",
+        next_attempt_at=datetime.now(timezone.utc),
+    ))
+    await db_session.commit()
+
+    diff = await reconcile_relays(session_factory)
+
+    assert diff == {seed_node.id: (0, 0)}
+    assert relay.requests == [("GET", "/sessions")]
+
+
+@pytest.mark.asyncio
+async def test_matching_health_count_skips_listing(relay, active_session, seed_node, session_factory, monkeypatch):
+    status = NodeStatus(NodeResponse.model_validate(seed_node))
+    status.reachable = True
+    status.active_sessions = 1
+    monkeypatch.setattr("app.services.relay_reconcile.node_health._statuses", {seed_node.id: status})
+
+    assert await reconcile_relays(session_factory) == {}
+    assert relay.requests == []
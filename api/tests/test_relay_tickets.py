@@ -0,0 +1,108 @@
+"""Tests for signed relay session tickets."""
+import base64
+import json
+import time
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.relay_outbox import RelayOutbox
+from app.services.relay_client import relay_game_lists, set_relay_transport
+from app.services.relay_outbox import process_outbox_batch
+from app.services.relay_tickets import MAC_SIZE, decode_ticket, encode_ticket
+
+
+def _unpadded(ticket: str) -> bytes:
+    return base64.urlsafe_b64decode(ticket + "=" * (-len(ticket) % 4))
+
+
+def test_ticket_round_trip_and_rejections(monkeypatch):
+    monkeypatch.setattr(settings, "relay_ticket_key", "k1")
+    expires = int(time.time()) + 60
+    node_id = uuid.uuid4()
+    ticket = encode_ticket(
+        node_id, 1234, ["155.133.232.0/23", "2001:db8::/32"], [[27015, 27050], [3478, 3478]], expires,
+    )
+    # 25-byte head, two CIDRs (6 + 18), two ranges, MAC.
+    assert len(ticket) == 25 + 1 + 6 + 18 + 1 + 8 + MAC_SIZE
+    assert decode_ticket(ticket) == (
+        node_id, 1234, ["155.133.232.0/23", "2001:db8::/32"], [[27015, 27050], [3478, 3478]], expires,
+    )
+
+    tampered = bytearray(ticket)
+    tampered[2] ^= 0x01
+    assert decode_ticket(bytes(tampered)) is None
+    assert decode_ticket(ticket[:-1]) is None
+    assert decode_ticket(ticket, now=expires) is None
+    monkeypatch.setattr(settings, "relay_ticket_key", "k2")
+    assert decode_ticket(ticket) is None
+
+
+def test_relay_game_lists_use_the_relays_forms():
+    assert relay_game_lists(
+        ["10.0.0.1/32", "155.133.232.0/23", "2001:db8::1/128", "2001:db8::/32"],
+        [[3478, 3478], [27015, 27050]],
+    ) == (["10.0.0.1", "155.133.232.0/23", "2001:db8::1", "2001:db8::/32"], ["3478", "27015-27050"])
+    assert relay_game_lists(None, None) == ([], [])
+
+
+@pytest.mark.asyncio
+async def test_ticketed_start_skips_inline_registration(
+    client, auth_headers, seed_games, seed_node, session_factory, monkeypatch,
+):
+    monkeypatch.setattr(settings, "relay_ticket_key", "shared")
+    calls: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"status": "ok"})
+
+    set_relay_transport(httpx.MockTransport(handler))
+    resp = await client.post(
+        "/api/sessions/start",
+        json={"game_slug": "cs2", "node_id": str(seed_node.id), "relay_ticket": True},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 201
+    data = resp.json()
+    assert calls == []
+    assert data["relay_status"] == "pending"
+    node_id, token, cidrs, ranges, expires = decode_ticket(_unpadded(data["relay_ticket"]))
+    # Bound to the placed node: no other relay admits it.
+    assert node_id == seed_node.id
+    assert (token, cidrs, ranges) == (data["session_token"], ["155.133.232.0/23"], [[27015, 27050]])
+    assert abs(expires - time.time() - settings.relay_ticket_ttl_seconds) < 5
+    assert data["relay_ticket_expires_at"] is not None
+
+    # The registration is due for the worker straight away.
+    assert await process_outbox_batch(session_factory) == 1
+    assert [r.url.path for r in calls] == ["/sessions"]
+    # Same lists as the relay decodes from the ticket, so it keeps the session.
+    body = json.loads(calls[0].content)
+    assert (body["game_server_ips"], body["game_ports"]) == relay_game_lists(cidrs, ranges)
+    async with session_factory() as db:
+        status = await db.scalar(select(RelayOutbox.status).where(RelayOutbox.action == "register"))
+    assert status == "delivered"
+
+
+@pytest.mark.asyncio
+async def test_no_ticket_without_a_key(client, auth_headers, seed_games, seed_node):
+    calls: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"status": "ok"})
+
+    set_relay_transport(httpx.MockTransport(handler))
+    resp = await client.post(
+        "/api/sessions/start",
+        json={"game_slug": "cs2", "node_id": str(seed_node.id), "relay_ticket": True},
+        headers=auth_headers,
+    )
+    data = resp.json()
+    assert data["relay_ticket"] is None
+    assert data["relay_status"] == "registered"
+    assert len(calls) == 1
@@ -0,0 +1,144 @@
+"""Tests for expiring sessions abandoned by their clients."""
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.relay_outbox import RelayOutbox
+from app.models.session import Session
+from app.services.session_reaper import reap_stale_sessions
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_idle_session_expires_and_frees_user(
+    mock_relay, client, db_session, session_factory, test_user, auth_headers, seed_games, seed_node, make_session,
+):
+    node_id = seed_node.id
+    stale = await make_session(seed_games[0], seed_node, 7001, user=test_user, idle_minutes=30)
+    stale_id, last_seen = stale.id, stale.last_seen_at
+
+    assert await reap_stale_sessions(session_factory) == 1
+
+    db_session.expire_all()
+    session = await db_session.get(Session, stale_id)
+    assert session.status == "expired"
+    assert session.ended_at == last_seen
+    result = await db_session.execute(
+        select(RelayOutbox.action, RelayOutbox.node_id, RelayOutbox.status)
+        .where(RelayOutbox.session_id == stale_id)
+    )
+    assert result.all() == [("unregister", node_id, "pending")]
+
+    resp = await client.post(
+        "/api/sessions/start", json={"game_slug": "cs2", "node_id": str(node_id)}, headers=auth_headers,
+    )
+    assert resp.status_code == 201
+    assert resp.json()["session_id"] != str(stale_id)
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_repeated_start_keeps_idle_session_alive(
+    mock_relay, client, db_session, session_factory, test_user, auth_headers, seed_games, seed_node, make_session,
+):
+    stale = await make_session(seed_games[0], seed_node, 7011, user=test_user, idle_minutes=30)
+    stale_id = stale.id
+
+    resp = await client.post(
+        "/api/sessions/start", json={"game_slug": "cs2", "node_id": str(seed_node.id)}, headers=auth_headers,
+    )
+    # The user still holds the idle session, so starting again returns it.
+    assert resp.json()["session_id"] == str(stale_id)
+    assert await reap_stale_sessions(session_factory) == 0
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_session_that_never_reported_is_not_reaped(
+    mock_relay, client, db_session, session_factory, auth_headers, seed_games, seed_node,
+):
+    # Clients without heartbeats (and relays without traffic reporting) give
+    # no liveness signal; their sessions must not be expired for it.
+    resp = await client.post(
+        "/api/sessions/start", json={"game_slug": "cs2", "node_id": str(seed_node.id)}, headers=auth_headers,
+    )
+    session_id = uuid.UUID(resp.json()["session_id"])
+    session = await db_session.get(Session, session_id)
+    assert session.last_seen_at is None
+    session.started_at = datetime.now(timezone.utc) - timedelta(hours=2)
+    await db_session.commit()
+
+    assert await reap_stale_sessions(session_factory) == 0
+    db_session.expire_all()
+    assert (await db_session.get(Session, session_id)).status == "active"
+
+
+@pytest.mark.asyncio
+async def test_reaps_in_batches(
+    session_factory, test_user, seed_games, seed_node, monkeypatch, make_session, session_statuses,
+):
+    monkeypatch.setattr(settings, "session_reaper_batch_size", 2)
+    for token in range(7101, 7106):
+        await make_session(seed_games[0], seed_node, token, idle_minutes=10)
+    await make_session(seed_games[0], seed_node, 7199, user=test_user, idle_minutes=1)
+
+    assert await reap_stale_sessions(session_factory) == 5
+
+    statuses = await session_statuses()
+    assert statuses.pop(7199) == "active"
+    assert set(statuses.values()) == {"expired"}
+
+
+@pytest.mark.asyncio
+async def test_client_traffic_keeps_session_alive(
+    client, session_factory, test_user, seed_games, seed_node, relay_headers, make_session, session_statuses,
+):
+    await make_session(seed_games[0], seed_node, 7201, user=test_user, idle_minutes=10)
+    await make_session(seed_games[0], seed_node, 7202, idle_minutes=10)
+
+    # 7201's client is still sending; 7202 only receives (game server traffic).
+    resp = await client.post(
+        f"/api/nodes/{seed_node.id}/session-traffic",
+        json={"samples": [
+            {"session_token": 7201, "bytes_sent": 500, "bytes_received": 0},
+            {"session_token": 7202, "bytes_sent": 0, "bytes_received": 500},
+        ]},
+        headers=relay_headers,
+    )
+    assert resp.json() == {"updated": 2}
+
+    assert await reap_stale_sessions(session_factory) == 1
+    assert await session_statuses() == {7201: "active", 7202: "expired"}
+
+
+@pytest.mark.asyncio
+async def test_restarted_relay_counter_keeps_session_alive(
+    client, db_session, session_factory, test_user, seed_games, seed_node, relay_headers, make_session,
+):
+    node_key = str(seed_node.id)
+    session = await make_session(seed_games[0], seed_node, 7301, user=test_user, idle_minutes=10)
+    session.bytes_sent = 10_000
+    session.relay_bytes_sent = {node_key: 10_000}
+    await db_session.commit()
+    url = f"/api/nodes/{node_key}/session-traffic"
+
+    # The relay restarted and counts from zero: far below the totals, but moving.
+    await client.post(url, json={"samples": [
+        {"session_token": 7301, "bytes_sent": 300, "bytes_received": 0},
+    ]}, headers=relay_headers)
+    assert await reap_stale_sessions(session_factory) == 0
+
+    # The same counter again: the client has gone quiet.
+    session.last_seen_at = datetime.now(timezone.utc) - timedelta(minutes=10)
+    await db_session.commit()
+    await client.post(url, json={"samples": [
+        {"session_token": 7301, "bytes_sent": 300, "bytes_received": 0},
+    ]}, headers=relay_headers)
+    assert await reap_stale_sessions(session_factory) == 1
+    db_session.expire_all()
+    totals = await db_session.execute(select(Session.bytes_sent, Session.relay_bytes_sent))
+    assert totals.one() == (10_000, {node_key: 300})
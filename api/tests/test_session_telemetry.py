@@ -0,0 +1,79 @@
+"""Tests for batched relay traffic ingestion."""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.session import Session
+
+
+async def _traffic(db: AsyncSession) -> dict[int, tuple]:
+    db.expire_all()
+    result = await db.execute(
+        select(Session.session_token, Session.bytes_sent, Session.bytes_received, Session.avg_ping)
+    )
+    return {row[0]: tuple(row[1:]) for row in result.all()}
+
+
+@pytest.mark.asyncio
+async def test_report_requires_api_key(client, seed_node):
+    resp = await client.post(f"/api/nodes/{seed_node.id}/session-traffic", json={"samples": []})
+    assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_report_updates_only_this_nodes_active_sessions(
+    client, db_session, test_user, auth_headers, seed_games, seed_node, other_node, relay_headers, make_session,
+):
+    game = seed_games[0]
+    await make_session(game, seed_node, 11, user=test_user)
+    await make_session(game, seed_node, 12, user=test_user, status="stopped")
+    await make_session(game, other_node, 13)
+
+    resp = await client.post(
+        f"/api/nodes/{seed_node.id}/session-traffic",
+        json={"samples": [
+            {"session_token": t, "bytes_sent": 1000, "bytes_received": 5000} for t in (11, 12, 13, 99)
+        ]},
+        headers=relay_headers,
+    )
+    assert resp.status_code == 200
+    assert resp.json() == {"updated": 1}
+    assert await _traffic(db_session) == {11: (1000, 5000, None), 12: (0, 0, None), 13: (0, 0, None)}
+
+    resp = await client.get("/api/me/stats", headers=auth_headers)
+    assert resp.json()["total_bytes_received"] == 5000
+
+
+@pytest.mark.asyncio
+async def test_counters_never_move_backwards(
+    client, db_session, test_user, seed_games, seed_node, relay_headers, make_session,
+):
+    await make_session(seed_games[0], seed_node, 21, user=test_user)
+    url = f"/api/nodes/{seed_node.id}/session-traffic"
+
+    await client.post(url, json={"samples": [
+        {"session_token": 21, "bytes_sent": 800, "bytes_received": 900, "avg_ping": 31.5},
+    ]}, headers=relay_headers)
+    # A late report from before the first one.
+    await client.post(url, json={"samples": [
+        {"session_token": 21, "bytes_sent": 100, "bytes_received": 950},
+    ]}, headers=relay_headers)
+
+    assert await _traffic(db_session) == {21: (800, 950, 31.5)}
+
+
+@pytest.mark.asyncio
+async def test_batch_of_many_sessions(client, db_session, seed_games, seed_node, relay_headers, make_session):
+    for token in range(31, 36):
+        await make_session(seed_games[0], seed_node, token)
+
+    samples = [{"session_token": t, "bytes_sent": t, "bytes_received": t * 2} for t in range(31, 36)]
+    # Repeated token: the last sample in the batch wins.
+    samples.append({"session_token": 31, "bytes_sent": 3100, "bytes_received": 3100, "avg_ping": 12.0})
+    resp = await client.post(
+        f"/api/nodes/{seed_node.id}/session-traffic", json={"samples": samples}, headers=relay_headers,
+    )
+    assert resp.json() == {"updated": 5}
+    expected = {t: (t, t * 2, None) for t in range(32, 36)}
+    expected[31] = (3100, 3100, 12.0)
+    assert await _traffic(db_session) == expected
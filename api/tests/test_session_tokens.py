@@ -0,0 +1,77 @@
+"""Tests for collision-free session token allocation."""
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.session import TOKEN_BLOCK_SIZE, Session
+from app.services import session_tokens
+from app.services.session_tokens import TOKEN_BITS, allocate_session_token, permute, token_for
+
+
+def test_permutation_is_collision_free_and_in_range():
+    tokens = {token_for(counter) for counter in range(200_000)}
+    assert len(tokens) == 200_000
+    assert min(tokens) >= 1
+    assert max(tokens) <= 2**TOKEN_BITS
+    # Wraps onto the same permutation after 2**30 allocations.
+    assert token_for(2**TOKEN_BITS + 5) == token_for(5)
+
+
+def test_permutation_depends_on_key(monkeypatch):
+    before = [permute(c) for c in range(8)]
+    monkeypatch.setattr(settings, "session_token_key", "another-key")
+    session_tokens.reset_token_allocator()
+    assert [permute(c) for c in range(8)] != before
+    # Consecutive counters do not give neighbouring tokens.
+    assert sorted(before) != before
+
+
+@pytest.mark.asyncio
+async def test_allocator_reserves_blocks(db_session: AsyncSession):
+    tokens = [await allocate_session_token(db_session) for _ in range(TOKEN_BLOCK_SIZE + 1)]
+    assert len(set(tokens)) == len(tokens)
+    # Second block starts where the sequence's second value points.
+    assert tokens[-1] == token_for(1 + TOKEN_BLOCK_SIZE)
+
+
+@pytest.mark.asyncio
+async def test_active_tokens_are_unique(db_session: AsyncSession, test_user, seed_games, seed_node):
+    def session(status: str) -> Session:
+        return Session(
+            user_id=test_user.id,
+            node_id=seed_node.id,
+            game_profile_id=seed_games[0].id,
+            session_token=31337,
+            status=status,
+            started_at=datetime.now(timezone.utc),
+        )
+
+    db_session.add_all([session("stopped"), session("active")])
+    await db_session.commit()
+
+    db_session.add(session("active"))
+    with pytest.raises(IntegrityError):
+        await db_session.commit()
+
+
+@pytest.mark.asyncio
+@patch("app.services.session_service.register_session_on_relay", new_callable=AsyncMock, return_value=True)
+async def test_start_retries_a_token_held_by_a_legacy_session(
+    mock_relay, client, auth_headers, seed_games, seed_node, make_session,
+):
+    # An active session from before the permuted allocator (or a key
+    # rotation) holds the token the allocator hands out next.
+    await make_session(seed_games[0], seed_node, 31337)
+
+    with patch(
+        "app.services.session_service.allocate_session_token", new_callable=AsyncMock, side_effect=[31337, 31338],
+    ):
+        resp = await client.post(
+            "/api/sessions/start", json={"game_slug": "cs2", "node_id": str(seed_node.id)}, headers=auth_headers,
+        )
+    assert resp.status_code == 201
+    assert resp.json()["session_token"] == 31338
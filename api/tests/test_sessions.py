@@ -1,4 +1,13 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
 import pytest
+from sqlalchemy import func, select, update
+
+from app.models.relay_outbox import RelayOutbox
+from app.models.session import Session
+from app.services.node_capacity import adjust, get_node_counts
+from app.services.relay_outbox import enqueue_unregister
 
 
 @pytest.mark.asyncio
@@ -44,3 +53,79 @@ async def test_session_unauthenticated(client):
         "node_id": "00000000-0000-0000-0000-000000000000",
     })
     assert resp.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_concurrent_starts_share_one_session(client, auth_headers, seed_games, seed_node, db_session):
+    body = {"game_slug": "cs2", "node_id": str(seed_node.id)}
+    node_id = seed_node.id
+    first, second = await asyncio.gather(
+        client.post("/api/sessions/start", json=body, headers=auth_headers),
+        client.post("/api/sessions/start", json=body, headers=auth_headers),
+    )
+    assert first.status_code == second.status_code == 201
+    assert first.json()["session_id"] == second.json()["session_id"]
+
+    active = await db_session.execute(
+        select(func.count()).select_from(Session).where(Session.status == "active")
+    )
+    assert active.scalar_one() == 1
+    # The losing start gave its node slot back.
+    assert await get_node_counts([node_id]) == {node_id: 1}
+
+
+@pytest.mark.asyncio
+async def test_repeated_start_refreshes_and_reregisters(client, auth_headers, seed_games, seed_node, db_session):
+    body = {"game_slug": "cs2", "node_id": str(seed_node.id)}
+    first = (await client.post("/api/sessions/start", json=body, headers=auth_headers)).json()
+    stale = datetime.now(timezone.utc) - timedelta(minutes=4)
+    await db_session.execute(
+        update(Session).where(Session.id == first["session_id"]).values(last_seen_at=stale)
+    )
+    await db_session.execute(update(RelayOutbox).values(status="delivered"))
+    await db_session.commit()
+
+    second = await client.post("/api/sessions/start", json=body, headers=auth_headers)
+    assert second.json()["session_id"] == first["session_id"]
+
+    db_session.expire_all()
+    last_seen = await db_session.scalar(select(Session.last_seen_at).where(Session.id == first["session_id"]))
+    assert last_seen > stale + timedelta(minutes=3)
+    result = await db_session.execute(
+        select(RelayOutbox.attempts, RelayOutbox.payload)
+        .where(RelayOutbox.action == "register", RelayOutbox.status == "pending")
+    )
+    (attempts, payload), = result.all()
+    assert attempts == 0
+    assert payload["game_ports"] == ["27015-27050"]
+
+    # Already queued: a third start adds nothing.
+    await client.post("/api/sessions/start", json=body, headers=auth_headers)
+    pending = await db_session.execute(
+        select(func.count()).select_from(RelayOutbox).where(RelayOutbox.status == "pending")
+    )
+    assert pending.scalar_one() == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_stops_release_the_slot_once(client, auth_headers, seed_games, seed_node, monkeypatch):
+    node_id = seed_node.id
+    start = await client.post(
+        "/api/sessions/start", json={"game_slug": "cs2", "node_id": str(node_id)}, headers=auth_headers,
+    )
+    session_id = start.json()["session_id"]
+    await adjust({node_id: 1})  # another user's session on the node
+
+    async def slow_enqueue(*args, **kwargs):
+        # Both stops are past their lookup before either commits.
+        await asyncio.sleep(0.2)
+        return await enqueue_unregister(*args, **kwargs)
+
+    monkeypatch.setattr("app.services.session_service.enqueue_unregister", slow_enqueue)
+
+    first, second = await asyncio.gather(
+        client.post(f"/api/sessions/{session_id}/stop", headers=auth_headers),
+        client.post(f"/api/sessions/{session_id}/stop", headers=auth_headers),
+    )
+    assert sorted([first.status_code, second.status_code]) == [200, 400]
+    assert await get_node_counts([node_id]) == {node_id: 1}
@@ -13,6 +13,7 @@ pub const FLAG_MULTIPATH_DUP: u8 = 0x01;
 pub const FLAG_KEEPALIVE: u8 = 0x02;
 pub const FLAG_CONTROL: u8 = 0x04;
 pub const FLAG_COMPRESSED: u8 = 0x08;
+pub const FLAG_TICKET: u8 = 0x10;
 
 #[derive(Debug, Clone)]
 pub struct PlgPacket {
@@ -57,6 +58,18 @@ impl PlgPacket {
         }
     }
 
+    /// Create a ticket packet (signed session ticket from the API, sent on
+    /// first contact so the relay can admit the session itself)
+    pub fn ticket(session_id: u32, ticket: Vec<u8>) -> Self {
+        Self {
+            session_id,
+            seq_number: 0,
+            flags: FLAG_TICKET,
+            path_id: 0,
+            payload: ticket,
+        }
+    }
+
     /// Set multipath duplication flag and path_id
     pub fn with_multipath(mut self, path_id: u8) -> Self {
         self.flags |= FLAG_MULTIPATH_DUP;
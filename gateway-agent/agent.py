@@ -5,14 +5,16 @@ reports metrics to Prometheus, provides health-check endpoint.
 """
 
 import asyncio
+import ipaddress
 import json
+import os
 import subprocess
 import time
+import urllib.request
 from pathlib import Path
 
 # TODO: Phase 2 - full implementation
 # - HTTP API on :8443 for session management
-# - Periodic ping to game server IPs
 # - Prometheus metrics export
 # - Health-check endpoint
 
@@ -45,6 +47,94 @@ async def ping_host(host: str, count: int = 3) -> dict:
         return {"host": host, "avg_ms": -1, "loss_pct": 100.0}
 
 
+def _api_call(method: str, url: str, api_key: str, body: dict | None = None) -> dict:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method, headers={
+        "X-API-Key": api_key,
+        "Content-Type": "application/json",
+    })
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+def probe_host(cidr: str) -> str:
+    """First usable address of a game CIDR (game servers rarely sit on .0)."""
+    net = ipaddress.ip_network(cidr, strict=False)
+    return str(net.network_address + 1) if net.num_addresses > 1 else str(net.network_address)
+
+
+async def report_game_rtt(api_url: str, api_key: str, node_id: str) -> int:
+    """Measure RTT to every game CIDR the central API asks for and report it."""
+    targets = await asyncio.to_thread(
+        _api_call, "GET", f"{api_url}/api/nodes/rtt-targets", api_key,
+    )
+    cidrs = targets["cidrs"]
+    results = await asyncio.gather(*(ping_host(probe_host(c)) for c in cidrs))
+    samples = [
+        {"cidr": cidr, "rtt_ms": r["avg_ms"], "loss_pct": r["loss_pct"]}
+        for cidr, r in zip(cidrs, results)
+        if r["avg_ms"] >= 0
+    ]
+    resp = await asyncio.to_thread(
+        _api_call, "PUT", f"{api_url}/api/nodes/{node_id}/game-rtt", api_key, {"samples": samples},
+    )
+    return resp["accepted"]
+
+
+async def rtt_report_loop(interval_sec: float = 30) -> None:
+    api_url = os.environ["CENTRAL_API_URL"].rstrip("/")
+    api_key = os.environ["RELAY_API_KEY"]
+    node_id = os.environ["NODE_ID"]
+    while True:
+        started = time.monotonic()
+        try:
+            accepted = await report_game_rtt(api_url, api_key, node_id)
+            print(f"reported RTT for {accepted} game CIDRs")
+        except Exception as e:
+            print(f"RTT report failed: {e}")
+        await asyncio.sleep(max(0.0, interval_sec - (time.monotonic() - started)))
+
+
+async def report_session_traffic(api_url: str, relay_url: str, api_key: str, node_id: str) -> int:
+    """Forward the local relay's per-session counters to the central API in one batch."""
+    stats = await asyncio.to_thread(_api_call, "GET", f"{relay_url}/stats/sessions", api_key)
+    samples = [
+        {
+            "session_token": s["session_token"],
+            "bytes_sent": s["bytes_in"],
+            "bytes_received": s["bytes_out"],
+        }
+        for s in stats["sessions"]
+    ]
+    if not samples:
+        return 0
+    resp = await asyncio.to_thread(
+        _api_call, "POST", f"{api_url}/api/nodes/{node_id}/session-traffic", api_key, {"samples": samples},
+    )
+    return resp["updated"]
+
+
+async def traffic_report_loop(interval_sec: float = 10) -> None:
+    api_url = os.environ["CENTRAL_API_URL"].rstrip("/")
+    relay_url = os.environ.get("RELAY_API_URL", "http://127.0.0.1:8443").rstrip("/")
+    api_key = os.environ["RELAY_API_KEY"]
+    node_id = os.environ["NODE_ID"]
+    while True:
+        started = time.monotonic()
+        try:
+            await report_session_traffic(api_url, relay_url, api_key, node_id)
+        except Exception as e:
+            print(f"traffic report failed: {e}")
+        await asyncio.sleep(max(0.0, interval_sec - (time.monotonic() - started)))
+
+
+async def main() -> None:
+    await asyncio.gather(rtt_report_loop(), traffic_report_loop())
+
+
 if __name__ == "__main__":
     print("PLGames Gateway Agent v0.1.0")
-    print("TODO: Full implementation in Phase 2")
+    if os.environ.get("CENTRAL_API_URL") and os.environ.get("NODE_ID"):
+        asyncio.run(main())
+    else:
+        print("TODO: Full implementation in Phase 2")
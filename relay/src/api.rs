@@ -45,6 +45,26 @@ pub struct HealthResponse {
     pub uptime_secs: u64,
 }
 
+#[derive(Serialize)]
+pub struct SessionListResponse {
+    pub active_sessions: usize,
+    pub session_tokens: Vec<u32>,
+}
+
+#[derive(Serialize)]
+pub struct SessionTraffic {
+    pub session_token: u32,
+    pub bytes_in: u64,
+    pub bytes_out: u64,
+    pub packets_in: u64,
+    pub packets_out: u64,
+}
+
+#[derive(Serialize)]
+pub struct SessionTrafficResponse {
+    pub sessions: Vec<SessionTraffic>,
+}
+
 #[derive(Serialize)]
 pub struct ErrorResponse {
     pub error: String,
@@ -53,8 +73,9 @@ pub struct ErrorResponse {
 /// Build the Axum router for the management API.
 pub fn build_router(state: Arc<ApiState>) -> Router {
     let protected = Router::new()
-        .route("/sessions", post(register_session))
+        .route("/sessions", post(register_session).get(list_sessions))
         .route("/sessions/{token}", delete(unregister_session))
+        .route("/stats/sessions", get(session_traffic))
         .layer(middleware::from_fn_with_state(
             state.clone(),
             api_key_middleware,
@@ -113,14 +134,31 @@ async fn register_session(
         .filter_map(|p| p.parse().ok())
         .collect();
 
-    // Use 0.0.0.0:0 as placeholder client_addr — real addr comes from first UDP packet.
-    let client_addr = SocketAddr::from(([0, 0, 0, 0], 0));
+    // A session the relay already holds (a retried outbox delivery, or one
+    // the client reached first with a ticket) is updated in place: its
+    // forward socket and learned client address stay as they are.
+    if let Some(local_port) =
+        state
+            .session_cache
+            .update_game_lists(req.session_token, &req.game_server_ips, &game_ports)
+    {
+        return (
+            StatusCode::OK,
+            Json(RegisterResponse {
+                status: "ok".to_string(),
+                session_token: req.session_token,
+                local_port,
+            }),
+        )
+            .into_response();
+    }
 
+    // Use 0.0.0.0:0 as placeholder client_addr — real addr comes from first UDP packet.
     let local_port = state
         .session_cache
         .register(
             req.session_token,
-            client_addr,
+            SocketAddr::from(([0, 0, 0, 0], 0)),
             req.game_server_ips,
             game_ports,
         )
@@ -158,11 +196,35 @@ async fn register_session(
     }
 }
 
+async fn list_sessions(State(state): State<Arc<ApiState>>) -> Json<SessionListResponse> {
+    let session_tokens = state.session_cache.tokens();
+    Json(SessionListResponse {
+        active_sessions: session_tokens.len(),
+        session_tokens,
+    })
+}
+
+async fn session_traffic(State(state): State<Arc<ApiState>>) -> Json<SessionTrafficResponse> {
+    let sessions = state
+        .session_cache
+        .traffic()
+        .into_iter()
+        .map(|(session_token, bytes_in, bytes_out, packets_in, packets_out)| SessionTraffic {
+            session_token,
+            bytes_in,
+            bytes_out,
+            packets_in,
+            packets_out,
+        })
+        .collect();
+    Json(SessionTrafficResponse { sessions })
+}
+
 async fn unregister_session(
     State(state): State<Arc<ApiState>>,
     Path(token): Path<u32>,
 ) -> impl IntoResponse {
-    state.session_cache.unregister(token);
+    state.session_cache.revoke(token);
     info!(token, "session unregistered via API");
     (
         StatusCode::OK,
@@ -177,3 +239,138 @@ async fn health(State(state): State<Arc<ApiState>>) -> Json<HealthResponse> {
         uptime_secs: state.start_time.elapsed().as_secs(),
     })
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::time::Duration;
+
+    use axum::body::Body;
+    use axum::http::Request;
+    use http_body_util::BodyExt;
+    use serde_json::{json, Value};
+    use tower::ServiceExt;
+
+    use crate::metrics::Metrics;
+
+    const API_KEY: &str = "test-key";
+
+    async fn test_router() -> (Router, Arc<SessionCache>) {
+        let session_cache = Arc::new(SessionCache::new(
+            10,
+            Duration::from_secs(300),
+            Metrics::new(),
+        ));
+        let main_socket = Arc::new(tokio::net::UdpSocket::bind("127.0.0.1:0").await.unwrap());
+        let state = Arc::new(ApiState {
+            session_cache: session_cache.clone(),
+            api_key: API_KEY.to_string(),
+            main_socket,
+            start_time: Instant::now(),
+        });
+        (build_router(state), session_cache)
+    }
+
+    async fn call(
+        router: &Router,
+        method: &str,
+        uri: &str,
+        body: Option<Value>,
+    ) -> (StatusCode, Value) {
+        let body = match body {
+            Some(body) => Body::from(body.to_string()),
+            None => Body::empty(),
+        };
+        let request = Request::builder()
+            .method(method)
+            .uri(uri)
+            .header("x-api-key", API_KEY)
+            .header("content-type", "application/json")
+            .body(body)
+            .unwrap();
+        let response = router.clone().oneshot(request).await.unwrap();
+        let status = response.status();
+        let bytes = response.into_body().collect().await.unwrap().to_bytes();
+        (
+            status,
+            serde_json::from_slice(&bytes).unwrap_or(Value::Null),
+        )
+    }
+
+    #[tokio::test]
+    async fn test_register_again_updates_lists_in_place() {
+        let (router, cache) = test_router().await;
+        let (status, first) = call(
+            &router,
+            "POST",
+            "/sessions",
+            Some(json!({"session_token": 7, "game_server_ips": ["10.0.0.1"], "game_ports": ["27015"]})),
+        )
+        .await;
+        assert_eq!(status, StatusCode::OK);
+
+        let (status, second) = call(
+            &router,
+            "POST",
+            "/sessions",
+            Some(json!({"session_token": 7, "game_server_ips": ["10.0.0.2"], "game_ports": ["3478"]})),
+        )
+        .await;
+        assert_eq!(status, StatusCode::OK);
+        // Same forward socket: the client keeps talking to the same relay port.
+        assert_eq!(second["local_port"], first["local_port"]);
+        let session = cache.get(7).unwrap();
+        assert_eq!(session.game_server_ips, vec!["10.0.0.2".to_string()]);
+        assert_eq!(session.game_ports, vec![3478]);
+        drop(session);
+        assert_eq!(cache.active_count(), 1);
+    }
+
+    async fn listed_tokens(router: &Router) -> Vec<u64> {
+        let (status, body) = call(router, "GET", "/sessions", None).await;
+        assert_eq!(status, StatusCode::OK);
+        let mut tokens: Vec<u64> = body["session_tokens"]
+            .as_array()
+            .unwrap()
+            .iter()
+            .map(|token| token.as_u64().unwrap())
+            .collect();
+        tokens.sort_unstable();
+        assert_eq!(body["active_sessions"], tokens.len());
+        tokens
+    }
+
+    #[tokio::test]
+    async fn test_list_sessions_follows_register_and_unregister() {
+        let (router, _) = test_router().await;
+        assert!(listed_tokens(&router).await.is_empty());
+
+        for token in [5, 3] {
+            let (status, _) = call(
+                &router,
+                "POST",
+                "/sessions",
+                Some(json!({"session_token": token, "game_server_ips": [], "game_ports": []})),
+            )
+            .await;
+            assert_eq!(status, StatusCode::OK);
+        }
+        assert_eq!(listed_tokens(&router).await, vec![3, 5]);
+
+        let (status, _) = call(&router, "DELETE", "/sessions/5", None).await;
+        assert_eq!(status, StatusCode::OK);
+        assert_eq!(listed_tokens(&router).await, vec![3]);
+    }
+
+    #[tokio::test]
+    async fn test_list_sessions_requires_api_key() {
+        let (router, _) = test_router().await;
+        let request = Request::builder()
+            .uri("/sessions")
+            .header("x-api-key", "wrong-key")
+            .body(Body::empty())
+            .unwrap();
+        let response = router.oneshot(request).await.unwrap();
+        assert_eq!(response.status(), StatusCode::UNAUTHORIZED);
+    }
+}
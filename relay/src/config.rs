@@ -9,6 +9,10 @@ pub struct Config {
     pub metrics_port: u16,
     pub max_sessions: usize,
     pub session_timeout: Duration,
+    /// Shared key for signed session tickets; empty disables them.
+    pub ticket_key: String,
+    /// This relay's node id in the central API; tickets for other nodes are refused.
+    pub node_id: String,
 }
 
 impl Config {
@@ -34,6 +38,8 @@ impl Config {
             .ok()
             .and_then(|v| v.parse().ok())
             .unwrap_or(300);
+        let ticket_key = env::var("RELAY_TICKET_KEY").unwrap_or_default();
+        let node_id = env::var("RELAY_NODE_ID").unwrap_or_default();
 
         Self {
             api_key,
@@ -42,6 +48,8 @@ impl Config {
             metrics_port,
             max_sessions,
             session_timeout: Duration::from_secs(session_timeout_secs),
+            ticket_key,
+            node_id,
         }
     }
 }
@@ -58,6 +66,8 @@ mod tests {
         env::remove_var("RELAY_METRICS_PORT");
         env::remove_var("RELAY_MAX_SESSIONS");
         env::remove_var("RELAY_SESSION_TIMEOUT");
+        env::remove_var("RELAY_TICKET_KEY");
+        env::remove_var("RELAY_NODE_ID");
 
         let cfg = Config::from_env();
         assert_eq!(cfg.api_key, "test-key-123");
@@ -66,6 +76,8 @@ mod tests {
         assert_eq!(cfg.metrics_port, 9090);
         assert_eq!(cfg.max_sessions, 1000);
         assert_eq!(cfg.session_timeout, Duration::from_secs(300));
+        assert_eq!(cfg.ticket_key, "");
+        assert_eq!(cfg.node_id, "");
     }
 
     #[test]
@@ -76,6 +88,8 @@ mod tests {
         env::set_var("RELAY_METRICS_PORT", "9091");
         env::set_var("RELAY_MAX_SESSIONS", "500");
         env::set_var("RELAY_SESSION_TIMEOUT", "600");
+        env::set_var("RELAY_TICKET_KEY", "ticket-key");
+        env::set_var("RELAY_NODE_ID", "6f1c2a3b-4d5e-4f60-8a7b-9c0d1e2f3a4b");
 
         let cfg = Config::from_env();
         assert_eq!(cfg.relay_port, 9443);
@@ -83,5 +97,7 @@ mod tests {
         assert_eq!(cfg.metrics_port, 9091);
         assert_eq!(cfg.max_sessions, 500);
         assert_eq!(cfg.session_timeout, Duration::from_secs(600));
+        assert_eq!(cfg.ticket_key, "ticket-key");
+        assert_eq!(cfg.node_id, "6f1c2a3b-4d5e-4f60-8a7b-9c0d1e2f3a4b");
     }
 }
@@ -2,19 +2,22 @@ use std::net::{IpAddr, SocketAddr};
 use std::sync::Arc;
 
 use tokio::net::UdpSocket;
-use tracing::{debug, trace, warn};
+use tracing::{debug, info, trace, warn};
 
 use crate::metrics::Metrics;
-use crate::protocol::{PlgPacket, FLAG_CONTROL, FLAG_KEEPALIVE, HEADER_SIZE};
+use crate::protocol::{PlgPacket, HEADER_SIZE};
 use crate::session::SessionCache;
+use crate::ticket::{unix_now, TicketVerifier};
 
 /// Main client listener loop.
 /// Receives PLG packets on the main UDP socket (:443), validates sessions,
 /// and forwards payloads to game servers via per-session sockets.
+/// With a ticket verifier, unknown sessions are admitted from ticket packets.
 pub async fn client_listener(
     main_socket: Arc<UdpSocket>,
     session_cache: Arc<SessionCache>,
     metrics: Metrics,
+    tickets: Option<Arc<TicketVerifier>>,
 ) {
     let mut buf = [0u8; 65535];
 
@@ -40,6 +43,28 @@ pub async fn client_listener(
 
         let token = packet.session_id;
 
+        // First contact with a signed ticket: admit the session locally.
+        if packet.is_ticket() && session_cache.get(token).is_none() {
+            match &tickets {
+                Some(verifier) => {
+                    admit_ticket(
+                        &packet,
+                        client_addr,
+                        verifier,
+                        &main_socket,
+                        &session_cache,
+                        &metrics,
+                    )
+                    .await
+                }
+                None => {
+                    metrics.invalid_sessions.inc();
+                    trace!(token, %client_addr, "dropped: tickets not enabled");
+                }
+            }
+            continue;
+        }
+
         // Look up session.
         let mut session = match session_cache.get_mut(token) {
             Some(s) => s,
@@ -59,18 +84,22 @@ pub async fn client_listener(
         session.bytes_in += len as u64;
 
         // Handle keepalive — no forwarding needed.
-        if packet.flags & FLAG_KEEPALIVE != 0 {
+        if packet.is_keepalive() {
             metrics.keepalives.inc();
             trace!(token, "keepalive received");
             continue;
         }
 
+        // Repeated ticket for an admitted session — nothing to forward.
+        if packet.is_ticket() {
+            continue;
+        }
+
         // Handle control packet — set forward target.
-        if packet.flags & FLAG_CONTROL != 0 {
+        if packet.is_control() {
             if let Some(target) = parse_control_payload(&packet.payload) {
                 // Validate target is in allowed game server IPs.
-                let ip_str = target.ip().to_string();
-                if session.game_server_ips.contains(&ip_str) {
+                if session.allows_ip(target.ip()) {
                     session.forward_target = Some(target);
                     debug!(token, %target, "forward target updated via control packet");
                 } else {
@@ -113,6 +142,55 @@ pub async fn client_listener(
     }
 }
 
+/// Register a session from a ticket packet, as `POST /sessions` would have.
+/// The ticket must verify, be unexpired and name this relay's node and the
+/// packet's session token, which the API must not have recently unregistered.
+async fn admit_ticket(
+    packet: &PlgPacket,
+    client_addr: SocketAddr,
+    verifier: &TicketVerifier,
+    main_socket: &Arc<UdpSocket>,
+    session_cache: &Arc<SessionCache>,
+    metrics: &Metrics,
+) {
+    let token = packet.session_id;
+    if session_cache.is_revoked(token) {
+        metrics.tickets_rejected.inc();
+        warn!(token, %client_addr, "dropped: ticket for an unregistered session");
+        return;
+    }
+    let ticket = match verifier.verify(&packet.payload, unix_now()) {
+        Some(t) if t.session_token == token => t,
+        _ => {
+            metrics.tickets_rejected.inc();
+            warn!(token, %client_addr, "dropped: invalid or expired session ticket");
+            return;
+        }
+    };
+
+    let registered = session_cache
+        .register(
+            token,
+            client_addr,
+            ticket.game_server_ips(),
+            ticket.game_ports(),
+        )
+        .await;
+    if registered.is_none() {
+        metrics.tickets_rejected.inc();
+        return;
+    }
+    if let Some(session) = session_cache.get(token) {
+        spawn_response_listener(
+            session.forward_socket.clone(),
+            main_socket.clone(),
+            session_cache.clone(),
+        );
+    }
+    metrics.tickets_admitted.inc();
+    info!(token, %client_addr, "session admitted from ticket");
+}
+
 /// Spawn a response listener for a per-session forward socket.
 /// Reads responses from game server and wraps them in PLG headers,
 /// then sends back to the client via the main socket.
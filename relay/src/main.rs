@@ -3,7 +3,7 @@ use std::time::Instant;
 
 use socket2::{Domain, Protocol, Socket, Type};
 use tokio::net::UdpSocket;
-use tracing::info;
+use tracing::{info, warn};
 
 mod api;
 mod config;
@@ -11,10 +11,12 @@ mod forwarder;
 mod metrics;
 mod protocol;
 mod session;
+mod ticket;
 
 use config::Config;
 use metrics::Metrics;
 use session::SessionCache;
+use ticket::TicketVerifier;
 
 const SOCKET_BUF_SIZE: usize = 4 * 1024 * 1024; // 4 MB
 
@@ -32,12 +34,17 @@ async fn main() {
         .init();
 
     info!("PLG Relay Server v0.1.0 starting...");
+    let tickets = TicketVerifier::new(&config.ticket_key, &config.node_id).map(Arc::new);
+    if tickets.is_none() && !config.ticket_key.is_empty() {
+        warn!("RELAY_NODE_ID is missing or not a UUID; session tickets disabled");
+    }
     info!(
         relay_port = config.relay_port,
         api_port = config.api_port,
         metrics_port = config.metrics_port,
         max_sessions = config.max_sessions,
         session_timeout_secs = config.session_timeout.as_secs(),
+        tickets_enabled = tickets.is_some(),
     );
 
     // Init metrics.
@@ -60,7 +67,7 @@ async fn main() {
     let listener_cache = session_cache.clone();
     let listener_metrics = metrics.clone();
     tokio::spawn(async move {
-        forwarder::client_listener(listener_socket, listener_cache, listener_metrics).await;
+        forwarder::client_listener(listener_socket, listener_cache, listener_metrics, tickets).await;
     });
 
     // Spawn stale session cleanup task (every 60s).
@@ -85,7 +92,7 @@ async fn main() {
             }),
         );
 
-        let listener = tokio::net::TcpListener::bind(format!("0.0.0.0:{}", metrics_port))
+        let listener = tokio::net::TcpListener::bind(format!("0.0.0.0:{metrics_port}"))
             .await
             .expect("failed to bind metrics port");
         info!(port = metrics_port, "metrics server started");
@@ -124,10 +131,10 @@ fn bind_udp_socket(port: u16) -> UdpSocket {
     socket.set_reuse_address(true).ok();
     socket.set_nonblocking(true).expect("failed to set nonblocking");
 
-    let addr: std::net::SocketAddr = format!("0.0.0.0:{}", port).parse().unwrap();
+    let addr: std::net::SocketAddr = format!("0.0.0.0:{port}").parse().unwrap();
     socket
         .bind(&addr.into())
-        .unwrap_or_else(|e| panic!("failed to bind UDP :{} — {}", port, e));
+        .unwrap_or_else(|e| panic!("failed to bind UDP :{port} — {e}"));
 
     let std_socket: std::net::UdpSocket = socket.into();
     UdpSocket::from_std(std_socket).expect("failed to convert to tokio UdpSocket")
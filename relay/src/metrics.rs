@@ -12,6 +12,8 @@ pub struct Metrics {
     pub bytes_forwarded: IntCounter,
     pub invalid_sessions: IntCounter,
     pub keepalives: IntCounter,
+    pub tickets_admitted: IntCounter,
+    pub tickets_rejected: IntCounter,
 }
 
 impl Metrics {
@@ -35,6 +37,12 @@ impl Metrics {
                 .unwrap();
         let keepalives =
             IntCounter::new("plg_keepalives_total", "Total keepalive packets received").unwrap();
+        let tickets_admitted =
+            IntCounter::new("plg_tickets_admitted_total", "Sessions admitted from signed tickets")
+                .unwrap();
+        let tickets_rejected =
+            IntCounter::new("plg_tickets_rejected_total", "Invalid or expired session tickets")
+                .unwrap();
 
         registry.register(Box::new(active_sessions.clone())).unwrap();
         registry.register(Box::new(packets_received.clone())).unwrap();
@@ -43,6 +51,8 @@ impl Metrics {
         registry.register(Box::new(bytes_forwarded.clone())).unwrap();
         registry.register(Box::new(invalid_sessions.clone())).unwrap();
         registry.register(Box::new(keepalives.clone())).unwrap();
+        registry.register(Box::new(tickets_admitted.clone())).unwrap();
+        registry.register(Box::new(tickets_rejected.clone())).unwrap();
 
         Self {
             registry,
@@ -53,6 +63,8 @@ impl Metrics {
             bytes_forwarded,
             invalid_sessions,
             keepalives,
+            tickets_admitted,
+            tickets_rejected,
         }
     }
 
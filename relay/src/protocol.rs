@@ -3,7 +3,8 @@
 /// Offset  Size   Field
 /// 0       4      Session ID
 /// 4       4      Sequence Number
-/// 8       1      Flags (0x01=multipath_dup, 0x02=keepalive, 0x04=control, 0x08=compressed)
+/// 8       1      Flags (0x01=multipath_dup, 0x02=keepalive, 0x04=control, 0x08=compressed,
+///                       0x10=ticket: payload is a signed session ticket, see ticket.rs)
 /// 9       1      Path ID (0=primary, 1=backup)
 /// 10      N      Payload (original game UDP packet)
 ///
@@ -14,7 +15,9 @@ pub const HEADER_SIZE: usize = 10;
 pub const FLAG_MULTIPATH_DUP: u8 = 0x01;
 pub const FLAG_KEEPALIVE: u8 = 0x02;
 pub const FLAG_CONTROL: u8 = 0x04;
+#[allow(dead_code)] // Part of the wire format; the relay forwards compressed payloads as-is.
 pub const FLAG_COMPRESSED: u8 = 0x08;
+pub const FLAG_TICKET: u8 = 0x10;
 
 #[derive(Debug, Clone)]
 pub struct PlgPacket {
@@ -60,6 +63,7 @@ impl PlgPacket {
         self.flags & FLAG_KEEPALIVE != 0
     }
 
+    #[allow(dead_code)] // Both paths are forwarded alike; the client de-duplicates.
     pub fn is_multipath_dup(&self) -> bool {
         self.flags & FLAG_MULTIPATH_DUP != 0
     }
@@ -67,6 +71,10 @@ impl PlgPacket {
     pub fn is_control(&self) -> bool {
         self.flags & FLAG_CONTROL != 0
     }
+
+    pub fn is_ticket(&self) -> bool {
+        self.flags & FLAG_TICKET != 0
+    }
 }
 
 #[cfg(test)]
@@ -106,6 +114,7 @@ mod tests {
         assert!(pkt.is_keepalive());
         assert!(pkt.is_multipath_dup());
         assert!(!pkt.is_control());
+        assert!(!pkt.is_ticket());
     }
 
     #[test]
@@ -1,4 +1,4 @@
-use std::net::SocketAddr;
+use std::net::{IpAddr, SocketAddr};
 use std::sync::Arc;
 use std::time::{Duration, Instant};
 
@@ -8,6 +8,10 @@ use tracing::{info, warn};
 
 use crate::metrics::Metrics;
 
+/// How long tickets for a token the API unregistered are refused. Longer than
+/// any ticket the API issues (`relay_ticket_ttl_seconds`, 120 by default).
+pub const REVOKED_TOKEN_TTL: Duration = Duration::from_secs(600);
+
 #[derive(Debug)]
 pub struct SessionInfo {
     pub session_token: u32,
@@ -25,11 +29,21 @@ pub struct SessionInfo {
     pub bytes_out: u64,
 }
 
+impl SessionInfo {
+    /// Whether `ip` is one of the session's game servers. Entries are plain
+    /// IPs or CIDRs (as profiles and tickets carry them).
+    pub fn allows_ip(&self, ip: IpAddr) -> bool {
+        self.game_server_ips.iter().any(|entry| ip_in_entry(ip, entry))
+    }
+}
+
 pub struct SessionCache {
     /// session_token → SessionInfo
     sessions: DashMap<u32, SessionInfo>,
     /// local_port (of forward_socket) → session_token (reverse lookup for response routing)
     port_to_token: DashMap<u16, u32>,
+    /// session_token → when the API unregistered it (see `revoke`)
+    revoked: DashMap<u32, Instant>,
     pub max_sessions: usize,
     pub session_timeout: Duration,
     pub metrics: Metrics,
@@ -40,6 +54,7 @@ impl SessionCache {
         Self {
             sessions: DashMap::new(),
             port_to_token: DashMap::new(),
+            revoked: DashMap::new(),
             max_sessions,
             session_timeout,
             metrics,
@@ -50,6 +65,19 @@ impl SessionCache {
         self.sessions.len()
     }
 
+    /// Cumulative (token, bytes_in, bytes_out, packets_in, packets_out) per session.
+    pub fn traffic(&self) -> Vec<(u32, u64, u64, u64, u64)> {
+        self.sessions
+            .iter()
+            .map(|e| (e.session_token, e.bytes_in, e.bytes_out, e.packets_in, e.packets_out))
+            .collect()
+    }
+
+    /// Tokens of all registered sessions (for reconciliation with the central API).
+    pub fn tokens(&self) -> Vec<u32> {
+        self.sessions.iter().map(|entry| *entry.key()).collect()
+    }
+
     /// Register a new session. Returns the local port of the forward socket, or None on failure.
     pub async fn register(
         &self,
@@ -65,6 +93,7 @@ impl SessionCache {
 
         // Remove existing session with same token if any.
         self.unregister(session_token);
+        self.revoked.remove(&session_token);
 
         // Bind ephemeral UDP socket for forwarding.
         let socket = match UdpSocket::bind("0.0.0.0:0").await {
@@ -110,6 +139,30 @@ impl SessionCache {
         Some(local_port)
     }
 
+    /// Replace the allowed game servers of a live session in place, keeping
+    /// its forward socket and client address. A forward target that was the
+    /// old default follows the new lists; one set by a control packet stays.
+    /// Returns the forward socket's local port, or None if the session is unknown.
+    pub fn update_game_lists(
+        &self,
+        session_token: u32,
+        game_server_ips: &[String],
+        game_ports: &[u16],
+    ) -> Option<u16> {
+        let mut info = self.sessions.get_mut(&session_token)?;
+        let local_port = info.forward_socket.local_addr().ok()?.port();
+        if info.game_server_ips != game_server_ips || info.game_ports != game_ports {
+            let old_default = default_forward_target(&info.game_server_ips, &info.game_ports);
+            if info.forward_target == old_default {
+                info.forward_target = default_forward_target(game_server_ips, game_ports);
+            }
+            info.game_server_ips = game_server_ips.to_vec();
+            info.game_ports = game_ports.to_vec();
+            info!(token = session_token, "session game servers updated");
+        }
+        Some(local_port)
+    }
+
     /// Unregister and drop a session. The forward socket is dropped, causing
     /// the response listener task to terminate.
     pub fn unregister(&self, session_token: u32) {
@@ -122,6 +175,21 @@ impl SessionCache {
         }
     }
 
+    /// Unregister a session the API ended (stop, reap, drain) and refuse
+    /// tickets for its token for `REVOKED_TOKEN_TTL`, so a client holding an
+    /// unexpired ticket cannot re-admit it. A later registration clears this.
+    pub fn revoke(&self, session_token: u32) {
+        self.unregister(session_token);
+        self.revoked.insert(session_token, Instant::now());
+    }
+
+    /// Whether tickets for `session_token` are refused (see `revoke`).
+    pub fn is_revoked(&self, session_token: u32) -> bool {
+        self.revoked
+            .get(&session_token)
+            .is_some_and(|at| at.elapsed() < REVOKED_TOKEN_TTL)
+    }
+
     /// Get a reference to session info by token.
     pub fn get(&self, session_token: u32) -> Option<dashmap::mapref::one::Ref<'_, u32, SessionInfo>> {
         self.sessions.get(&session_token)
@@ -141,6 +209,7 @@ impl SessionCache {
     }
 
     /// Update the client address for a session (e.g., after NAT rebinding).
+    #[allow(dead_code)] // The client listener updates it under its own lock.
     pub fn update_client_addr(&self, session_token: u32, new_addr: SocketAddr) {
         if let Some(mut info) = self.sessions.get_mut(&session_token) {
             info.client_addr = new_addr;
@@ -148,6 +217,7 @@ impl SessionCache {
     }
 
     /// Set the forward target for a session (called from control packets).
+    #[allow(dead_code)] // The client listener sets it under its own lock.
     pub fn set_forward_target(&self, session_token: u32, target: SocketAddr) {
         if let Some(mut info) = self.sessions.get_mut(&session_token) {
             info.forward_target = Some(target);
@@ -171,6 +241,7 @@ impl SessionCache {
             self.unregister(token);
             removed += 1;
         }
+        self.revoked.retain(|_, at| now.duration_since(*at) < REVOKED_TOKEN_TTL);
 
         if removed > 0 {
             info!(removed, remaining = self.sessions.len(), "cleaned up stale sessions");
@@ -188,10 +259,36 @@ fn default_forward_target(ips: &[String], ports: &[u16]) -> Option<SocketAddr> {
     Some(SocketAddr::new(addr, *port))
 }
 
+fn ip_in_entry(ip: IpAddr, entry: &str) -> bool {
+    let (net, prefix) = match entry.split_once('/') {
+        Some((net, prefix)) => match prefix.parse::<u32>() {
+            Ok(prefix) => (net, Some(prefix)),
+            Err(_) => return false,
+        },
+        None => (entry, None),
+    };
+    let Ok(net) = net.parse::<IpAddr>() else {
+        return false;
+    };
+    match (net, ip) {
+        (IpAddr::V4(net), IpAddr::V4(ip)) => {
+            let bits = prefix.unwrap_or(32).min(32);
+            let mask = u32::MAX.checked_shl(32 - bits).unwrap_or(0);
+            u32::from(net) & mask == u32::from(ip) & mask
+        }
+        (IpAddr::V6(net), IpAddr::V6(ip)) => {
+            let bits = prefix.unwrap_or(128).min(128);
+            let mask = u128::MAX.checked_shl(128 - bits).unwrap_or(0);
+            u128::from(net) & mask == u128::from(ip) & mask
+        }
+        _ => false,
+    }
+}
+
 #[cfg(test)]
 mod tests {
     use super::*;
-    use std::net::{IpAddr, Ipv4Addr};
+    use std::net::Ipv4Addr;
 
     fn test_metrics() -> Metrics {
         Metrics::new()
@@ -277,6 +374,29 @@ mod tests {
         assert_eq!(session.client_addr, client2);
     }
 
+    #[tokio::test]
+    async fn test_update_game_lists_keeps_socket_and_client() {
+        let cache = SessionCache::new(10, Duration::from_secs(300), test_metrics());
+        let client = SocketAddr::new(IpAddr::V4(Ipv4Addr::new(1, 2, 3, 4)), 5000);
+        let port = cache
+            .register(7, client, vec!["10.0.0.1".to_string()], vec![27015])
+            .await
+            .unwrap();
+
+        let ips = vec!["10.0.0.2".to_string(), "155.133.232.0/23".to_string()];
+        assert_eq!(cache.update_game_lists(7, &ips, &[3478]), Some(port));
+        let session = cache.get(7).unwrap();
+        assert_eq!(session.client_addr, client);
+        assert_eq!(session.game_server_ips, ips);
+        assert_eq!(
+            session.forward_target,
+            Some("10.0.0.2:3478".parse().unwrap())
+        );
+        drop(session);
+        assert_eq!(cache.token_by_port(port), Some(7));
+        assert!(cache.update_game_lists(8, &ips, &[3478]).is_none());
+    }
+
     #[tokio::test]
     async fn test_port_to_token_lookup() {
         let cache = SessionCache::new(10, Duration::from_secs(300), test_metrics());
@@ -308,4 +428,39 @@ mod tests {
         assert!(default_forward_target(&[], &[27015]).is_none());
         assert!(default_forward_target(&["10.0.0.1".to_string()], &[]).is_none());
     }
+
+    #[tokio::test]
+    async fn test_allows_ip_matches_plain_ips_and_cidrs() {
+        let cache = SessionCache::new(10, Duration::from_secs(300), test_metrics());
+        let client = SocketAddr::new(IpAddr::V4(Ipv4Addr::new(1, 2, 3, 4)), 5000);
+        let ips = vec!["10.0.0.1".to_string(), "155.133.232.0/23".to_string()];
+        cache.register(7, client, ips, vec![27015]).await.unwrap();
+
+        let session = cache.get(7).unwrap();
+        assert!(session.allows_ip("10.0.0.1".parse().unwrap()));
+        assert!(session.allows_ip("155.133.233.200".parse().unwrap()));
+        assert!(!session.allows_ip("155.133.234.1".parse().unwrap()));
+        assert!(!session.allows_ip("10.0.0.2".parse().unwrap()));
+        assert!(!ip_in_entry("10.0.0.1".parse().unwrap(), "10.0.0.1/abc"));
+        assert!(ip_in_entry("8.8.8.8".parse().unwrap(), "0.0.0.0/0"));
+    }
+
+    #[tokio::test]
+    async fn test_revoke_refuses_tickets_until_registered_again() {
+        let cache = SessionCache::new(10, Duration::from_secs(300), test_metrics());
+        let client = SocketAddr::new(IpAddr::V4(Ipv4Addr::new(1, 2, 3, 4)), 5000);
+        cache.register(9, client, vec![], vec![]).await.unwrap();
+        assert!(!cache.is_revoked(9));
+
+        cache.revoke(9);
+        assert_eq!(cache.active_count(), 0);
+        assert!(cache.is_revoked(9));
+        assert!(!cache.is_revoked(10));
+        cache.cleanup_stale();
+        assert!(cache.is_revoked(9));
+
+        // The API placing the session here again lifts it.
+        cache.register(9, client, vec![], vec![]).await.unwrap();
+        assert!(!cache.is_revoked(9));
+    }
 }
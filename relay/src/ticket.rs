@@ -0,0 +1,281 @@
+//! Signed session tickets.
+//!
+//! The central API can hand a client a ticket instead of registering the
+//! session on the relay first; the client sends it in a FLAG_TICKET packet
+//! and the relay admits the session locally. A ticket names the node the API
+//! placed the session on, and only that relay admits it. Layout (big-endian),
+//! shared with `api/app/services/relay_tickets.py` and `tests/plg_ticket.py`:
+//!
+//! Size   Field
+//! 1      Version (2)
+//! 16     Node id (UUID bytes)
+//! 4      Session token
+//! 4      Expiry (unix seconds) — a ticket is refused after it
+//! 1      CIDR count, then per CIDR: family (4|6), prefix length, 4|16 address bytes
+//! 1      Port range count, then per range: start u16, end u16
+//! 16     HMAC-SHA256(key, all of the above), truncated
+use std::net::{IpAddr, Ipv4Addr, Ipv6Addr};
+use std::time::{SystemTime, UNIX_EPOCH};
+
+use hmac::{Hmac, Mac};
+use sha2::Sha256;
+
+pub const TICKET_VERSION: u8 = 2;
+pub const MAC_SIZE: usize = 16;
+
+type HmacSha256 = Hmac<Sha256>;
+
+#[derive(Debug, Clone, PartialEq)]
+pub struct Ticket {
+    pub node_id: [u8; 16],
+    pub session_token: u32,
+    pub expires: u32,
+    pub networks: Vec<(IpAddr, u8)>,
+    pub port_ranges: Vec<(u16, u16)>,
+}
+
+impl Ticket {
+    /// Allowed game server addresses in the form `POST /sessions` takes them:
+    /// a plain IP for single-host networks, `ip/prefix` otherwise.
+    pub fn game_server_ips(&self) -> Vec<String> {
+        self.networks
+            .iter()
+            .map(|(ip, prefix)| match (ip, prefix) {
+                (IpAddr::V4(_), 32) | (IpAddr::V6(_), 128) => ip.to_string(),
+                _ => format!("{ip}/{prefix}"),
+            })
+            .collect()
+    }
+
+    /// Single ports, as `POST /sessions` reads a profile's port list: ranges
+    /// name no default forward target, so a later identical registration
+    /// from the API finds the session unchanged.
+    pub fn game_ports(&self) -> Vec<u16> {
+        self.port_ranges
+            .iter()
+            .filter(|(start, end)| start == end)
+            .map(|(start, _)| *start)
+            .collect()
+    }
+}
+
+pub struct TicketVerifier {
+    key: Vec<u8>,
+    node_id: [u8; 16],
+}
+
+impl TicketVerifier {
+    /// None when no key is configured (tickets disabled) or `node_id` is not
+    /// a UUID.
+    pub fn new(key: &str, node_id: &str) -> Option<Self> {
+        if key.is_empty() {
+            return None;
+        }
+        Some(Self {
+            key: key.as_bytes().to_vec(),
+            node_id: parse_node_id(node_id)?,
+        })
+    }
+
+    /// Decode a ticket if its MAC checks out, it names this relay's node and
+    /// it has not expired.
+    pub fn verify(&self, data: &[u8], now: u64) -> Option<Ticket> {
+        if data.len() < 27 + MAC_SIZE {
+            return None;
+        }
+        let (body, tag) = data.split_at(data.len() - MAC_SIZE);
+        let mut mac = HmacSha256::new_from_slice(&self.key).ok()?;
+        mac.update(body);
+        mac.verify_truncated_left(tag).ok()?;
+
+        let ticket = parse_body(body)?;
+        if ticket.node_id != self.node_id || u64::from(ticket.expires) <= now {
+            return None;
+        }
+        Some(ticket)
+    }
+
+    #[cfg(test)]
+    fn sign(&self, body: &[u8]) -> Vec<u8> {
+        let mut mac = HmacSha256::new_from_slice(&self.key).unwrap();
+        mac.update(body);
+        let tag = mac.finalize().into_bytes();
+        let mut ticket = body.to_vec();
+        ticket.extend_from_slice(&tag[..MAC_SIZE]);
+        ticket
+    }
+}
+
+pub fn unix_now() -> u64 {
+    SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .map(|d| d.as_secs())
+        .unwrap_or(0)
+}
+
+/// UUID bytes of a node id in its usual hyphenated (or plain hex) form.
+pub fn parse_node_id(node_id: &str) -> Option<[u8; 16]> {
+    let hex: Vec<u8> = node_id.bytes().filter(|b| *b != b'-').collect();
+    if hex.len() != 32 || !hex.iter().all(u8::is_ascii_hexdigit) {
+        return None;
+    }
+    let mut id = [0u8; 16];
+    for (byte, pair) in id.iter_mut().zip(hex.chunks(2)) {
+        *byte = u8::from_str_radix(std::str::from_utf8(pair).ok()?, 16).ok()?;
+    }
+    Some(id)
+}
+
+struct Reader<'a> {
+    rest: &'a [u8],
+}
+
+impl<'a> Reader<'a> {
+    fn take(&mut self, n: usize) -> Option<&'a [u8]> {
+        if self.rest.len() < n {
+            return None;
+        }
+        let (head, tail) = self.rest.split_at(n);
+        self.rest = tail;
+        Some(head)
+    }
+}
+
+fn parse_body(body: &[u8]) -> Option<Ticket> {
+    let mut r = Reader { rest: body };
+
+    if r.take(1)?[0] != TICKET_VERSION {
+        return None;
+    }
+    let node_id: [u8; 16] = r.take(16)?.try_into().ok()?;
+    let session_token = u32::from_be_bytes(r.take(4)?.try_into().ok()?);
+    let expires = u32::from_be_bytes(r.take(4)?.try_into().ok()?);
+
+    let cidr_count = r.take(1)?[0];
+    let mut networks = Vec::with_capacity(cidr_count as usize);
+    for _ in 0..cidr_count {
+        let head = r.take(2)?;
+        let (family, prefix) = (head[0], head[1]);
+        let ip = match family {
+            4 if prefix <= 32 => {
+                let b: [u8; 4] = r.take(4)?.try_into().ok()?;
+                IpAddr::V4(Ipv4Addr::from(b))
+            }
+            6 if prefix <= 128 => {
+                let b: [u8; 16] = r.take(16)?.try_into().ok()?;
+                IpAddr::V6(Ipv6Addr::from(b))
+            }
+            _ => return None,
+        };
+        networks.push((ip, prefix));
+    }
+
+    let range_count = r.take(1)?[0];
+    let mut port_ranges = Vec::with_capacity(range_count as usize);
+    for _ in 0..range_count {
+        let b = r.take(4)?;
+        let start = u16::from_be_bytes([b[0], b[1]]);
+        let end = u16::from_be_bytes([b[2], b[3]]);
+        port_ranges.push((start, end));
+    }
+
+    if !r.rest.is_empty() {
+        return None;
+    }
+    Some(Ticket {
+        node_id,
+        session_token,
+        expires,
+        networks,
+        port_ranges,
+    })
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    const NODE: &str = "6f1c2a3b-4d5e-4f60-8a7b-9c0d1e2f3a4b";
+    const OTHER_NODE: &str = "00000000-0000-4000-8000-000000000001";
+
+    fn body_for(node: &str, token: u32, expires: u32) -> Vec<u8> {
+        let mut b = vec![TICKET_VERSION];
+        b.extend_from_slice(&parse_node_id(node).unwrap());
+        b.extend_from_slice(&token.to_be_bytes());
+        b.extend_from_slice(&expires.to_be_bytes());
+        b.extend_from_slice(&[2, 4, 23, 155, 133, 232, 0, 4, 32, 10, 0, 0, 1]);
+        b.extend_from_slice(&[2, 0x69, 0x87, 0x69, 0xaa]); // 27015-27050
+        b.extend_from_slice(&[0x0d, 0x96, 0x0d, 0x96]); // 3478
+        b
+    }
+
+    fn body(token: u32, expires: u32) -> Vec<u8> {
+        body_for(NODE, token, expires)
+    }
+
+    #[test]
+    fn test_verify_ticket() {
+        let verifier = TicketVerifier::new("shared", NODE).unwrap();
+        let ticket = verifier
+            .verify(&verifier.sign(&body(42, 1000)), 999)
+            .unwrap();
+        assert_eq!(ticket.session_token, 42);
+        assert_eq!(
+            ticket.game_server_ips(),
+            vec!["155.133.232.0/23", "10.0.0.1"]
+        );
+        assert_eq!(ticket.port_ranges, vec![(27015, 27050), (3478, 3478)]);
+        assert_eq!(ticket.game_ports(), vec![3478]);
+    }
+
+    #[test]
+    fn test_reject_tampered_expired_and_foreign_tickets() {
+        let verifier = TicketVerifier::new("shared", NODE).unwrap();
+        let signed = verifier.sign(&body(42, 1000));
+
+        let mut tampered = signed.clone();
+        tampered[4] ^= 0x01;
+        assert!(verifier.verify(&tampered, 0).is_none());
+        assert!(verifier.verify(&signed, 1000).is_none());
+        assert!(verifier.verify(&signed[..signed.len() - 1], 0).is_none());
+
+        let other = TicketVerifier::new("other", NODE).unwrap();
+        assert!(other.verify(&signed, 0).is_none());
+        assert!(TicketVerifier::new("", NODE).is_none());
+    }
+
+    #[test]
+    fn test_reject_malformed_body() {
+        let verifier = TicketVerifier::new("shared", NODE).unwrap();
+        let mut b = body(42, 1000);
+        b.push(0); // trailing byte
+        assert!(verifier.verify(&verifier.sign(&b), 0).is_none());
+
+        let mut b = body(42, 1000);
+        b[26] = 5; // unknown address family
+        assert!(verifier.verify(&verifier.sign(&b), 0).is_none());
+    }
+
+    #[test]
+    fn test_reject_ticket_for_another_node() {
+        let verifier = TicketVerifier::new("shared", NODE).unwrap();
+        let foreign = verifier.sign(&body_for(OTHER_NODE, 42, 1000));
+        assert!(verifier.verify(&foreign, 0).is_none());
+
+        let ticket = verifier.verify(&verifier.sign(&body(42, 1000)), 0).unwrap();
+        assert_eq!(ticket.node_id, parse_node_id(NODE).unwrap());
+    }
+
+    #[test]
+    fn test_parse_node_id() {
+        let id = parse_node_id("6F1C2A3B-4D5E-4F60-8A7B-9C0D1E2F3A4B").unwrap();
+        assert_eq!(id[0], 0x6f);
+        assert_eq!(id[15], 0x4b);
+        assert_eq!(parse_node_id("6f1c2a3b4d5e4f608a7b9c0d1e2f3a4b"), Some(id));
+        assert!(parse_node_id("").is_none());
+        assert!(parse_node_id("6f1c2a3b-4d5e-4f60-8a7b-9c0d1e2f3a4").is_none());
+        assert!(parse_node_id("+f1c2a3b-4d5e-4f60-8a7b-9c0d1e2f3a4b").is_none());
+        // Without a valid node id there is nothing to check tickets against.
+        assert!(TicketVerifier::new("shared", "").is_none());
+    }
+}
@@ -13,11 +13,17 @@ Starts a mock game server (UDP echo), then runs tests against a live relay binar
   8. Auth required (no API key → 401)
   9. Unregister session
  10. Metrics endpoint
+ 11. Ticket admission (signed ticket on first contact, no registration call)
+ 12. Forged, expired and other-node tickets (dropped)
+ 13. Ticket after unregister (dropped)
 
-Usage: python3 relay/tests/e2e_test.py
+Usage: python3 relay/tests/e2e_test.py [--standin]
   Expects the relay binary already running with:
     RELAY_PORT=19443 RELAY_API_PORT=19444 RELAY_METRICS_PORT=19445
-    RELAY_API_KEY=e2e-test-key
+    RELAY_API_KEY=e2e-test-key RELAY_TICKET_KEY=e2e-ticket-key
+    RELAY_NODE_ID=6f1c2a3b-4d5e-4f60-8a7b-9c0d1e2f3a4b
+  With --standin, runs the ticket tests against a local Python stand-in relay
+  (standin_relay.py) instead.
 """
 
 import json
@@ -28,6 +34,9 @@ import threading
 import time
 import urllib.request
 
+from plg_ticket import build_ticket
+from standin_relay import StandInRelay
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
@@ -36,10 +45,14 @@ RELAY_UDP_PORT = 19443
 RELAY_API_PORT = 19444
 RELAY_METRICS_PORT = 19445
 API_KEY = "e2e-test-key"
+TICKET_KEY = "e2e-ticket-key"
+NODE_ID = "6f1c2a3b-4d5e-4f60-8a7b-9c0d1e2f3a4b"
+OTHER_NODE_ID = "00000000-0000-4000-8000-000000000001"
 MOCK_GAME_PORT = 19999
 MOCK_GAME_PORT_ALT = 19998
 
 SESSION_TOKEN = 42
+TICKET_TOKEN = 43
 TIMEOUT = 3  # seconds for socket operations
 
 # ---------------------------------------------------------------------------
@@ -48,6 +61,7 @@ TIMEOUT = 3  # seconds for socket operations
 HEADER_SIZE = 10
 FLAG_KEEPALIVE = 0x02
 FLAG_CONTROL = 0x04
+FLAG_TICKET = 0x10
 
 
 def build_plg_packet(session_id: int, seq: int, flags: int, path_id: int, payload: bytes) -> bytes:
@@ -202,10 +216,82 @@ def make_client_socket() -> socket.socket:
     return sock
 
 
+# ---------------------------------------------------------------------------
+# Ticket tests (real relay or stand-in)
+# ---------------------------------------------------------------------------
+def run_ticket_tests(runner: TestRunner, relay_port: int, mock: MockGameServer):
+    game_cidrs = ["127.0.0.1/32"]
+    game_ports = [(MOCK_GAME_PORT, MOCK_GAME_PORT)]
+
+    # -- 11. Ticket admission --
+    def test_ticket_admission():
+        mock.clear()
+        client = make_client_socket()
+        try:
+            ticket = build_ticket(TICKET_KEY, NODE_ID, TICKET_TOKEN, game_cidrs, game_ports)
+            client.sendto(build_plg_packet(TICKET_TOKEN, 0, FLAG_TICKET, 0, ticket), (RELAY_HOST, relay_port))
+            time.sleep(0.2)
+            assert len(mock.received) == 0, "ticket packet was forwarded"
+
+            test_payload = b"Admitted by ticket"
+            client.sendto(build_plg_packet(TICKET_TOKEN, 1, 0, 0, test_payload), (RELAY_HOST, relay_port))
+            assert mock.wait_for_packet(), "mock game server did not receive packet"
+            assert mock.received[0][0] == test_payload
+
+            parsed = parse_plg_packet(client.recvfrom(65535)[0])
+            assert parsed is not None, "failed to parse response PLG packet"
+            assert parsed[0] == TICKET_TOKEN and parsed[4] == test_payload
+        finally:
+            client.close()
+
+    runner.run("test_ticket_admission", test_ticket_admission)
+
+    # -- 12. Forged, expired and other-node tickets --
+    def test_ticket_rejected():
+        mock.clear()
+        client = make_client_socket()
+        try:
+            for token, ticket in (
+                (TICKET_TOKEN + 1, build_ticket("wrong-key", NODE_ID, TICKET_TOKEN + 1, game_cidrs, game_ports)),
+                (TICKET_TOKEN + 2, build_ticket(TICKET_KEY, NODE_ID, TICKET_TOKEN + 2, game_cidrs, game_ports, ttl=-1)),
+                # Valid ticket presented under another session's token.
+                (TICKET_TOKEN + 3, build_ticket(TICKET_KEY, NODE_ID, TICKET_TOKEN + 4, game_cidrs, game_ports)),
+                # Valid ticket for a session placed on another relay.
+                (TICKET_TOKEN + 5, build_ticket(TICKET_KEY, OTHER_NODE_ID, TICKET_TOKEN + 5, game_cidrs, game_ports)),
+            ):
+                client.sendto(build_plg_packet(token, 0, FLAG_TICKET, 0, ticket), (RELAY_HOST, relay_port))
+                client.sendto(build_plg_packet(token, 1, 0, 0, b"should be dropped"), (RELAY_HOST, relay_port))
+            time.sleep(0.3)
+            assert len(mock.received) == 0, "packet forwarded for a rejected ticket"
+        finally:
+            client.close()
+
+    runner.run("test_ticket_rejected", test_ticket_rejected)
+
+
+def run_standin():
+    print("PLG Relay ticket tests (stand-in relay)")
+    print("=" * 50)
+    mock = MockGameServer(MOCK_GAME_PORT)
+    relay = StandInRelay(TICKET_KEY, NODE_ID)
+    mock.start()
+    relay.start()
+    runner = TestRunner()
+    try:
+        run_ticket_tests(runner, relay.port, mock)
+    finally:
+        relay.stop()
+        mock.stop()
+    return runner.summary()
+
+
 # ---------------------------------------------------------------------------
 # Tests
 # ---------------------------------------------------------------------------
 def main():
+    if "--standin" in sys.argv[1:]:
+        sys.exit(0 if run_standin() else 1)
+
     print("PLG Relay E2E Tests")
     print("=" * 50)
 
@@ -427,6 +513,27 @@ def main():
 
         runner.run("test_metrics", test_metrics)
 
+        run_ticket_tests(runner, RELAY_UDP_PORT, mock_primary)
+        http_delete(api_url(f"/sessions/{TICKET_TOKEN}"), headers={"X-API-Key": API_KEY})
+
+        # -- 13. Ticket after unregister --
+        def test_ticket_after_unregister():
+            mock_primary.clear()
+            client = make_client_socket()
+            try:
+                # Still unexpired, but the API has ended the session here.
+                ticket = build_ticket(TICKET_KEY, NODE_ID, TICKET_TOKEN, ["127.0.0.1/32"],
+                                      [(MOCK_GAME_PORT, MOCK_GAME_PORT)])
+                client.sendto(build_plg_packet(TICKET_TOKEN, 0, FLAG_TICKET, 0, ticket), (RELAY_HOST, RELAY_UDP_PORT))
+                client.sendto(build_plg_packet(TICKET_TOKEN, 1, 0, 0, b"should be dropped"),
+                              (RELAY_HOST, RELAY_UDP_PORT))
+                time.sleep(0.3)
+                assert len(mock_primary.received) == 0, "ended session re-admitted from its ticket"
+            finally:
+                client.close()
+
+        runner.run("test_ticket_after_unregister", test_ticket_after_unregister)
+
     finally:
         mock_primary.stop()
         mock_alt.stop()
@@ -0,0 +1,81 @@
+"""
+PLG session tickets for the e2e harness.
+
+Same layout as relay/src/ticket.rs and api/app/services/relay_tickets.py
+(big-endian):
+
+  version u8 | node id (16-byte UUID) | token u32 | expires u32
+  | CIDR count u8 | per CIDR: family u8 (4/6), prefix u8, 4/16 address bytes
+  | range count u8 | per range: start u16, end u16
+  | HMAC-SHA256(key, all of the above)[:16]
+"""
+
+import hashlib
+import hmac
+import ipaddress
+import struct
+import time
+import uuid
+
+TICKET_VERSION = 2
+MAC_SIZE = 16
+
+
+def _mac(key: str, body: bytes) -> bytes:
+    return hmac.new(key.encode(), body, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def build_ticket(key: str, node_id: str, token: int, cidrs: list[str], port_ranges: list[tuple[int, int]],
+                 ttl: int = 60) -> bytes:
+    """Sign a ticket for `token` on `node_id` valid for `ttl` seconds (negative: already expired)."""
+    body = struct.pack(">B16sII", TICKET_VERSION, uuid.UUID(node_id).bytes, token, int(time.time()) + ttl)
+    body += bytes([len(cidrs)])
+    for cidr in cidrs:
+        net = ipaddress.ip_network(cidr, strict=False)
+        body += bytes([net.version, net.prefixlen]) + net.network_address.packed
+    body += bytes([len(port_ranges)])
+    for start, end in port_ranges:
+        body += struct.pack(">HH", start, end)
+    return body + _mac(key, body)
+
+
+def verify_ticket(key: str, node_id: str, data: bytes, now: float | None = None) -> dict | None:
+    """Decode a ticket the way the relay does; None if forged, malformed, expired or for another node.
+
+    Returns session_token, expires, game_server_ips (plain IPs for single
+    hosts, CIDRs otherwise) and game_ports (single-port ranges only).
+    """
+    if len(data) < 27 + MAC_SIZE:
+        return None
+    body, tag = data[:-MAC_SIZE], data[-MAC_SIZE:]
+    if not hmac.compare_digest(tag, _mac(key, body)):
+        return None
+    try:
+        version, node, token, expires = struct.unpack_from(">B16sII", body)
+        pos = 25
+        ips = []
+        for _ in range(body[pos]):
+            family, prefix = body[pos + 1], body[pos + 2]
+            size = {4: 4, 6: 16}.get(family)
+            if size is None or prefix > size * 8 or pos + 3 + size > len(body):
+                return None
+            ip = ipaddress.ip_address(body[pos + 3:pos + 3 + size])
+            ips.append(str(ip) if prefix == size * 8 else f"{ip}/{prefix}")
+            pos += 2 + size
+        pos += 1
+        ranges = []
+        for _ in range(body[pos]):
+            ranges.append(struct.unpack_from(">HH", body, pos + 1))
+            pos += 4
+    except (IndexError, struct.error):
+        return None
+    if version != TICKET_VERSION or pos + 1 != len(body) or node != uuid.UUID(node_id).bytes:
+        return None
+    if expires <= (time.time() if now is None else now):
+        return None
+    return {
+        "session_token": token,
+        "expires": expires,
+        "game_server_ips": ips,
+        "game_ports": [start for start, end in ranges if start == end],
+    }
@@ -25,6 +25,8 @@ echo "      Binary: $BINARY"
 # Step 2: Start relay with test ports.
 echo "[2/4] Starting relay server..."
 export RELAY_API_KEY="e2e-test-key"
+export RELAY_TICKET_KEY="e2e-ticket-key"
+export RELAY_NODE_ID="6f1c2a3b-4d5e-4f60-8a7b-9c0d1e2f3a4b"
 export RELAY_PORT=19443
 export RELAY_API_PORT=19444
 export RELAY_METRICS_PORT=19445
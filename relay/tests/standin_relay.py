@@ -0,0 +1,89 @@
+"""
+Local stand-in for the PLG relay's UDP data plane.
+
+Implements what the ticket tests exercise — ticket admission, keepalives and
+data forwarding with responses wrapped back in PLG headers — so they can run
+without building the Rust binary (`e2e_test.py --standin`). Sessions are
+only ever admitted from tickets; there is no management API.
+"""
+
+import selectors
+import socket
+import threading
+
+from plg_ticket import verify_ticket
+
+HEADER_SIZE = 10
+FLAG_KEEPALIVE = 0x02
+FLAG_TICKET = 0x10
+
+
+class StandInRelay:
+    def __init__(self, ticket_key: str, node_id: str, port: int = 0):
+        self.ticket_key = ticket_key
+        self.node_id = node_id
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", port))
+        self.port = self.sock.getsockname()[1]
+        # token → {"client": addr, "target": addr | None, "forward": socket}
+        self.sessions: dict[int, dict] = {}
+        self.rejected_tickets = 0
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.sock, selectors.EVENT_READ, None)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        for session in self.sessions.values():
+            session["forward"].close()
+        self.sock.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for key, _ in self._selector.select(timeout=0.2):
+                data, addr = key.fileobj.recvfrom(65535)
+                if key.data is None:
+                    self._from_client(data, addr)
+                else:
+                    self._from_game(key.data, data)
+
+    def _admit(self, token: int, payload: bytes, addr):
+        ticket = verify_ticket(self.ticket_key, self.node_id, payload)
+        if ticket is None or ticket["session_token"] != token:
+            self.rejected_tickets += 1
+            return
+        target = None
+        plain_ips = [ip for ip in ticket["game_server_ips"] if "/" not in ip]
+        if plain_ips and ticket["game_ports"]:
+            target = (plain_ips[0], ticket["game_ports"][0])
+        forward = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        forward.bind(("0.0.0.0", 0))
+        self._selector.register(forward, selectors.EVENT_READ, token)
+        self.sessions[token] = {"client": addr, "target": target, "forward": forward}
+
+    def _from_client(self, data: bytes, addr):
+        if len(data) < HEADER_SIZE:
+            return
+        token = int.from_bytes(data[:4], "big")
+        flags = data[8]
+        payload = data[HEADER_SIZE:]
+        session = self.sessions.get(token)
+        if session is None:
+            if flags & FLAG_TICKET:
+                self._admit(token, payload, addr)
+            return
+        session["client"] = addr
+        if flags & (FLAG_KEEPALIVE | FLAG_TICKET) or session["target"] is None:
+            return
+        session["forward"].sendto(payload, session["target"])
+
+    def _from_game(self, token: int, data: bytes):
+        session = self.sessions.get(token)
+        if session is not None:
+            header = token.to_bytes(4, "big") + bytes(6)
+            self.sock.sendto(header + data, session["client"])